@@ -0,0 +1,140 @@
+"""
+Alarm fire times: the gateway's per-call recomputation against the local
+alarm index.
+
+    python bench/bench_alarms.py [--events 5000] [--recurring 0.1] [--queries 200] [--delay-ms 20]
+
+`--events` gateway-shaped events (an alarm on every third one), of which a
+`--recurring` share repeat weekly. Measures:
+
+    legacy     getAlarmTimestamps ported as-is: re-parse every trigger of
+               every listed event and sort, once per question (no RRULEs)
+    expand     alarm_engine.expand over the same events (cached triggers,
+               RRULEs expanded)
+    index      AlarmIndex build once, then between(today) / upcoming(5)
+    turn       "what reminders do I have today?" through alarm_agent with
+               the index (gateway listing only when it is stale) and
+               without it (listing + one model call of --llm-ms)
+"""
+import argparse
+import datetime as dt
+import re
+import statistics
+import time
+
+from common import FakeServer, StubModel, gateway_events, load_agent, quiet, stub_response
+
+import alarm_engine
+import http_client
+import intents
+
+_LEGACY_DURATION = re.compile(r"^(-)?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+_LEGACY_ISO_UTC = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z$")
+
+
+def legacy_alarm_timestamps(events: list, start: float, end: float) -> list:
+    """prosweet-caldav's getAlarmTimestamps (ms since the epoch), minus the listing."""
+    timestamps = []
+    for event in events:
+        begin = dt.datetime.fromisoformat(event["start"].replace("Z", "+00:00")).timestamp()
+        for alarm in event.get("alarms") or []:
+            fire = None
+            if _LEGACY_ISO_UTC.match(alarm["trigger"]):
+                fire = dt.datetime.fromisoformat(alarm["trigger"].replace("Z", "+00:00")).timestamp()
+            else:
+                m = _LEGACY_DURATION.match(alarm["trigger"].upper())
+                if m:
+                    sign = -1 if m.group(1) else 1
+                    weeks, days, hours, mins, secs = (int(g or 0) for g in m.groups()[1:])
+                    fire = begin + sign * ((((weeks * 7 + days) * 24 + hours) * 60 + mins) * 60 + secs)
+            if fire is not None and start <= fire <= end:
+                timestamps.append(int(fire * 1000))
+    timestamps.sort()
+    return timestamps
+
+
+def _events(count: int, recurring: float) -> list:
+    events = gateway_events(count)
+    every = round(1 / recurring) if recurring else 0
+    for i, event in enumerate(events):
+        if every and i % every == 0:
+            event["rrule"] = "FREQ=WEEKLY;COUNT=52"
+        if i % 12 == 6:
+            event["alarms"] = [{"action": "DISPLAY", "trigger": "-P1D", "description": "Tomorrow"},
+                               {"action": "AUDIO", "trigger": "-PT5M"}]
+    return events
+
+
+def _per_call_us(func, queries: int) -> float:
+    start = time.perf_counter()
+    for _ in range(queries):
+        func()
+    return (time.perf_counter() - start) / queries * 1e6
+
+
+def _turns(agent, server, prompt: str, turns: int, llm_ms: float) -> list:
+    seconds = []
+    for _ in range(turns):
+        model = StubModel([stub_response(text="You have a few reminders today.")], llm_ms / 1000)
+        start = time.perf_counter()
+        http_client.run_sync(agent.ask_gemini_async("bench", "bench", model, prompt))
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--recurring", type=float, default=0.1)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--llm-ms", type=float, default=800)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    events = _events(args.events, args.recurring)
+    today = dt.datetime.combine(dt.date.today(), dt.time.min).timestamp()
+    now, horizon = time.time(), time.time() + alarm_engine.HORIZON_DAYS * 86400
+    one_off = [e for e in events if not e.get("rrule")]
+
+    # Same fire times as the gateway wherever the gateway's answer is right (no RRULEs)
+    assert [int(a.at * 1000) for a in alarm_engine.expand(one_off, now, horizon)] == \
+        legacy_alarm_timestamps(one_off, now, horizon)
+
+    legacy_us = _per_call_us(lambda: legacy_alarm_timestamps(events, now, horizon), max(args.queries // 10, 1))
+    expand_us = _per_call_us(lambda: alarm_engine.expand(events, now, horizon), max(args.queries // 10, 1))
+    start = time.perf_counter()
+    index = alarm_engine.AlarmIndex()
+    index.update(events)
+    build_ms = (time.perf_counter() - start) * 1000
+    between_us = _per_call_us(lambda: index.between(today, today + 86400), args.queries)
+    upcoming_us = _per_call_us(lambda: index.upcoming(5, now), args.queries)
+
+    print(f"{len(events)} events, {sum(bool(e.get('rrule')) for e in events)} recurring, "
+          f"{len(index)} firings indexed over {alarm_engine.HORIZON_DAYS} days")
+    print(f"  legacy recompute:  {legacy_us / 1000:8.2f} ms per question (one-off events only)")
+    print(f"  expand:            {expand_us / 1000:8.2f} ms per question (with RRULEs)")
+    print(f"  index build:       {build_ms:8.2f} ms once per listing")
+    print(f"  index between():   {between_us:8.1f} µs per question (today)")
+    print(f"  index upcoming(5): {upcoming_us:8.1f} µs per question")
+
+    agent = load_agent("alarm_agent")
+    prompt = "what reminders do I have today?"
+    with FakeServer("gateway", delay=args.delay_ms / 1000) as server:
+        agent.API_BASE_URL = server.url
+        for event in events[:500]:
+            server.store[event["uid"]] = (event["etag"], event, None)
+        with quiet():
+            indexed = _turns(agent, server, prompt, args.turns, args.llm_ms)
+            listed_before = server.requests
+            intents.FAST_PATH_ENABLED = False
+            model = _turns(agent, server, prompt, args.turns, args.llm_ms)
+            intents.FAST_PATH_ENABLED = True
+    print(f"  turn \"{prompt}\" ({args.turns} turns, 500 events, model {args.llm_ms:.0f} ms, "
+          f"gateway {args.delay_ms:.0f} ms/request):")
+    print(f"    index:  {statistics.mean(indexed) * 1000:8.1f} ms mean, {listed_before} gateway request(s) in all")
+    print(f"    model:  {statistics.mean(model) * 1000:8.1f} ms mean")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Decoding Gemini function-call arguments: the old recursive converters vs.
+the schema-driven function_args.ArgDecoder.
+
+    python bench/bench_arg_decode.py [--calls 20000] [--alarms 3]
+
+Arguments are real `genai.protos.FunctionCall` args (MapComposite /
+RepeatedComposite), shaped like an `update_alarm` call. `to_safe_json` and
+`to_dict_safe` give untyped values (to_safe_json turns a MapComposite into
+the list of its keys; alarms sent as a JSON string stay a string); the
+decoder gives the schema's types directly.
+"""
+import argparse
+import time
+
+import google.generativeai as genai
+
+from common import legacy_to_dict_safe, legacy_to_safe_json, load_agent
+
+
+def _args(alarms: int, as_string: bool = False):
+    alarm_list = [{"action": "DISPLAY", "trigger": f"-PT{10 * (i + 1)}M", "description": f"Reminder {i}"}
+                  for i in range(alarms)]
+    payload = {
+        "name": "Dentist", "summary": "Cleaning, bring insurance card",
+        "start_time": "2025-03-14T15:00:00", "end_time": "2025-03-14T16:00:00",
+        "username": "test", "password": "test", "event_uid": "e7",
+        "alarms": str(alarm_list).replace("'", '"') if as_string else alarm_list,
+    }
+    return genai.protos.FunctionCall(name="update_alarm", args=payload).args
+
+
+def _time(label: str, func, args, calls: int):
+    start = time.perf_counter()
+    for _ in range(calls):
+        result = func(args)
+    elapsed = time.perf_counter() - start
+    shape = type(result["alarms"]).__name__ if isinstance(result, dict) else f"{type(result).__name__} (lost the args)"
+    print(f"  {label:<14} {elapsed / calls * 1e6:8.1f} µs/call  alarms -> {shape}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--alarms", type=int, default=3)
+    args = parser.parse_args()
+
+    agent = load_agent("alarm_agent")
+    decode = lambda a: agent.ARGS.decode("update_alarm", a)
+
+    for title, call_args in (("alarms as a list", _args(args.alarms)),
+                             ("alarms as a JSON string", _args(args.alarms, as_string=True))):
+        print(f"update_alarm, {args.alarms} alarms, {title}:")
+        _time("to_safe_json", legacy_to_safe_json, call_args, args.calls)
+        _time("to_dict_safe", legacy_to_dict_safe, call_args, args.calls)
+        decoded = _time("ArgDecoder", decode, call_args, args.calls)
+        assert isinstance(decoded["alarms"], list) and decoded["alarms"][0]["action"] == "DISPLAY"
+
+
+if __name__ == "__main__":
+    main()
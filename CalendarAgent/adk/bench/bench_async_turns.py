@@ -0,0 +1,62 @@
+"""
+Many concurrent agent turns on one event loop vs. one turn at a time.
+
+    python bench/bench_async_turns.py [--turns 200] [--delay-ms 20]
+
+Each turn lists the calendar and updates one (seeded) event through the
+gateway agent.
+The fake server sleeps `--delay-ms` per request, so the sequential run is
+bound by network waits that the async run overlaps.
+"""
+import argparse
+import asyncio
+import time
+
+from common import FakeServer, load_agent, quiet
+
+import http_client
+
+
+async def _concurrent(agent, turns: int):
+    async def turn(i):
+        await agent.get_all_events_async("bench", "bench")
+        await agent.update_alarm_async(f"event {i}", "bench", "2025-01-01T09:00:00",
+                                       "2025-01-01T10:00:00", "bench", "bench", f"seed-{i:07d}")
+
+    await asyncio.gather(*(turn(i) for i in range(turns)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    parser.add_argument("--pool-size", type=int, default=64)
+    args = parser.parse_args()
+
+    agent = load_agent("alarm_agent")
+    http_client.configure_pools(pool_maxsize=args.pool_size)
+    with FakeServer("gateway", delay=args.delay_ms / 1000) as server:
+        agent.API_BASE_URL = server.url
+
+        with quiet():
+            server.seed(args.turns)
+            start = time.perf_counter()
+            for i in range(args.turns):
+                agent.get_all_events("bench", "bench")
+                agent.update_alarm(f"event {i}", "bench", "2025-01-01T09:00:00",
+                                   "2025-01-01T10:00:00", "bench", "bench", f"seed-{i:07d}")
+            sequential = time.perf_counter() - start
+
+            server.store.clear()
+            server.seed(args.turns)
+            start = time.perf_counter()
+            http_client.run_sync(_concurrent(agent, args.turns))
+            concurrent = time.perf_counter() - start
+
+    print(f"{args.turns} turns, {args.delay_ms:.0f} ms per request, pool size {args.pool_size}")
+    print(f"  sequential (sync wrappers): {sequential:6.2f} s  {args.turns / sequential:7.1f} turns/s")
+    print(f"  concurrent (one loop):      {concurrent:6.2f} s  {args.turns / concurrent:7.1f} turns/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Per-operation latency of the alarm agent through the Hono gateway against
+going straight to Radicale (calendar_backend.CalDAVBackend).
+
+    python bench/bench_backends.py [--events 2000] [--runs 30] [--delay-ms 2]
+
+Both run against the same fake Radicale (FakeServer("caldav"), `--delay-ms`
+of service time per request) seeded with `--events` events around today.
+The gateway is modelled as prosweet-caldav's caldav.ts does it: every call
+first lists the user's calendars (one PROPFIND), then performs the
+operation upstream, and answers in JSON. For each backend the agent lists
+its default window, creates an event with a DISPLAY alarm, updates it and
+deletes it, `--runs` times; reported are the median and p95 milliseconds
+and the Radicale requests each operation cost. The alarm is read back
+after the create, to check that VALARM serialisation round-trips.
+"""
+import argparse
+import base64
+import datetime as dt
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from common import FakeServer, load_agent, quiet
+
+import caldav_sync
+import calendar_backend
+import calendar_window
+from http_client import get_async_client, run_sync
+
+OPS = ("list", "create", "update", "delete")
+ALARMS = [{"action": "DISPLAY", "trigger": "-PT10M", "description": "Starts in 10 minutes"}]
+
+
+# ============================================================
+#  GATEWAY MODEL
+# ============================================================
+
+class _GatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    async def _forward(self, username: str, password: str, path: str, query: dict, body: dict):
+        upstream = self.server.upstream
+        # caldav.ts: client.getCalendars() before every operation, then the first calendar
+        calendars = await caldav_sync.find_calendars(get_async_client(upstream, username, password),
+                                                     f"{upstream}/{username}/")
+        backend = calendar_backend.CalDAVBackend(upstream, calendars[0].rstrip("/").rsplit("/", 1)[1])
+        uid = path.rsplit("/", 1)[1]
+        if self.command == "GET":
+            window = None
+            if "start" in query and "end" in query:
+                window = tuple(dt.datetime.fromisoformat(query[key][0].replace("Z", "")) for key in ("start", "end"))
+            return await backend.list_events(username, password, window)
+        if self.command == "POST":
+            return await backend.create_event(username, password, body, body.get("uid"))
+        if self.command == "PUT":
+            return await backend.update_event(username, password, uid, body, self.headers.get("If-Match"))
+        return await backend.delete_event(username, password, uid)
+
+    def _dispatch(self):
+        username, password = base64.b64decode(self.headers["Authorization"].split()[1]).decode().split(":", 1)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else {}
+        path, _, query = self.path.partition("?")
+        response = run_sync(self._forward(username, password, path, parse_qs(query), body))
+        payload = json.dumps(response.json()).encode()
+        self.send_response(response.status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+
+class GatewayModel(ThreadingHTTPServer):
+    """The Hono service in front of `upstream` (a fake Radicale)."""
+
+    daemon_threads = True
+
+    def __init__(self, upstream: str):
+        super().__init__(("127.0.0.1", 0), _GatewayHandler)
+        self.upstream = upstream
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+# ============================================================
+#  MEASUREMENT
+# ============================================================
+
+def _timed(coro) -> tuple:
+    start = time.perf_counter()
+    result = run_sync(coro)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def run_backend(agent, backend, radicale: FakeServer, runs: int) -> tuple:
+    """{op: [ms, ...]}, {op: Radicale requests per op} and whether the alarm read back intact."""
+    agent.BACKEND = backend
+    samples, requests = {op: [] for op in OPS}, dict.fromkeys(OPS, 0)
+    window = calendar_window.default_window()
+    start = dt.datetime.combine(dt.date.today() + dt.timedelta(days=1), dt.time(10))
+    alarm_ok = True
+
+    def op(name: str, coro):
+        before = radicale.requests
+        ms, result = _timed(coro)
+        samples[name].append(ms)
+        requests[name] += radicale.requests - before
+        return result
+
+    with quiet():
+        op("list", agent.get_all_events_async("bench", "bench", window))  # warm-up: connections, discovery
+        samples["list"].clear()
+        requests["list"] = 0
+        for i in range(runs):
+            op("list", agent.get_all_events_async("bench", "bench", window))
+            created = op("create", agent.create_alarm_async(
+                f"Bench {i}", "backend comparison", start.isoformat(), (start + dt.timedelta(hours=1)).isoformat(),
+                "bench", "bench", ALARMS))
+            uid = created["created"]["uid"]
+            if i == 0:
+                listed = calendar_window.event_list(run_sync(agent.get_all_events_async("bench", "bench", window)))
+                mine = [e for e in listed if e.get("uid") == uid]
+                alarm_ok = bool(mine) and [(a.get("action"), a.get("trigger")) for a in mine[0]["alarms"]] == \
+                    [("DISPLAY", "-PT10M")]
+            op("update", agent.update_alarm_async(
+                f"Bench {i} (moved)", "backend comparison", (start + dt.timedelta(hours=2)).isoformat(),
+                (start + dt.timedelta(hours=3)).isoformat(), "bench", "bench", uid, ALARMS))
+            op("delete", agent.delete_alarm_async(uid, "bench", "bench"))
+    return samples, {name: count / runs for name, count in requests.items()}, alarm_ok
+
+
+def _p95(values: list) -> float:
+    return sorted(values)[max(0, int(len(values) * 0.95) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--delay-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    agent = load_agent("alarm_agent")
+    results = {}
+    with FakeServer("caldav", delay=args.delay_ms / 1000) as radicale:
+        radicale.seed(args.events, start=dt.date.today() - dt.timedelta(days=args.events // 20))
+        with GatewayModel(radicale.url) as gateway:
+            results["gateway"] = run_backend(agent, calendar_backend.GatewayBackend(gateway.url), radicale, args.runs)
+        results["caldav"] = run_backend(agent, calendar_backend.CalDAVBackend(radicale.url), radicale, args.runs)
+
+    print(f"{args.events} events, {args.runs} runs, {args.delay_ms:g} ms per Radicale request\n")
+    print(f"{'op':<8} {'backend':<8} {'median ms':>10} {'p95 ms':>8} {'radicale req':>13}")
+    for name in OPS:
+        for backend, (samples, requests, _) in results.items():
+            print(f"{name:<8} {backend:<8} {statistics.median(samples[name]):10.2f} "
+                  f"{_p95(samples[name]):8.2f} {requests[name]:13.1f}")
+        speedup = statistics.median(results["gateway"][0][name]) / statistics.median(results["caldav"][0][name])
+        print(f"{'':<8} direct is {speedup:.1f}x faster\n")
+    for backend, (_, _, alarm_ok) in results.items():
+        print(f"alarm round trip ({backend}): {'✅' if alarm_ok else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Bulk .ics import/export: sequential against pipelined uploads, and
+per-resource GETs against calendar-multiget for the download.
+
+    python bench/bench_bulk.py [--events 2000] [--delay-ms 20] [--concurrency 1,8,32]
+
+Writes a calendar of `--events` VEVENTs to a temporary file and imports it
+into a fake Radicale that takes `--delay-ms` per request, once per
+concurrency level, then exports it back with multiget batches.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from common import FakeServer, quiet
+
+import bulk_ics
+import http_client
+
+
+def _write_calendar(path: str, count: int):
+    with open(path, "w", newline="") as f:
+        f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//ProSweet Bench//EN\r\n")
+        for i in range(count):
+            day = f"2030{1 + i // 28 % 12:02d}{1 + i % 28:02d}"
+            f.write(f"BEGIN:VEVENT\r\nUID:bulk-{i}\r\nDTSTAMP:20250101T000000Z\r\nSUMMARY:Bulk #{i}\r\n"
+                    f"DTSTART:{day}T090000Z\r\nDTEND:{day}T100000Z\r\nEND:VEVENT\r\n")
+        f.write("END:VCALENDAR\r\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    parser.add_argument("--concurrency", default="1,8,32")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    source, backup = os.path.join(folder, "calendar.ics"), os.path.join(folder, "backup.ics")
+    _write_calendar(source, args.events)
+
+    print(f"{args.events} events, server {args.delay_ms:.0f} ms/request")
+    with FakeServer("caldav", delay=args.delay_ms / 1000) as server:
+        for concurrency in (int(n) for n in args.concurrency.split(",")):
+            server.store.clear()
+            with quiet():
+                start = time.perf_counter()
+                counts = http_client.run_sync(bulk_ics.import_ics(
+                    source, server.url, "bench", "bench", "bench", concurrency=concurrency, restart=True))
+                seconds = time.perf_counter() - start
+            assert len(server.store) == args.events, counts
+            print(f"  import, {concurrency:>3} in flight: {seconds:7.2f} s  {args.events / seconds:8.0f} events/s")
+
+        before = server.requests
+        with quiet():
+            start = time.perf_counter()
+            http_client.run_sync(bulk_ics.export_ics(backup, server.url, "bench", "bench", "bench", restart=True))
+            seconds = time.perf_counter() - start
+        with open(backup) as f:
+            exported = f.read().count("BEGIN:VEVENT")
+        assert exported == args.events, exported
+        print(f"  export, multiget:       {seconds:7.2f} s  {args.events / seconds:8.0f} events/s "
+              f"({server.requests - before} requests; one GET per event would be {args.events + 1})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Input tokens per turn of a conversation, stateless (every turn re-sends the
+calendar) against chat sessions (chat_session: the calendar once, then
+deltas).
+
+    python bench/bench_chat_session.py [--sizes 30,300,3000] [--turns 12] [--session-budget 32000]
+
+The event agent runs `--turns` prompts against a fake gateway seeded with
+`size` events around today, with a StubModel whose script creates, updates
+and deletes one event per turn (and once asks for events outside the
+window first), so the calendar changes a little between turns. Reported
+per mode, with event retrieval off and on: the tokens of the first message
+and the mean of the later ones (estimated from what was handed to the
+model: prompt text and function responses), and how many chats were
+started. With sessions (and no retrieval, which leaves out new events the
+request is not about), each event created or updated must show up in the
+next message's delta; the check is printed at the end.
+"""
+import argparse
+import datetime as dt
+import json
+import statistics
+
+from common import FakeServer, StubModel, load_agent, quiet, stub_response
+
+import chat_session
+import event_index
+import http_client
+import prompt_encoding
+
+
+def script(turns: int) -> list:
+    """One scripted model answer per turn (two for the turn that looks outside the window)."""
+    responses = []
+    day = dt.date.today() + dt.timedelta(days=2)
+    for turn in range(turns):
+        start = dt.datetime.combine(day, dt.time(9 + turn % 8)).isoformat()
+        end = dt.datetime.combine(day, dt.time(10 + turn % 8)).isoformat()
+        if turn == 3:
+            later = (dt.date.today() + dt.timedelta(days=90)).isoformat()
+            responses.append(stub_response([("get_events_in_range", {"start_date": later, "end_date": later})]))
+        kind = turn % 3
+        if kind == 0:
+            responses.append(stub_response([("create_event", {
+                "name": f"Bench {turn}", "summary": "added by the bench", "start_time": start, "end_time": end,
+                "username": "bench", "password": "bench"})]))
+        elif kind == 1:
+            responses.append(stub_response([("update_event", {
+                "name": f"Moved {turn}", "summary": "moved by the bench", "start_time": start, "end_time": end,
+                "username": "bench", "password": "bench", "event_uid": f"e{turn + 1}"})]))
+        else:
+            responses.append(stub_response([("delete_event", {
+                "event_uid": f"e{turn + 1}", "username": "bench", "password": "bench"})]))
+    return responses
+
+
+def message_tokens(contents) -> int:
+    return sum(prompt_encoding.estimate_tokens(part if isinstance(part, str) else json.dumps(part, default=str))
+               for part in contents)
+
+
+def conversation(agent, server: FakeServer, size: int, turns: int, sessions: bool) -> tuple:
+    """(tokens per turn, chats started, writes missing from the next delta)."""
+    server.store.clear()
+    server.seed(size, start=dt.date.today() - dt.timedelta(days=size // 20), per_day=10)
+    chat_session.ENABLED = sessions
+    chat_session._sessions.clear()
+    event_index._indexes.clear()
+    model = StubModel(script(turns))
+    per_turn, missing = [], 0
+    with quiet():
+        for turn in range(turns):
+            before = len(model.prompts)
+            http_client.run_sync(agent.ask_gemini_async(
+                "bench", "bench", model, f"could you sort out Event {size // 2 + turn} for me"))
+            per_turn.append(sum(message_tokens(contents) for contents in model.prompts[before:]))
+            if sessions and not event_index.ENABLED and turn and (turn - 1) % 3 != 2:
+                # what the last turn created or updated is in this turn's delta
+                missing += not any("Bench" in str(part) or "Moved" in str(part)
+                                   for contents in model.prompts[before:] for part in contents)
+    return per_turn, model.chats, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="30,300,3000")
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--session-budget", type=int, default=chat_session.SESSION_TOKEN_BUDGET)
+    args = parser.parse_args()
+
+    agent = load_agent("event_agent")
+    chat_session.SESSION_TOKEN_BUDGET = args.session_budget
+    retrieval = event_index.ENABLED
+    missing_total = 0
+    print(f"{args.turns} turns, session budget {args.session_budget} tokens\n")
+    print(f"{'events':>7} {'retrieval':>9}  {'mode':<10} {'first':>7} {'later mean':>11} {'total':>8} {'chats':>6}")
+    with FakeServer("gateway") as server:
+        agent.API_BASE_URL = server.url
+        for size in (int(n) for n in args.sizes.split(",")):
+            for event_index.ENABLED in (False, True):
+                for sessions in (False, True):
+                    per_turn, chats, missing = conversation(agent, server, size, args.turns, sessions)
+                    missing_total += missing
+                    print(f"{size:>7} {'on' if event_index.ENABLED else 'off':>9}  "
+                          f"{'session' if sessions else 'stateless':<10} {per_turn[0]:>7} "
+                          f"{statistics.mean(per_turn[1:]):>11.0f} {sum(per_turn):>8} {chats if sessions else '-':>6}")
+            print()
+    event_index.ENABLED = retrieval
+    print(f"writes carried by the next delta: {'✅' if not missing_total else f'❌ {missing_total} missing'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Calendar fetch with the on-disk event store vs. the in-memory replica.
+
+    python bench/bench_event_store.py [--sizes 1000,10000,50000] [--turns 10] [--delay-ms 20]
+
+"memory" is the replica every process used to start with: the first fetch
+downloads the whole collection, later ones issue one sync-collection
+REPORT and return every event. "store" reopens the SQLite copy a previous
+process left behind: the first fetch is already local, and each turn reads
+the default window (7 days back, 30 ahead) through the start/end indexes
+while a sync runs in the background.
+"""
+import argparse
+import datetime as dt
+import statistics
+import tempfile
+import time
+
+from common import FakeServer, load_agent, quiet
+
+import caldav_sync
+import calendar_window
+import event_store
+
+
+def _ms(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def _fresh_process(stored: bool):
+    """Forget every in-memory replica and open store, as a restarted agent would."""
+    event_store.ENABLED = stored
+    caldav_sync._replicas.clear()
+    event_store._stores.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    agent = load_agent("agent_test")
+    event_store.STORE_DIR = tempfile.mkdtemp()
+    window = calendar_window.default_window()
+
+    print(f"{'events':>7} {'memory cold ms':>15} {'memory turn ms':>15} {'store cold ms':>14} {'store turn ms':>14}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with FakeServer("caldav", delay=args.delay_ms / 1000) as server, quiet():
+            agent.base_url = server.url
+            server.seed(size, start=dt.date.today() - dt.timedelta(days=size // 20))
+            fetch = lambda: agent.get_all_calendar_items("bench", "bench", "cal", window if stored else None)
+
+            results = []
+            for stored in (False, True):
+                if stored:
+                    _fresh_process(True)
+                    fetch()  # a previous process filled the store
+                    caldav_sync.get_replica(server.url, "bench", "cal").refreshing = None
+                _fresh_process(stored)
+                cold = _ms(fetch)
+                turns = statistics.median(_ms(fetch) for _ in range(args.turns))
+                results += [cold, turns]
+
+        print(f"{size:>7} {results[0]:15.1f} {results[1]:15.1f} {results[2]:14.1f} {results[3]:14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Local intent matching in front of the model: hit rate, precision and the
+latency it saves.
+
+    python bench/bench_fast_path.py [--llm-ms 800] [--delay-ms 20] [-v]
+
+Runs a fixed set of prompts through the alarm agent against a fake gateway
+holding a small, realistic week of events. Each prompt is labelled with
+what a correct fast path does: act on a given event, create at a given
+time, or leave the prompt to the model (None). The stub model sleeps
+`--llm-ms` per call and the gateway `--delay-ms` per request.
+
+    hit rate   share of prompts handled without a model call
+    precision  share of those hits that did what the label says
+    wrong      hits on prompts that should have gone to the model
+"""
+import argparse
+import datetime as dt
+import statistics
+import time
+
+from common import FakeServer, StubModel, load_agent, quiet, stub_response
+
+import http_client
+import intents
+
+TODAY = dt.date.today()
+TOMORROW = TODAY + dt.timedelta(days=1)
+
+
+def _at(days: int, hour: int, minute: int = 0) -> dt.datetime:
+    return dt.datetime.combine(TODAY + dt.timedelta(days=days), dt.time(hour, minute))
+
+
+# uid -> (title, start, minutes)
+CALENDAR = {
+    "dentist": ("Dentist appointment", _at(3, 14), 60),
+    "doctor": ("Doctor appointment", _at(5, 10), 30),
+    "standup-1": ("Team standup", _at(1, 9), 15),
+    "standup-2": ("Team standup", _at(2, 9), 15),
+    "lunch": ("Lunch with Sam", _at(2, 12), 60),
+    "review": ("Project review", _at(4, 15), 60),
+    "gym": ("Gym", _at(1, 18), 90),
+    "book": ("Book club", _at(6, 19), 120),
+    "flight": ("Flight to Denver", _at(8, 7), 180),
+}
+
+# prompt -> expected: ("update"/"delete", uid), ("create", "YYYY-MM-DDTHH:MM"), or None (model)
+PROMPTS = {
+    f"delete my dentist appointment on {(TODAY + dt.timedelta(days=3)).isoformat()}": ("delete", "dentist"),
+    "cancel team standup tomorrow": ("delete", "standup-1"),
+    "please delete gym tomorrow": ("delete", "gym"),
+    "move standup to 10am tomorrow": ("update", "standup-1"),
+    "Move my dentist appointment to 4pm": ("update", "dentist"),
+    "reschedule the project review to 11:30": ("update", "review"),
+    "push lunch with sam to 1pm": ("update", "lunch"),
+    "move gym to 7pm": ("update", "gym"),
+    f"reschedule book club to {(TODAY + dt.timedelta(days=7)).isoformat()}": ("update", "book"),
+    "add yoga tomorrow from 7 to 8am": ("create", f"{TOMORROW.isoformat()}T07:00"),
+    "schedule Haircut tomorrow at 5pm for 30 minutes": ("create", f"{TOMORROW.isoformat()}T17:00"),
+    f"book Call with mom on {(TODAY + dt.timedelta(days=3)).isoformat()} at 18:00": (
+        "create", f"{(TODAY + dt.timedelta(days=3)).isoformat()}T18:00"),
+    "add Coffee with Ana tomorrow at 9:30am": ("create", f"{TOMORROW.isoformat()}T09:30"),
+    # Left to the model: ambiguous, compound, vague or not a command at all.
+    "cancel standup": None,
+    "remove book club": None,
+    "cancel standup tomorrow": None,
+    "delete my appointment": None,
+    "cancel my dentist and doctor appointments": None,
+    "move everything on friday to next week": None,
+    "remind me 10 minutes before the flight": None,
+    "add gym at 6pm": None,
+    "move the review to later": None,
+    "what do I have tomorrow?": None,
+    "schedule a team offsite sometime next month": None,
+    "delete all my meetings tomorrow": None,
+    "move flight to denver to friday": None,
+    "I can't make lunch with Sam, push it by an hour": None,
+    "add a weekly reading session every monday at 8pm": None,
+    "cancel the party": None,
+}
+
+
+def _seed(server: FakeServer):
+    server.store.clear()
+    for uid, (title, start, minutes) in CALENDAR.items():
+        end = start + dt.timedelta(minutes=minutes)
+        event = {"summary": title, "description": "",
+                 "start": start.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                 "end": end.strftime("%Y-%m-%dT%H:%M:%S.000Z")}
+        server.store[uid] = (f'"{uid}"', event, None)
+
+
+def _correct(intent, expected) -> bool:
+    if intent is None or expected is None or intent.action != expected[0]:
+        return False
+    if intent.action == "create":
+        return intent.args["start_time"].startswith(expected[1])
+    return intent.args.get("event_uid") == expected[1]
+
+
+def _turns(agent, server, llm_ms: float) -> list:
+    """Seconds per prompt through the whole agent turn."""
+    seconds = []
+    for prompt in PROMPTS:
+        _seed(server)
+        model = StubModel([stub_response(text="Sure.")], llm_ms / 1000)
+        start = time.perf_counter()
+        http_client.run_sync(agent.ask_gemini_async("bench", "bench", model, prompt))
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--llm-ms", type=float, default=800)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    agent = load_agent("alarm_agent")
+    with FakeServer("gateway", delay=args.delay_ms / 1000) as server:
+        agent.API_BASE_URL = server.url
+        _seed(server)
+        with quiet():
+            events = agent.get_all_events("bench", "bench")["events"]
+
+        hits = correct = wrong = 0
+        match_us = []
+        for prompt, expected in PROMPTS.items():
+            start = time.perf_counter()
+            intent = intents.match(prompt, events)
+            match_us.append((time.perf_counter() - start) * 1e6)
+            hits += intent is not None
+            correct += _correct(intent, expected)
+            wrong += intent is not None and expected is None
+            if args.verbose:
+                mark = "✓" if _correct(intent, expected) or (intent is expected is None) else "✗"
+                print(f"  {mark} {prompt!r:60} {intent}")
+
+        with quiet():
+            fast = _turns(agent, server, args.llm_ms)
+            intents.FAST_PATH_ENABLED = False
+            slow = _turns(agent, server, args.llm_ms)
+            intents.FAST_PATH_ENABLED = True
+
+    should_hit = sum(expected is not None for expected in PROMPTS.values())
+    print(f"{len(PROMPTS)} prompts ({should_hit} simple), model {args.llm_ms:.0f} ms, "
+          f"gateway {args.delay_ms:.0f} ms/request")
+    print(f"  hit rate:   {hits}/{len(PROMPTS)} = {hits / len(PROMPTS):.0%}  "
+          f"(recall on simple prompts {correct}/{should_hit})")
+    print(f"  precision:  {correct}/{hits or 1} correct, {wrong} should have gone to the model")
+    print(f"  matching:   {statistics.mean(match_us):.0f} µs per prompt (max {max(match_us):.0f} µs)")
+    print(f"  turn time:  {statistics.mean(slow) * 1000:.0f} ms -> {statistics.mean(fast) * 1000:.0f} ms mean, "
+          f"{sum(slow) - sum(fast):.1f} s saved over the set")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Free-slot search: the interval index against scanning every event, and
+what the planner's context holds either way.
+
+    python bench/bench_free_slots.py [--events 1000,10000,50000] [--queries 200]
+
+For each calendar size, times
+    scan     for every candidate start, check each event for overlap (what
+             the model is left to do with a dump of the calendar)
+    build    BusyIndex over the events, once per listing
+    slots    BusyIndex.free_slots(): first 5 free 30-minute slots in a week
+    overlap  BusyIndex.conflicts() for one proposed hour
+and compares the tokens of the event table the model would otherwise read
+with the tokens of the slot list find_free_slots returns.
+"""
+import argparse
+import datetime as dt
+import random
+import time
+
+from common import gateway_events
+
+import alarm_engine
+import free_busy
+import prompt_encoding
+
+DURATION = dt.timedelta(minutes=30)
+
+
+def _scan_free_slots(events: list, first_day: dt.date, last_day: dt.date, count: int) -> list:
+    """Naive search: every 5-minute start in working hours, every event checked, one slot per gap."""
+    busy = [(alarm_engine.epoch(e["start"]), alarm_engine.epoch(e["end"])) for e in events]
+    opens, closes = free_busy._hours(free_busy.WORKING_HOURS)
+    now, length, slots = time.time(), DURATION.total_seconds(), []
+    day = first_day
+    while day <= last_day and len(slots) < count:
+        begin = free_busy._round_up(max(dt.datetime.combine(day, opens).timestamp(), now))
+        close = dt.datetime.combine(day, closes).timestamp()
+        while begin + length <= close and len(slots) < count:
+            if all(end <= begin or start >= begin + length for start, end in busy):
+                slots.append((begin, begin + length))
+                begin = min([start for start, _ in busy if start > begin] + [close])  # one slot per gap
+            else:
+                begin += 300
+        day += dt.timedelta(days=1)
+    return slots
+
+
+def _events(count: int) -> list:
+    events = gateway_events(count, dt.datetime.combine(dt.date.today() - dt.timedelta(days=count // 16), dt.time(8)))
+    rng = random.Random(7)
+    for event in events:  # leave some holes in the day
+        if rng.random() < 0.15:
+            event["start"] = event["end"] = "2000-01-01T00:00:00.000Z"
+    return events
+
+
+def _us(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", default="1000,10000,50000")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    first_day = dt.date.today() + dt.timedelta(days=1)
+    last_day = first_day + dt.timedelta(days=6)
+    probe = dt.datetime.combine(first_day + dt.timedelta(days=2), dt.time(11)).timestamp()
+
+    print(f"{'events':>7} {'scan ms':>9} {'build ms':>9} {'slots µs':>9} {'overlap µs':>10} "
+          f"{'table tok':>10} {'slots tok':>9}")
+    for count in (int(n) for n in args.events.split(",")):
+        events = _events(count)
+        index = free_busy.BusyIndex(events)
+        slots = index.free_slots(DURATION, first_day, last_day)
+        assert [s.timestamp() for s, _ in slots] == [s for s, _ in _scan_free_slots(events, first_day, last_day, 5)]
+
+        scan_ms = _us(lambda: _scan_free_slots(events, first_day, last_day, 5), 3) / 1000
+        build_ms = _us(lambda: free_busy.BusyIndex(events), 3) / 1000
+        slots_us = _us(lambda: index.free_slots(DURATION, first_day, last_day), args.queries)
+        overlap_us = _us(lambda: index.conflicts(probe, probe + 3600), args.queries)
+        table = prompt_encoding.encode_events(events, prompt_encoding.UidAliases())
+        print(f"{count:>7} {scan_ms:9.1f} {build_ms:9.1f} {slots_us:9.1f} {overlap_us:10.1f} "
+              f"{prompt_encoding.estimate_tokens(table):>10} "
+              f"{prompt_encoding.estimate_tokens(free_busy.describe_slots(slots)):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Connections and latency per agent turn, with and without pooled sessions.
+
+    python bench/bench_http_pool.py [--turns 200]
+
+A "turn" is what one `ask_gemini` call does against the network, minus the
+model: list the calendar, then update one event (HEAD + PUT for the Radicale
+agent, DELETE + POST for the gateway agent).
+"""
+import argparse
+import statistics
+import time
+
+from common import FakeServer, load_agent, quiet
+
+import http_client
+
+
+def _run(turns: int, pooled: bool, server: FakeServer, turn) -> dict:
+    http_client.configure_pools(enabled=pooled)
+    server.reset_counters()
+    latencies = []
+    with quiet():
+        for i in range(turns):
+            start = time.perf_counter()
+            turn(i)
+            latencies.append(time.perf_counter() - start)
+    http_client.close_all_sessions()
+    return {
+        "conn/turn": server.connections / turns,
+        "req/turn": server.requests / turns,
+        "p50 ms": statistics.median(latencies) * 1000,
+        "mean ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+def bench_radicale(turns: int):
+    agent = load_agent("agent_test")
+    with FakeServer("caldav") as server:
+        agent.base_url = server.url
+        with quiet():
+            agent.create_task("seed", "seed", "2025-01-01T09:00:00", "2025-01-01T10:00:00",
+                              "bench", "bench", "cal")
+        uid = next(iter(server.store))
+
+        def turn(i):
+            agent.get_all_calendar_items("bench", "bench", "cal")
+            agent.update_task(f"seed {i}", "seed", "2025-01-01T09:00:00", "2025-01-01T10:00:00",
+                              "bench", "bench", "cal", uid)
+
+        return {mode: _run(turns, mode == "pooled", server, turn) for mode in ("per-call", "pooled")}
+
+
+def bench_gateway(turns: int):
+    agent = load_agent("alarm_agent")
+    with FakeServer("gateway") as server:
+        agent.API_BASE_URL = server.url
+
+        def turn(i):
+            agent.get_all_events("bench", "bench")
+            agent.update_alarm(f"seed {i}", "seed", "2025-01-01T09:00:00", "2025-01-01T10:00:00",
+                               "bench", "bench", "seed-uid")
+
+        return {mode: _run(turns, mode == "pooled", server, turn) for mode in ("per-call", "pooled")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    for name, bench in (("agent_test (Radicale)", bench_radicale), ("alarm_agent (Hono)", bench_gateway)):
+        print(f"\n{name}, {args.turns} turns")
+        for mode, row in bench(args.turns).items():
+            print(f"  {mode:9} " + "  ".join(f"{k}={v:.2f}" for k, v in row.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Parse a Radicale collection: legacy regex split vs. icalendar vs. ical_stream.
+
+    python bench/bench_ical_parse.py [--sizes 1000,10000,100000]
+
+The synthetic collection mixes plain UTC events with the cases the regex
+parser gets wrong: folded SUMMARY/DESCRIPTION lines, DTSTART;TZID=...,
+all-day VALUE=DATE events and a VALARM with its own DESCRIPTION. Peak
+memory is measured with tracemalloc and includes the response text the
+legacy and icalendar paths need to hold in full.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from common import legacy_parse_ics
+
+from ical_stream import iter_lines_from_chunks, iter_vevents
+
+
+def synthetic_collection(count: int) -> bytes:
+    out = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//ProSweet Bench//EN"]
+    for i in range(count):
+        kind = i % 4
+        out += ["BEGIN:VEVENT", f"UID:bench-{i:07d}", "DTSTAMP:20250101T000000Z"]
+        if kind == 1:
+            out += [f"SUMMARY:A rather long meeting title number {i} that the client folded ov",
+                    " er two lines"]
+        else:
+            out.append(f"SUMMARY:Event {i}")
+        out.append(f"DESCRIPTION:Notes for event {i}\\, with an escaped comma\\nand a second line")
+        if kind == 2:
+            out += ["DTSTART;TZID=Europe/Berlin:20250301T090000", "DTEND;TZID=Europe/Berlin:20250301T100000"]
+        elif kind == 3:
+            out += ["DTSTART;VALUE=DATE:20250302", "DTEND;VALUE=DATE:20250303"]
+        else:
+            out += ["DTSTART:20250301T090000Z", "DTEND:20250301T100000Z"]
+        if kind == 0:
+            out += ["BEGIN:VALARM", "ACTION:DISPLAY", "TRIGGER:-PT10M", "DESCRIPTION:Reminder", "END:VALARM"]
+        out.append("END:VEVENT")
+    out.append("END:VCALENDAR")
+    return ("\r\n".join(out) + "\r\n").encode()
+
+
+def _chunks(body: bytes, size: int = 64 * 1024):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def run_legacy(body: bytes):
+    return legacy_parse_ics(b"".join(_chunks(body)).decode())
+
+
+def run_icalendar(body: bytes):
+    from icalendar import Calendar
+
+    cal = Calendar.from_ical(b"".join(_chunks(body)).decode())
+    return [(str(c.get("uid")), c.get("dtstart").dt) for c in cal.walk("vevent")]
+
+
+def run_stream(body: bytes):
+    return list(iter_vevents(iter_lines_from_chunks(_chunks(body))))
+
+
+def measure(fn, body: bytes):
+    gc.collect()
+    start = time.perf_counter()
+    fn(body)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def accuracy(body: bytes) -> str:
+    """How many of the tricky events each fast path gets right."""
+    legacy, stream = run_legacy(body), run_stream(body)
+    wrong_legacy = sum(
+        1 for i, e in enumerate(legacy)
+        if (i % 4 == 1 and not e["summary"].endswith("over two lines"))
+        or (i % 4 == 3 and e["start_time"] is None)
+        or (i % 4 == 0 and e["description"] == "Reminder")
+        or "\\," in (e["description"] or "")
+    )
+    wrong_stream = sum(
+        1 for i, e in enumerate(stream)
+        if (i % 4 == 1 and not e["summary"].endswith("over two lines"))
+        or (i % 4 == 2 and e["start_time"] != "20250301T080000Z")
+        or (i % 4 == 3 and e["start_time"] != "20250302")
+        or (i % 4 == 0 and e["description"] == "Reminder")
+    )
+    return f"misparsed events: legacy {wrong_legacy}/{len(legacy)}, ical_stream {wrong_stream}/{len(stream)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--skip-icalendar-above", type=int, default=100000)
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        body = synthetic_collection(size)
+        print(f"\n{size} events, {len(body) / 1e6:.1f} MB")
+        print("  " + accuracy(body))
+        runs = [("legacy regex", run_legacy), ("ical_stream", run_stream)]
+        if size <= args.skip_icalendar_above:
+            runs.insert(1, ("icalendar", run_icalendar))
+        for name, fn in runs:
+            elapsed, peak = measure(fn, body)
+            print(f"  {name:13} {elapsed * 1000:9.1f} ms  {size / elapsed:10.0f} ev/s  peak {peak / 1e6:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Several operations in one request: one model turn per call vs. every call
+of one response dispatched concurrently.
+
+    python bench/bench_multi_call.py [--ops 3] [--llm-ms 800] [--delay-ms 20]
+
+Simulates "cancel my N meetings tomorrow" with the alarm agent. The stub
+model sleeps `--llm-ms` per generate call and the fake gateway `--delay-ms`
+per request. Before, the dispatcher only looked at the first part of the
+response, so N operations took N user turns (N model calls, N listings);
+now one response carries all N calls and they run together.
+"""
+import argparse
+import time
+
+from common import FakeServer, StubModel, load_agent, quiet, stub_response
+
+import http_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ops", type=int, default=3)
+    parser.add_argument("--llm-ms", type=float, default=800)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    agent = load_agent("alarm_agent")
+    calls = [("delete_alarm", {"event_uid": f"seed-{i:07d}", "username": "bench", "password": "bench"})
+             for i in range(args.ops)]
+    prompt = "cancel my meetings tomorrow"
+
+    with FakeServer("gateway", delay=args.delay_ms / 1000) as server:
+        agent.API_BASE_URL = server.url
+
+        with quiet():
+            server.seed(args.ops)
+            server.reset_counters()
+            model = StubModel([stub_response([call]) for call in calls], args.llm_ms / 1000)
+            start = time.perf_counter()
+            for _ in calls:
+                http_client.run_sync(agent.ask_gemini_async("bench", "bench", model, prompt))
+            one_per_turn = time.perf_counter() - start
+            before = (model.calls, server.requests, len(server.store))
+
+            server.store.clear()
+            server.seed(args.ops)
+            server.reset_counters()
+            model = StubModel([stub_response(calls)], args.llm_ms / 1000)
+            start = time.perf_counter()
+            http_client.run_sync(agent.ask_gemini_async("bench", "bench", model, prompt))
+            batched = time.perf_counter() - start
+            after = (model.calls, server.requests, len(server.store))
+
+    print(f"{args.ops} operations, {args.llm_ms:.0f} ms per model call, {args.delay_ms:.0f} ms per request")
+    print(f"  one call per turn:   {one_per_turn:6.2f} s  model calls {before[0]:3d}  "
+          f"HTTP requests {before[1]:3d}  left {before[2]}")
+    print(f"  all calls, one turn: {batched:6.2f} s  model calls {after[0]:3d}  "
+          f"HTTP requests {after[1]:3d}  left {after[2]}")
+
+
+if __name__ == "__main__":
+    main()
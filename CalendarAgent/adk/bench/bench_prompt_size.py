@@ -0,0 +1,86 @@
+"""
+Prompt size and model latency: `json.dumps(events, indent=2)` vs. the
+compact one-line-per-event table with UID aliases and a token budget.
+
+    python bench/bench_prompt_size.py [--sizes 100,1000,10000] [--live]
+
+Tokens are estimated offline (prompt_encoding.estimate_tokens). Latency is
+modelled as `--base-ms` plus `--ms-per-1k-tokens` of prefill; with `--live`
+and GOOGLE_API_KEY set, tokens come from `count_tokens` and latency from a
+real `generate_content` call instead.
+
+The columns are the per-turn prompt only. The fixed instructions and tool
+schemas go once per model as its system instruction (the cacheable prefix,
+printed first); before they were rebuilt into every prompt.
+"""
+import argparse
+import json
+import os
+import time
+from unittest import mock
+
+from common import gateway_events, load_agent
+
+import calendar_window
+import prompt_encoding
+
+
+def _legacy_fit(template, events, aliases, budget=None):
+    return template.replace("{events}", json.dumps(events, indent=2) if events else "[]", 1)
+
+
+def _live_model(agent):
+    import google.generativeai as genai
+    import gemini_models
+
+    genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
+    return gemini_models.build_model(agent.SYSTEM_INSTRUCTION, agent.TOOLS)
+
+
+def _measure(prompt: str, args, model) -> tuple:
+    if model is None:
+        tokens = prompt_encoding.estimate_tokens(prompt)
+        return tokens, (args.base_ms + tokens / 1000 * args.ms_per_1k_tokens) / 1000
+    tokens = model.count_tokens(prompt).total_tokens
+    start = time.perf_counter()
+    model.generate_content(prompt)
+    return tokens, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--base-ms", type=float, default=400)
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=25)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    agent = load_agent("event_agent")
+    model = _live_model(agent) if args.live and os.environ.get("GOOGLE_API_KEY") else None
+    prompt = "move my dentist appointment to friday at 3pm"
+    window = calendar_window.default_window()
+
+    print(f"token budget {prompt_encoding.PROMPT_TOKEN_BUDGET}, "
+          f"{'live Gemini' if model else 'estimated tokens, modelled latency'}")
+    print(f"static prefix (system instruction + tools, cacheable): {agent.STATIC_TOKENS} tokens")
+    print(f"{'events':>7}  {'json tokens':>11} {'json latency':>12}  "
+          f"{'table, no budget':>16}  {'compact tokens':>14} {'compact latency':>15} {'shown':>6}")
+    for size in (int(n) for n in args.sizes.split(",")):
+        events = gateway_events(size)
+
+        with mock.patch.object(prompt_encoding, "fit_events", _legacy_fit):
+            before = agent.build_prompt("bench", "bench", events, window, prompt)
+        with mock.patch.object(prompt_encoding, "PROMPT_TOKEN_BUDGET", 10 ** 9):
+            unbounded = agent.build_prompt("bench", "bench", events, window, prompt)
+        after = agent.build_prompt("bench", "bench", events, window, prompt)
+
+        before_tokens, before_latency = _measure(before, args, model)
+        after_tokens, after_latency = _measure(after, args, model)
+        shown = sum(1 for line in after.splitlines() if line[:1] == "e" and "|" in line)
+        print(f"{size:>7}  {before_tokens:>11} {before_latency:>11.2f}s  "
+              f"{prompt_encoding.estimate_tokens(unbounded):>16}  "
+              f"{after_tokens:>14} {after_latency:>14.2f}s {shown:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Events in a window: full collection GET vs. calendar-query REPORT.
+
+    python bench/bench_range_query.py [--sizes 1000,10000,50000] [--turns 10] [--delay-ms 0]
+
+"full GET" downloads the whole collection, parses it and keeps the events
+in the default window (7 days back, 30 ahead). "calendar-query" sends the
+window as a time-range filter and asks only for the properties the agent
+reads, so the server answers with the matching events alone; the
+multistatus is parsed as it streams in.
+"""
+import argparse
+import datetime as dt
+import statistics
+import time
+
+from common import FakeServer, legacy_parse_ics, load_agent, quiet
+
+import calendar_window
+import caldav_sync
+import http_client
+import metrics
+
+
+def _median_ms(fn, turns: int) -> float:
+    latencies = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1000
+
+
+def _query_bytes() -> float:
+    return sum(r["value"] for r in metrics.snapshot() if r["name"] == "range_query_bytes_total")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--delay-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    agent = load_agent("agent_test")
+    window = calendar_window.default_window()
+    first, last = caldav_sync.ical_utc(window[0]), caldav_sync.ical_utc(window[1])
+
+    print(f"{'events':>7} {'in window':>9} {'GET KiB':>9} {'GET ms':>8} {'query KiB':>10} {'query ms':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with FakeServer("caldav", delay=args.delay_ms / 1000) as server, \
+                http_client.session(server.url, "bench", "bench") as session:
+            agent.base_url = server.url
+            server.seed(size, start=dt.date.today() - dt.timedelta(days=size // 20))
+
+            def full_get():
+                response = session.get(f"{server.url}/bench/cal/")
+                full_get.bytes = len(response.content)
+                return [e for e in legacy_parse_ics(response.text) if e["start_time"] < last and e["end_time"] > first]
+
+            wanted = len(full_get())
+            get_ms = _median_ms(full_get, args.turns)
+
+            metrics.reset()
+            with quiet():
+                found = agent.get_all_calendar_items("bench", "bench", "cal", window)
+                query_bytes = _query_bytes()
+                query_ms = _median_ms(lambda: agent.get_all_calendar_items("bench", "bench", "cal", window), args.turns)
+            assert len(found) == wanted, (len(found), wanted)
+
+        print(f"{size:>7} {wanted:>9} {full_get.bytes / 1024:9.0f} {get_ms:8.1f} "
+              f"{query_bytes / 1024:10.0f} {query_ms:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
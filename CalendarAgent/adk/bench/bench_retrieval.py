@@ -0,0 +1,177 @@
+"""
+Recall against prompt size for event retrieval (event_index) on calendars
+of growing size.
+
+    python bench/bench_retrieval.py [--sizes 100,1000,10000,50000] [--queries 200] [--top-k 1,3,8,16]
+
+Each calendar spreads `size` events over the year around today: weekly
+lectures and labs, exams, appointments and meetings with people, with
+descriptions naming rooms and topics. Queries are update/delete requests
+about an event of the default window, phrased the way users do: the exact
+title, a few of its words, abbreviated or misspelled words, a detail from
+the description, or a repeated title plus its date. The index is fed the
+window's listing, as the agents do.
+
+For each size it prints, for the whole window (prompt_encoding's token
+budget, furthest events dropped first) and for retrieval at each `--top-k`:
+recall (the event the query is about is in the prompt) and the mean prompt
+tokens, then the index's update and search times.
+"""
+import argparse
+import datetime as dt
+import random
+import statistics
+import time
+
+from common import load_agent
+
+import calendar_window
+import event_index
+import prompt_encoding
+
+_COURSES = ["Differential Equations", "Linear Algebra", "Organic Chemistry", "Macroeconomics",
+            "Data Structures", "Operating Systems", "Thermodynamics", "Statistics", "Art History",
+            "Molecular Biology", "Compilers", "Quantum Mechanics", "Spanish Literature", "Microeconomics"]
+_PEOPLE = ["Ana", "Marco", "Priya", "Tomás", "Lena", "Kenji", "Fatima", "Olivia", "Noah", "Chidi",
+           "Sofia", "Mateo", "Hannah", "Yusuf"]
+_APPOINTMENTS = ["Dentist appointment", "Physiotherapy", "Haircut", "Eye exam", "Car service",
+                 "Vet visit for Luna", "Bank appointment", "Passport renewal"]
+_MEETINGS = ["1:1 with {p}", "Coffee with {p}", "Project sync with {p}", "Lunch with {p}",
+             "Thesis meeting with {p}", "Study session with {p}"]
+_ROOMS = ["B204", "Hall C", "Lab 3", "Room 117", "the library", "Auditorium 2", "the east campus"]
+_TOPICS = ["chapter review", "problem set", "midterm prep", "project milestones", "budget",
+           "reading list", "lab report", "travel plans"]
+
+
+def calendar(size: int, seed: int = 7) -> list:
+    """`size` gateway-shaped events over the 182 days before and after today."""
+    rng = random.Random(seed)
+    first = dt.datetime.combine(dt.date.today() - dt.timedelta(days=182), dt.time(8))
+    events = []
+    for i in range(size):
+        kind = rng.random()
+        course = rng.choice(_COURSES)
+        if kind < 0.35:
+            summary = f"{course} {rng.choice(['lecture', 'lab', 'tutorial'])}"
+        elif kind < 0.45:
+            summary = f"{course} {rng.choice(['exam', 'midterm', 'quiz', 'final'])}"
+        elif kind < 0.6:
+            summary = rng.choice(_APPOINTMENTS)
+        else:
+            summary = rng.choice(_MEETINGS).format(p=rng.choice(_PEOPLE))
+        begin = first + dt.timedelta(days=rng.randrange(365), hours=rng.randrange(12), minutes=rng.choice((0, 30)))
+        events.append({
+            "uid": f"ev-{i:06d}",
+            "summary": summary,
+            "description": f"In {rng.choice(_ROOMS)}: {rng.choice(_TOPICS)} and {rng.choice(_TOPICS)}.",
+            "start": begin.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "end": (begin + dt.timedelta(minutes=rng.choice((45, 60, 90)))).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "etag": f'"{i}"',
+            "alarms": [],
+        })
+    return events
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def query_for(event: dict, events: list, rng: random.Random) -> tuple:
+    """(style, request text) about `event`."""
+    title = event["summary"]
+    words = title.split()
+    day = dt.date.fromisoformat(event["start"][:10])
+    twins = sum(1 for e in events if e["summary"] == title)
+    style = rng.choice(["exact", "partial", "abbreviated", "typo", "detail"])
+    if twins > 1:
+        style = "dated"
+    if style == "exact":
+        text = f"move my {title} to friday at 3pm"
+    elif style == "partial":
+        text = f"cancel the {' '.join(words[-2:] if len(words) > 2 else words[:1])}"
+    elif style == "abbreviated":
+        text = f"reschedule {' '.join(w[:4] for w in words)} to next week"
+    elif style == "typo":
+        text = f"delete {' '.join(_typo(w, rng) for w in words)}"
+    elif style == "detail":
+        room = event["description"].split(":")[0].removeprefix("In ")
+        text = f"move the {words[-1]} in {room} to monday"
+    else:
+        text = f"move {title} on {day.strftime('%B')} {day.day} to 4pm"
+    return style, text
+
+
+def _in_prompt(prompt: str, aliases: prompt_encoding.UidAliases, uid: str) -> bool:
+    return f"\n{aliases.alias(uid)}|" in prompt
+
+
+def evaluate(agent, size: int, queries: int, top_ks: list) -> dict:
+    events = calendar(size)
+    window = calendar_window.default_window()
+    first, last = (w.strftime("%Y-%m-%dT%H:%M") for w in window)
+    listed = [e for e in events if first <= e["start"][:16] < last]
+    event_index._indexes.clear()
+    start = time.perf_counter()
+    event_index.remember("bench", listed, window)
+    update_us = (time.perf_counter() - start) / max(len(listed), 1) * 1e6
+
+    rng = random.Random(size)
+    targets = [rng.choice(listed) for _ in range(queries)] if listed else []
+    asks = [(event, *query_for(event, listed, rng)) for event in targets]
+    rows = {"window": ([], [])}
+    rows.update({k: ([], []) for k in top_ks})
+    search_ms, styles = [], {}
+    for event, style, text in asks:
+        aliases = prompt_encoding.UidAliases()
+        prompt = agent.build_prompt("bench", "bench", listed, window, text, aliases)
+        rows["window"][0].append(_in_prompt(prompt, aliases, event["uid"]))
+        rows["window"][1].append(prompt_encoding.estimate_tokens(prompt))
+        for k in top_ks:
+            began = time.perf_counter()
+            shown = event_index.select("bench", listed, text, k=k)
+            search_ms.append((time.perf_counter() - began) * 1000)
+            aliases = prompt_encoding.UidAliases()
+            if shown is None:
+                prompt = agent.build_prompt("bench", "bench", listed, window, text, aliases)
+            else:
+                prompt = agent.build_prompt("bench", "bench", shown, window, text, aliases, total=len(listed))
+            found = _in_prompt(prompt, aliases, event["uid"])
+            rows[k][0].append(found)
+            rows[k][1].append(prompt_encoding.estimate_tokens(prompt))
+            if k == top_ks[-1]:
+                styles.setdefault(style, []).append(found)
+    return {"listed": len(listed), "rows": rows, "update_us": update_us,
+            "search_ms": statistics.median(search_ms) if search_ms else 0.0, "styles": styles}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000,50000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", default="1,3,8,16")
+    args = parser.parse_args()
+
+    agent = load_agent("event_agent")
+    top_ks = [int(k) for k in args.top_k.split(",")]
+    print(f"prompt budget {prompt_encoding.PROMPT_TOKEN_BUDGET} tokens, retrieval table budget "
+          f"{event_index.TOKEN_BUDGET}, {event_index.RECENT_EVENTS} upcoming events, "
+          f"whole window up to {event_index.MIN_EVENTS} events\n")
+    print(f"{'events':>7} {'in window':>9}  {'prompt':<10} {'recall':>7} {'tokens':>7}")
+    for size in (int(n) for n in args.sizes.split(",")):
+        result = evaluate(agent, size, args.queries, top_ks)
+        for name, (found, tokens) in result["rows"].items():
+            label = "window" if name == "window" else f"top-{name}"
+            recall = sum(found) / len(found) if found else 0.0
+            print(f"{size:>7} {result['listed']:>9}  {label:<10} {recall:>7.1%} "
+                  f"{statistics.mean(tokens) if tokens else 0:>7.0f}")
+        per_style = ", ".join(f"{style} {sum(v) / len(v):.0%}" for style, v in sorted(result["styles"].items()))
+        print(f"{'':>18} top-{top_ks[-1]} by phrasing: {per_style}")
+        print(f"{'':>18} index update {result['update_us']:.1f} µs/event, "
+              f"select {result['search_ms']:.2f} ms median\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Load generator for agent_service: throughput and tail latency of whole
+turns for many users at once.
+
+    python bench/bench_service.py [--concurrency 1,8,32] [--clients 64] [--users 200]
+                                  [--requests 2000] [--model-ms 300] [--delay-ms 5]
+
+The service (alarm_agent behind agent_service.py) and a fake Hono gateway
+each run in a child process. Every user gets a StubModel that waits
+--model-ms and then updates one event, so a turn costs one model call plus
+the listing and the PUT. `--clients` connections send `--requests` turns
+between them, spread over `--users` users. concurrency=1 is the old REPL:
+one turn at a time.
+
+503/429 answers (backpressure) are counted separately and left out of the
+latency percentiles. The fake gateway is plain Python too; at high
+concurrency its listing cost shows up in the tail, not the service's.
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import multiprocessing
+import os
+import time
+
+import httpx
+
+from common import FakeServer, StubModel, load_agent, stub_response
+
+import agent_service
+
+
+# ============================================================
+#  CHILD PROCESSES
+# ============================================================
+
+def _serve_gateway(events: int, delay: float, conn):
+    with FakeServer("gateway", delay=delay) as server:
+        server.seed(events)
+        conn.send(server.url)
+        conn.recv()
+
+
+def _serve_agent(gateway_url: str, concurrency: int, queue: int, model_ms: float, conn):
+    agent = load_agent("alarm_agent")
+    agent.API_BASE_URL = gateway_url
+
+    def model_factory(username):
+        update = {"name": "Moved", "summary": "moved by the bench", "start_time": "2030-01-01T09:00:00",
+                  "end_time": "2030-01-01T10:00:00", "username": username, "password": username,
+                  "event_uid": "e1"}
+        return StubModel([stub_response([("update_alarm", update)])], model_ms / 1000)
+
+    service = agent_service.AgentService(agent, model_factory, concurrency, queue)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        asyncio.run(service.serve("127.0.0.1", 0, ready=conn.send))
+
+
+@contextlib.contextmanager
+def _process(target, *args):
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=target, args=args + (child,), daemon=True)
+    process.start()
+    try:
+        yield parent.recv()
+    finally:
+        if target is _serve_agent:
+            process.terminate()
+        else:
+            parent.send("stop")
+        process.join(5)
+
+
+# ============================================================
+#  LOAD
+# ============================================================
+
+async def _load(url: str, clients: int, users: int, requests: int) -> dict:
+    latencies, statuses = [], collections.Counter()
+    sent = iter(range(requests))
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=300) as client:
+        async def worker():
+            for i in sent:
+                user = f"user{i % users}"
+                start = time.perf_counter()
+                response = await client.post("/turn", json={"user": user, "password": user,
+                                                            "prompt": "move my first event"})
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "latencies": sorted(latencies), "statuses": statuses}
+
+
+def _percentile(values: list, p: float) -> float:
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--queue", type=int, default=agent_service.QUEUE_SIZE)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--model-ms", type=float, default=300)
+    parser.add_argument("--delay-ms", type=float, default=5)
+    parser.add_argument("--events", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.requests} turns, {args.clients} clients, {args.users} users, "
+          f"model {args.model_ms:.0f} ms, gateway {args.delay_ms:.0f} ms/request, queue {args.queue}")
+    print(f"{'concurrency':>11} {'turns/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'ok':>6} {'503':>5} {'429':>5}")
+    with _process(_serve_gateway, args.events, args.delay_ms / 1000) as gateway_url:
+        for concurrency in (int(n) for n in args.concurrency.split(",")):
+            with _process(_serve_agent, gateway_url, concurrency, args.queue, args.model_ms) as port:
+                result = asyncio.run(_load(f"http://127.0.0.1:{port}", args.clients, args.users, args.requests))
+            latencies, statuses = result["latencies"], result["statuses"]
+            print(f"{concurrency:>11} {len(latencies) / result['elapsed']:8.1f}"
+                  + "".join(f" {_percentile(latencies, p) * 1000:8.0f}" for p in (50, 90, 99))
+                  + f" {statuses[200]:>6} {statuses[503]:>5} {statuses[429]:>5}")
+
+
+if __name__ == "__main__":
+    main()
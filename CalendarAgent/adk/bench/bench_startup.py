@@ -0,0 +1,100 @@
+"""
+Startup cost of the agent package, checked against a budget.
+
+    python bench/bench_startup.py [--package test] [--runs 7]
+
+For each entry point, runs `python -X importtime -c "import <module>"` in a
+fresh interpreter `--runs` times (after one untimed run that writes the
+bytecode caches) and reports the median cumulative import time of the
+package's own modules and the heaviest imports under them. Exits non-zero
+if a module goes over its BUDGETS entry or imports one of HEAVY (those
+must stay lazy, loaded only when a model, an HTTP client, a sync
+`requests` session or the ADK planner is actually used). `--package prosweet_agents`
+checks an installed copy instead of the source tree.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ADK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median cumulative import time allowed per module, in milliseconds: about
+# twice what they take (the agents ~120 ms, mostly asyncio and protobuf), so a
+# busy machine does not fail the check but an eager heavy import does.
+BUDGETS = {
+    "": 10,               # the package itself: root_agent is lazy
+    "cli": 15,            # `prosweet --help`
+    "event_agent": 250,
+    "alarm_agent": 250,
+    "agent_service": 250,
+}
+
+# Modules none of the entry points above may import. httpx loads its CLI
+# (click, rich, pygments) with it: ~75 ms, paid on the first request instead.
+HEAVY = ("google.generativeai", "google.genai", "google.adk", "icalendar", "requests", "httpx", "click")
+
+
+def _importtime(module: str) -> list:
+    """(self µs, cumulative µs, depth, name) for every import `import module` makes."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ADK_DIR, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, total, name = line[len("import time:"):].split("|")
+        rows.append((int(own), int(total), (len(name) - len(name.lstrip())) // 2, name.strip()))
+    return rows
+
+
+def _measure(package: str, module: str, runs: int) -> tuple:
+    target = f"{package}.{module}" if module else package
+    _importtime(target)  # warm-up: compiles and caches the bytecode
+    totals, rows = [], []
+    for _ in range(runs):
+        rows = _importtime(target)
+        totals.append(sum(total for _, total, depth, name in rows
+                          if depth == 0 and (name == package or name.startswith(package + "."))))
+    names = {name for *_, name in rows}
+    heavy = [root for root in HEAVY if any(name == root or name.startswith(root + ".") for name in names)]
+    slowest = sorted(((own, name) for own, _, _, name in rows), reverse=True)[:3]
+    return statistics.median(totals) / 1000, heavy, slowest
+
+
+def _wall_ms(args: list, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ADK_DIR, capture_output=True, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--package", default="test")
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'module':<16} {'import ms':>10} {'budget':>7}  slowest own imports")
+    for module, budget in BUDGETS.items():
+        ms, heavy, slowest = _measure(args.package, module, args.runs)
+        over = ms > budget or heavy
+        failed |= bool(over)
+        top = ", ".join(f"{name} {own / 1000:.0f}" for own, name in slowest)
+        print(f"{module or '(package)':<16} {ms:10.1f} {budget:7}  {top}{'  ❌ OVER' if over else ''}")
+        if heavy:
+            print(f"{'':<16} imports {', '.join(heavy)}")
+
+    bare = _wall_ms(["-c", "pass"], args.runs)
+    help_ms = _wall_ms(["-m", f"{args.package}.cli", "--help"], args.runs)
+    print(f"\n`prosweet --help`: {help_ms:.0f} ms wall ({help_ms - bare:.0f} ms over a bare interpreter)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Time to first output of an event agent turn, blocking generate_content
+against streaming (PROSWEET_STREAM=1: text shown and function calls run as
+they arrive).
+
+    python bench/bench_streaming.py [--model-ms 800] [--first-chunk 0.25] [--delay-ms 20] [--runs 5]
+
+The StubModel takes `--model-ms` per answer; streamed, its first chunk
+arrives after `--first-chunk` of that and the rest are spread until the
+end, so both modes wait as long for the whole answer. The scripted answers
+are a text reply, one update, and three creates. "first output" is the
+first reply text printed or the first tool call done, "last call" the last
+tool call done, "turn" the whole turn; medians over `--runs` turns against
+a fake gateway with `--delay-ms` per request.
+"""
+import argparse
+import contextlib
+import datetime as dt
+import io
+import statistics
+import sys
+import time
+from unittest import mock
+
+from common import FakeServer, StubModel, load_agent, stub_response
+
+import gemini_models
+import http_client
+
+REPLY = ("I could not find an event called 'Team offsite' in your calendar between today and next month, "
+         "so nothing was changed. If it is further out, tell me roughly when and I will look there.")
+
+
+def scenarios() -> dict:
+    day = dt.date.today() + dt.timedelta(days=1)
+
+    def times(hour):
+        return {"start_time": f"{day}T{hour:02d}:00:00", "end_time": f"{day}T{hour + 1:02d}:00:00",
+                "username": "bench", "password": "bench"}
+
+    return {
+        "text reply": stub_response(text=REPLY),
+        "1 update": stub_response([("update_event", dict(times(9), name="Moved", summary="moved", event_uid="e1"))]),
+        "3 creates": stub_response([("create_event", dict(times(h), name=f"Added {h}", summary="added"))
+                                    for h in (10, 12, 14)]),
+    }
+
+
+class _Clock(io.StringIO):
+    """stdout that notes when the reply's first words are printed."""
+
+    def __init__(self, start: float):
+        super().__init__()
+        self.start = start
+        self.first = None
+
+    def write(self, text):
+        if self.first is None and REPLY[:10] in self.getvalue() + text:
+            self.first = time.perf_counter() - self.start
+        return super().write(text)
+
+
+def run_turn(agent, response, model_ms: float, first_chunk: float) -> tuple:
+    """(first output, last call, turn) in ms for one turn."""
+    model = StubModel([response], latency=model_ms / 1000, first_chunk=first_chunk)
+    done = []
+
+    def timed(handler):
+        async def wrapper(*args, **kwargs):
+            result = await handler(*args, **kwargs)
+            done.append(time.perf_counter() - start)
+            return result
+        return wrapper
+
+    start = time.perf_counter()
+    clock = _Clock(start)
+    with contextlib.ExitStack() as stack:
+        for name in ("create_event_async", "update_event_async", "delete_event_async"):
+            stack.enter_context(mock.patch.object(agent, name, timed(getattr(agent, name))))
+        stack.enter_context(contextlib.redirect_stdout(clock))
+        http_client.run_sync(agent.ask_gemini_async("bench", "bench", model, "could you sort out my week"))
+    turn = time.perf_counter() - start
+    first = min(t for t in (clock.first, done[0] if done else None) if t is not None)
+    return first * 1000, (max(done) if done else turn) * 1000, turn * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model-ms", type=float, default=800)
+    parser.add_argument("--first-chunk", type=float, default=0.25)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    agent = load_agent("event_agent")
+    print(f"model {args.model_ms:g} ms (first chunk at {args.first_chunk:.0%}), gateway {args.delay_ms:g} ms/request, "
+          f"median of {args.runs}\n")
+    print(f"{'answer':<11} {'mode':<9} {'first output':>13} {'last call':>10} {'turn':>8}")
+    with FakeServer("gateway", delay=args.delay_ms / 1000) as server:
+        agent.API_BASE_URL = server.url
+        server.seed(20, start=dt.date.today(), per_day=4)
+        for name, response in scenarios().items():
+            medians = {}
+            for gemini_models.STREAM_RESPONSES in (False, True):
+                samples = [run_turn(agent, response, args.model_ms, args.first_chunk) for _ in range(args.runs)]
+                mode = "stream" if gemini_models.STREAM_RESPONSES else "blocking"
+                medians[mode] = [statistics.median(column) for column in zip(*samples)]
+                first, last, turn = medians[mode]
+                print(f"{name:<11} {mode:<9} {first:>10.0f} ms {last:>7.0f} ms {turn:>5.0f} ms")
+            print(f"{'':<11} first output {medians['blocking'][0] / medians['stream'][0]:.1f}x sooner streamed\n")
+    gemini_models.STREAM_RESPONSES = False
+
+
+if __name__ == "__main__":
+    sys.exit(main())
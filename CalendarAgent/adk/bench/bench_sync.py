@@ -0,0 +1,69 @@
+"""
+Per-turn calendar fetch: full collection GET vs. incremental sync.
+
+    python bench/bench_sync.py [--sizes 100,1000,10000] [--turns 20]
+
+"full GET" is what agent_test did before: download the whole collection and
+re-parse it every turn. "sync" keeps a replica and issues one
+sync-collection REPORT per turn; one event is changed between turns so the
+REPORT is never empty.
+"""
+import argparse
+import statistics
+import time
+
+from common import FakeServer, event_ics, legacy_parse_ics, load_agent, quiet
+
+import caldav_sync
+import http_client
+
+
+def _full_get(base_url: str):
+    with http_client.session(base_url, "bench", "bench") as session:
+        response = session.get(f"{base_url}/bench/cal/")
+    return legacy_parse_ics(response.text)
+
+
+def _median_ms(fn, turns: int, between) -> float:
+    latencies = []
+    for i in range(turns):
+        between(i)
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+
+    agent = load_agent("agent_test")
+    print(f"{'events':>8}  {'full GET ms':>12}  {'sync ms':>9}  {'initial sync ms':>16}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with FakeServer("caldav") as server:
+            agent.base_url = server.url
+            server.seed(size)
+
+            def touch(i):
+                uid = f"seed-{i:07d}"
+                ics = event_ics(uid, f"Touched {i}", "20250101T090000Z", "20250101T100000Z")
+                server.store[uid] = (f'"t{i}"', {}, ics)
+                server.version += 1
+                server.changes.append((server.version, uid))
+
+            full = _median_ms(lambda: _full_get(server.url), args.turns, touch)
+            with quiet():
+                start = time.perf_counter()
+                agent.get_all_calendar_items("bench", "bench", "cal")
+                initial = (time.perf_counter() - start) * 1000
+                incremental = _median_ms(lambda: agent.get_all_calendar_items("bench", "bench", "cal"),
+                                         args.turns, touch)
+            caldav_sync._replicas.clear()
+        print(f"{size:>8}  {full:>12.2f}  {incremental:>9.2f}  {initial:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
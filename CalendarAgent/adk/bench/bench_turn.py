@@ -0,0 +1,234 @@
+"""
+Full agent turn, offline: per-phase latency, peak memory and prompt size as
+the calendar grows.
+
+    python bench/bench_turn.py [--sizes 10,100,1000,10000] [--agents alarm_agent,event_agent,agent_test]
+    python bench/bench_turn.py --sizes 1000000 --agents alarm_agent --no-memory
+
+The gateway agents talk to a fake Hono `/events` API and agent_test to a fake
+Radicale collection, each served from a child process so the agent's timings
+and memory are not mixed with the server's. `genai.GenerativeModel` is
+replaced by a StubModel that answers with one scripted update of the first
+listed event. Events are spread over two years centred on today.
+
+Each turn is split into exclusive phases:
+
+    fetch     listing the calendar (network, sync bookkeeping)
+    parse     JSON / iCalendar / multistatus decoding
+    prompt    building the prompt and the event table
+    model     the stub model call (--model-ms of simulated latency)
+    dispatch  decoding and routing the function calls
+    write     the create/update/delete request itself
+
+"cold" is the first turn (empty caches and replica), "warm" the next one.
+Memory is a second pass under tracemalloc (skip it with --no-memory).
+"""
+import argparse
+import contextlib
+import datetime as dt
+import functools
+import inspect
+import multiprocessing
+import time
+import tracemalloc
+from collections import defaultdict
+from unittest import mock
+
+import httpx
+
+from common import FakeServer, StubModel, load_agent, quiet, stub_response
+
+import caldav_sync
+import dispatch
+import http_client
+import prompt_encoding
+
+PHASES = ("fetch", "parse", "prompt", "model", "dispatch", "write")
+
+UPDATE = {"name": "Moved", "summary": "moved by the bench", "start_time": "2030-01-01T09:00:00",
+          "end_time": "2030-01-01T10:00:00", "username": "bench", "password": "bench", "event_uid": "e1"}
+
+# agent module -> (server kind, listing, writes, scripted call)
+AGENTS = {
+    "alarm_agent": ("gateway", "get_all_events_async",
+                    ("create_alarm_async", "update_alarm_async", "delete_alarm_async"),
+                    ("update_alarm", UPDATE)),
+    "event_agent": ("gateway", "get_all_calendar_items_async",
+                    ("create_event_async", "update_event_async", "delete_event_async"),
+                    ("update_event", UPDATE)),
+    "agent_test": ("caldav", "get_all_calendar_items_async",
+                   ("create_task_async", "update_task_async", "delete_task_async"),
+                   ("update_task", dict(UPDATE, calendar_id="bench"))),
+}
+
+
+# ============================================================
+#  PHASE TIMER
+# ============================================================
+
+class Phases:
+    """
+    Exclusive time per phase: a phase nested in another (parse inside fetch)
+    is subtracted from its parent. One turn runs one call at a time, so a
+    plain stack is enough.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self._stack = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.totals[name] += elapsed - self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def wrap(self, func, name: str):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def timed(*args, **kwargs):
+                with self.phase(name):
+                    return await func(*args, **kwargs)
+        elif inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def timed(*args, **kwargs):
+                with self.phase(name):
+                    return iter(list(func(*args, **kwargs)))
+        else:
+            @functools.wraps(func)
+            def timed(*args, **kwargs):
+                with self.phase(name):
+                    return func(*args, **kwargs)
+        return timed
+
+    def reset(self):
+        self.totals.clear()
+
+
+def _instrument(agent, name: str, phases: Phases) -> contextlib.ExitStack:
+    _, listing, writes, _ = AGENTS[name]
+    patches = [
+        (agent, listing, "fetch"),
+        (httpx.Response, "json", "parse"),
+        (caldav_sync, "parse_ics", "parse"),
+        (caldav_sync, "_parse_multistatus", "parse"),
+        (prompt_encoding, "fit_events", "prompt"),
+        (dispatch, "run_calls", "dispatch"),
+    ] + [(agent, write, "write") for write in writes]
+    if hasattr(agent, "build_prompt"):
+        patches.append((agent, "build_prompt", "prompt"))
+
+    stack = contextlib.ExitStack()
+    for owner, attr, phase in patches:
+        stack.enter_context(mock.patch.object(owner, attr, phases.wrap(getattr(owner, attr), phase)))
+    return stack
+
+
+# ============================================================
+#  SERVER PROCESS
+# ============================================================
+
+def _serve(kind: str, count: int, conn):
+    per_day = max(10, count // 730)
+    start = dt.date.today() - dt.timedelta(days=count // per_day // 2)
+    with FakeServer(kind) as server:
+        server.seed(count, start, per_day)
+        conn.send(server.url)
+        conn.recv()
+
+
+@contextlib.contextmanager
+def _server(kind: str, count: int):
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(kind, count, child), daemon=True)
+    process.start()
+    try:
+        yield parent.recv()
+    finally:
+        parent.send("stop")
+        process.join(5)
+
+
+# ============================================================
+#  TURNS
+# ============================================================
+
+def _turn(agent, name: str, model):
+    if name == "agent_test":
+        coro = agent.ask_gemini_async("bench", "bench", "bench", model, "move my first event")
+    else:
+        coro = agent.ask_gemini_async("bench", "bench", model, "move my first event")
+    with quiet():
+        return http_client.run_sync(coro)
+
+
+def _reset_state():
+    caldav_sync._replicas.clear()
+    http_client.close_all_sessions()
+
+
+def run(name: str, size: int, args) -> dict:
+    kind, _, _, call = AGENTS[name]
+    agent = load_agent(name)
+    phases = Phases()
+    rows = {}
+
+    with _server(kind, size) as url:
+        if kind == "gateway":
+            agent.API_BASE_URL = url
+        else:
+            agent.base_url = url
+
+        _reset_state()
+        with _instrument(agent, name, phases):
+            for label in ("cold", "warm"):
+                model = StubModel([stub_response([call])], args.model_ms / 1000)
+                phases.reset()
+                model.generate_content_async = phases.wrap(model.generate_content_async, "model")
+                start = time.perf_counter()
+                _turn(agent, name, model)
+                total = time.perf_counter() - start
+                prompt = model.prompts[-1][0] if model.prompts else ""
+                rows[label] = {**{p: phases.totals[p] for p in PHASES}, "total": total,
+                               "tokens": prompt_encoding.estimate_tokens(prompt), "peak": None}
+
+        if not args.no_memory:
+            _reset_state()
+            for label in ("cold", "warm"):
+                model = StubModel([stub_response([call])], args.model_ms / 1000)
+                tracemalloc.start()
+                _turn(agent, name, model)
+                rows[label]["peak"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000,10000")
+    parser.add_argument("--agents", default=",".join(AGENTS))
+    parser.add_argument("--model-ms", type=float, default=0)
+    parser.add_argument("--no-memory", action="store_true")
+    args = parser.parse_args()
+
+    header = (f"{'agent':<12} {'events':>8} {'turn':<5}" + "".join(f" {p:>9}" for p in PHASES)
+              + f" {'total':>9} {'peak MB':>8} {'tokens':>7}")
+    print("times in ms")
+    print(header)
+    for name in args.agents.split(","):
+        for size in (int(n) for n in args.sizes.split(",")):
+            for label, row in run(name, size, args).items():
+                peak = f"{row['peak'] / 2 ** 20:8.1f}" if row["peak"] is not None else f"{'-':>8}"
+                print(f"{name:<12} {size:>8} {label:<5}"
+                      + "".join(f" {row[p] * 1000:9.1f}" for p in PHASES)
+                      + f" {row['total'] * 1000:9.1f} {peak} {row['tokens']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Write-behind journal: how long a write holds up the turn, and how long it
+takes to reach the server.
+
+    python bench/bench_write_behind.py [--writes 200] [--delay-ms 50] [--outage 1.0]
+
+Creates `--writes` events through event_agent against a fake gateway that
+takes `--delay-ms` per request, first directly (the turn waits for the
+POST) and then with PROSWEET_WRITE_BEHIND (the turn waits for the journal
+append). The last part takes the gateway away for `--outage` seconds
+while writes keep coming and reports that none were lost.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from common import FakeServer, load_agent, quiet
+
+import http_client
+import write_behind
+
+
+def _create(agent, i: int):
+    return agent.create_event(f"Bench #{i}", "", "2030-01-01T09:00:00", "2030-01-01T10:00:00", "bench", "bench")
+
+
+def _acks(agent, writes: int) -> list:
+    seconds = []
+    for i in range(writes):
+        start = time.perf_counter()
+        _create(agent, i)
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--delay-ms", type=float, default=50)
+    parser.add_argument("--outage", type=float, default=1.0)
+    args = parser.parse_args()
+
+    agent = load_agent("event_agent")
+    write_behind.BACKOFF_BASE = 0.1
+    write_behind._journal = write_behind.Journal(os.path.join(tempfile.mkdtemp(), "journal.sqlite3"))
+
+    with FakeServer("gateway", delay=args.delay_ms / 1000) as server, quiet():
+        agent.API_BASE_URL = server.url
+        direct = _acks(agent, args.writes)
+
+        server.store.clear()
+        write_behind.ENABLED = True
+        start = time.perf_counter()
+        queued = _acks(agent, args.writes)
+        http_client.run_sync(write_behind.drain(120))
+        applied = time.perf_counter() - start
+        landed = len(server.store)
+
+        server.store.clear()
+        url, agent.API_BASE_URL = server.url, "http://127.0.0.1:9"  # nothing listens there
+        outage = _acks(agent, args.writes // 4)
+        time.sleep(args.outage)
+        during = write_behind.stats()
+        agent.API_BASE_URL = url
+        http_client.run_sync(write_behind.drain(120))
+        after = write_behind.stats()
+        recovered = len(server.store)
+
+    print(f"{args.writes} creates, gateway {args.delay_ms:.0f} ms/request")
+    print(f"  direct:        {statistics.mean(direct) * 1000:7.2f} ms per write in the turn")
+    print(f"  write-behind:  {statistics.mean(queued) * 1000:7.2f} ms per write in the turn "
+          f"(p99 {sorted(queued)[int(0.99 * len(queued))] * 1000:.2f} ms), "
+          f"all {landed} applied {applied:.2f} s after the first")
+    print(f"  outage {args.outage:.1f} s: {len(outage)} writes acknowledged in "
+          f"{statistics.mean(outage) * 1000:.2f} ms each; depth {during['depth']} "
+          f"(lag {during['lag_seconds']:.1f} s) -> {after['depth']} after, {recovered} applied, "
+          f"{after['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
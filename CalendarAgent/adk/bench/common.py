@@ -0,0 +1,538 @@
+import asyncio
+import base64
+import contextlib
+import datetime as dt
+import importlib.util
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+AGENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test")
+if AGENT_DIR not in sys.path:
+    sys.path.insert(0, AGENT_DIR)
+
+# Benchmarks start from empty replicas unless they opt into the on-disk store.
+os.environ.setdefault("PROSWEET_EVENT_STORE", "0")
+
+
+def load_agent(name: str):
+    """Import one of the agent scripts (e.g. `alarm_agent`, `agent_test`) as a module."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(AGENT_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _instant(value: str) -> dt.datetime:
+    """Parse an ISO or iCalendar UTC timestamp."""
+    if "-" not in value:
+        value = dt.datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S").isoformat()
+    parsed = dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=dt.timezone.utc)
+
+
+def iso_utc(ical_time: str) -> str:
+    """20250101T090000Z -> 2025-01-01T09:00:00.000Z (how the gateway serialises dates)."""
+    return _instant(ical_time).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def legacy_parse_ics(ics_data: str) -> list:
+    """The split + re.search parser agent_test.get_all_calendar_items used before ical_stream."""
+    events = []
+    for raw in ics_data.split("BEGIN:VEVENT")[1:]:
+        uid = re.search(r"UID:(.+)", raw)
+        summary = re.search(r"SUMMARY:(.+)", raw)
+        description = re.search(r"DESCRIPTION:(.+)", raw)
+        dtstart = re.search(r"DTSTART.*:(\d+T\d+Z?)", raw)
+        dtend = re.search(r"DTEND.*:(\d+T\d+Z?)", raw)
+        events.append({
+            "uid": uid.group(1).strip() if uid else None,
+            "summary": summary.group(1).strip() if summary else None,
+            "description": description.group(1).strip() if description else None,
+            "start_time": dtstart.group(1).strip() if dtstart else None,
+            "end_time": dtend.group(1).strip() if dtend else None,
+        })
+    return events
+
+
+def legacy_to_safe_json(obj):
+    """alarm_agent.to_safe_json before the schema-driven decoder (kept for comparison)."""
+    if isinstance(obj, dict):
+        return {k: legacy_to_safe_json(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [legacy_to_safe_json(v) for v in obj]
+    elif hasattr(obj, "to_dict"):
+        return legacy_to_safe_json(obj.to_dict())
+    elif hasattr(obj, "_pb"):
+        return legacy_to_safe_json(obj._pb)
+    elif hasattr(obj, "__iter__") and not isinstance(obj, (str, bytes)):
+        try:
+            return [legacy_to_safe_json(v) for v in obj]
+        except Exception:
+            return str(obj)
+    else:
+        try:
+            json.dumps(obj)
+            return obj
+        except TypeError:
+            return str(obj)
+
+
+def legacy_to_dict_safe(obj):
+    """alarm_agent.to_dict_safe before the schema-driven decoder (kept for comparison)."""
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    if hasattr(obj, "items"):
+        return {k: legacy_to_dict_safe(v) for k, v in obj.items()}
+    if hasattr(obj, "__iter__") and not isinstance(obj, (str, bytes, dict)):
+        return [legacy_to_dict_safe(v) for v in obj]
+    try:
+        return json.loads(json.dumps(obj, default=str))
+    except Exception:
+        return str(obj)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the agents' progress prints while a benchmark runs."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+_TITLES = ["Team standup", "Dentist appointment", "Project review", "Lunch with Sam", "Gym",
+           "Differential Equations exam", "1:1 with manager", "Grocery run", "Book club", "Flight to Denver"]
+
+
+def gateway_events(count: int, start: dt.datetime = None) -> list:
+    """
+    `count` events shaped like the gateway's GET /events items (UUID uids,
+    href/etag, a paragraph of description, an alarm on every third event),
+    spread over the days after `start` (default: today).
+    """
+    start = start or dt.datetime.combine(dt.date.today(), dt.time(8))
+    events = []
+    for i in range(count):
+        day, slot = divmod(i, 8)
+        begin = start + dt.timedelta(days=day, hours=slot)
+        uid = str(uuid.UUID(int=i + 1))
+        event = {
+            "uid": uid,
+            "href": f"/bench/calendar/{uid}.ics",
+            "etag": f'"{i:x}-{uid[:8]}"',
+            "summary": f"{_TITLES[i % len(_TITLES)]} #{i}",
+            "description": ("Agenda: go over the open items from last time, agree on owners and dates, "
+                            "and leave ten minutes at the end for questions. Bring the printed notes."),
+            "start": begin.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "end": (begin + dt.timedelta(minutes=45)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "alarms": [],
+        }
+        if i % 3 == 0:
+            event["alarms"] = [{"action": "DISPLAY", "trigger": "-PT10M", "description": "Starts in 10 minutes"}]
+        events.append(event)
+    return events
+
+
+# ============================================================
+#  STUB MODEL
+# ============================================================
+
+def stub_response(calls: list = (), text: str = ""):
+    """
+    Something shaped like a GenerateContentResponse: one candidate whose
+    parts are the given (name, args) function calls, or a text part.
+    """
+    parts = [SimpleNamespace(function_call=SimpleNamespace(name=name, args=args), text="")
+             for name, args in calls]
+    if text or not parts:
+        parts.append(SimpleNamespace(function_call=None, text=text))
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))])
+
+
+class StubModel:
+    """
+    Stand-in for genai.GenerativeModel that plays back `responses` in order
+    (repeating the last one) after sleeping `latency` seconds per call.
+    With stream=True the response arrives as a StubStream instead.
+    """
+
+    def __init__(self, responses: list, latency: float = 0.0, first_chunk: float = 0.25):
+        self.responses = list(responses)
+        self.latency = latency
+        self.first_chunk = first_chunk
+        self.calls = 0
+        self.chats = 0
+        self.prompts = []
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        self.prompts.append(contents)
+        response = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        if stream:
+            return StubStream(response, self.latency, self.first_chunk)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return response
+
+    def start_chat(self, **kwargs):
+        self.chats += 1
+        return StubChat(self)
+
+
+class StubStream:
+    """
+    A streamed stub response: one chunk per function call and per few words
+    of text, the first after `first_chunk` of `latency` and the last at
+    `latency`, so the whole answer takes as long as the blocking call. Holds
+    the whole response's candidates, like genai's once read to the end.
+    """
+
+    def __init__(self, response, latency: float, first_chunk: float, words_per_chunk: int = 4):
+        self.candidates = response.candidates
+        self.latency = latency
+        self.first_chunk = first_chunk
+        self.chunks = []
+        for part in response.candidates[0].content.parts:
+            if part.function_call:
+                self.chunks.append(part)
+                continue
+            words = part.text.split(" ")
+            for i in range(0, len(words), words_per_chunk):
+                text = " ".join(words[i:i + words_per_chunk]) + (" " if i + words_per_chunk < len(words) else "")
+                self.chunks.append(SimpleNamespace(function_call=None, text=text))
+
+    async def __aiter__(self):
+        first = self.latency * self.first_chunk
+        step = (self.latency - first) / max(len(self.chunks) - 1, 1)
+        for i, part in enumerate(self.chunks):
+            await asyncio.sleep(first if i == 0 else step)
+            yield SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+        if len(self.chunks) < 2:
+            await asyncio.sleep(self.latency - first)  # the end of the answer still takes `latency`
+
+
+class StubChat:
+    """Stand-in for genai.ChatSession: plays the model's script, each message goes to `model.prompts`."""
+
+    def __init__(self, model: StubModel):
+        self.model = model
+        self.history = []
+
+    async def send_message_async(self, content, **kwargs):
+        response = await self.model.generate_content_async(content, **kwargs)
+        self.history += [content, response]
+        return response
+
+
+# ============================================================
+#  FAKE SERVER (Hono /events API + Radicale collection)
+# ============================================================
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like Radicale and Bun
+    disable_nagle_algorithm = True  # avoid 40ms delayed-ACK stalls on reused sockets
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _count(self):
+        with self.server.lock:
+            self.server.requests += 1
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    # ---------------- Hono gateway ----------------
+
+    def _gateway(self):
+        store = self.server.store
+        path, _, query = self.path.partition("?")
+        if self.command == "GET" and path == "/events":
+            params = {k: v[0] for k, v in parse_qs(query).items()}
+            events = [dict(e, uid=uid, etag=etag) for uid, (etag, e, _) in list(store.items())]
+            if params.get("all") != "true" and ("start" in params or "end" in params):
+                start = _instant(params.get("start", "0001-01-01T00:00:00Z"))
+                end = _instant(params.get("end", "9999-12-31T00:00:00Z"))
+                events = [e for e in events if _instant(e["start"]) < end and _instant(e["end"]) > start]
+            return self._send(200, json.dumps({"events": events}).encode())
+        if self.command == "POST" and path.endswith("/events"):
+            data = json.loads(self._body() or b"{}")
+            uid = data.get("uid") or str(uuid.uuid4())
+            etag = f'"{uuid.uuid4().hex}"'
+            store[uid] = (etag, data, None)
+            return self._send(200, json.dumps({"created": {"uid": uid, "etag": etag}}).encode())
+        if self.command == "PUT" and path.startswith("/events/"):
+            data = json.loads(self._body() or b"{}")
+            uid = path.rsplit("/", 1)[1]
+            current = store.get(uid)
+            if not current:
+                return self._send(404, json.dumps({"ok": False, "status": 404}).encode())
+            if_match = self.headers.get("If-Match")
+            if if_match and current[0] != if_match:
+                return self._send(412, json.dumps({"ok": False, "status": 412}).encode())
+            etag = f'"{uuid.uuid4().hex}"'
+            store[uid] = (etag, data, None)
+            return self._send(200, json.dumps({"updated": {"uid": uid, "etag": etag}}).encode())
+        if self.command == "DELETE" and path.startswith("/events/"):
+            found = store.pop(path.rsplit("/", 1)[1], None)
+            return self._send(200 if found else 404, json.dumps({"ok": bool(found)}).encode())
+        return self._send(404)
+
+    # ---------------- Radicale ----------------
+
+    def _multistatus(self, responses: list, sync_token: str = None):
+        body = ['<?xml version="1.0" encoding="utf-8"?>',
+                '<D:multistatus xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav" '
+                'xmlns:CS="http://calendarserver.org/ns/">']
+        body.extend(responses)
+        if sync_token:
+            body.append(f"<D:sync-token>{sync_token}</D:sync-token>")
+        body.append("</D:multistatus>")
+        return self._send(207, "".join(body).encode(), "application/xml; charset=utf-8")
+
+    @staticmethod
+    def _propstat(href: str, props: str) -> str:
+        return (f"<D:response><D:href>{href}</D:href><D:propstat><D:prop>{props}</D:prop>"
+                "<D:status>HTTP/1.1 200 OK</D:status></D:propstat></D:response>")
+
+    def _report(self, collection: str):
+        server = self.server
+        root = ET.fromstring(self._body())
+        kind = root.tag.rsplit("}", 1)[-1]
+        if kind == "sync-collection":
+            token = root.findtext("{DAV:}sync-token") or ""
+            since = int(token.rsplit("/", 1)[1]) if token else 0
+            if since > server.version:
+                return self._send(403)
+            responses = []
+            with server.lock:
+                if since:
+                    changed = {uid for version, uid in server.changes if version > since}
+                else:
+                    changed = set(server.store)
+                for uid in changed:
+                    href = f"{collection}{uid}.ics"
+                    if uid in server.store:
+                        responses.append(self._propstat(href, f"<D:getetag>{server.store[uid][0]}</D:getetag>"))
+                    else:
+                        responses.append(f"<D:response><D:href>{href}</D:href>"
+                                         "<D:status>HTTP/1.1 404 Not Found</D:status></D:response>")
+                token = f"http://fake/sync/{server.version}"
+            return self._multistatus(responses, token)
+        if kind == "calendar-multiget":
+            responses = []
+            for href in root.iter("{DAV:}href"):
+                uid = href.text.rsplit("/", 1)[1].removesuffix(".ics")
+                current = server.store.get(uid)
+                if current:
+                    data = current[2].replace("&", "&amp;").replace("<", "&lt;")
+                    responses.append(self._propstat(
+                        href.text, f"<D:getetag>{current[0]}</D:getetag><C:calendar-data>{data}</C:calendar-data>"))
+            return self._multistatus(responses)
+        if kind == "calendar-query":
+            return self._calendar_query(collection, root)
+        return self._send(501)
+
+    @staticmethod
+    def _value(ics: str, name: str) -> str:
+        at = ics.index(":", ics.index("\r\n" + name))
+        return ics[at + 1:ics.index("\r\n", at)]
+
+    def _calendar_query(self, collection: str, root):
+        """VEVENT time-range filter and calendar-data property trimming, on UTC DTSTART/DTEND."""
+        time_range = next(root.iter("{urn:ietf:params:xml:ns:caldav}time-range"), None)
+        start, end = (time_range.get("start"), time_range.get("end")) if time_range is not None else ("", "~")
+        keep = {p.get("name") for p in root.iter("{urn:ietf:params:xml:ns:caldav}prop")}
+        lines_kept = keep | {"BEGIN", "END", ""}
+        responses = []
+        for uid, (etag, _, ics) in list(self.server.store.items()):
+            begin, finish = self._value(ics, "DTSTART"), self._value(ics, "DTEND")
+            if not (begin < end and finish > start):
+                continue
+            if keep:
+                ics = "\r\n".join(line for line in ics.split("\r\n")
+                                   if re.split("[;:]", line, 1)[0] in lines_kept)
+            data = ics.replace("&", "&amp;").replace("<", "&lt;")
+            responses.append(self._propstat(
+                f"{collection}{uid}.ics", f"<D:getetag>{etag}</D:getetag><C:calendar-data>{data}</C:calendar-data>"))
+        return self._multistatus(responses)
+
+    def _propfind(self, collection: str):
+        server = self.server
+        if collection.count("/") == 2:  # a user's home: its one calendar
+            calendar = ("<D:resourcetype><D:collection/>"
+                        '<C:calendar xmlns:C="urn:ietf:params:xml:ns:caldav"/></D:resourcetype>')
+            return self._multistatus([self._propstat(collection, "<D:resourcetype><D:collection/></D:resourcetype>"),
+                                      self._propstat(f"{collection}{server.calendar}/", calendar)])
+        if self.headers.get("Depth") == "0":
+            return self._multistatus([self._propstat(collection, f"<CS:getctag>{server.version}</CS:getctag>")])
+        responses = [self._propstat(f"{collection}{uid}.ics", f"<D:getetag>{etag}</D:getetag>")
+                     for uid, (etag, _, _) in list(server.store.items())]
+        return self._multistatus(responses)
+
+    def _changed(self, uid: str):
+        with self.server.lock:
+            self.server.version += 1
+            self.server.changes.append((self.server.version, uid))
+
+    def _caldav(self):
+        store = self.server.store
+        path = self.path.split("?", 1)[0]
+        if path.endswith("/") and self.command == "REPORT":
+            return self._report(path)
+        if path.endswith("/") and self.command == "PROPFIND":
+            self._body()
+            return self._propfind(path)
+        if path.endswith("/") and self.command == "GET":
+            body = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+            for _, _, ics in store.values():
+                body += ics.split("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n", 1)[-1].rsplit("END:VCALENDAR", 1)[0]
+            body += "END:VCALENDAR\r\n"
+            return self._send(200, body.encode(), "text/calendar")
+        uid = path.rsplit("/", 1)[1].removesuffix(".ics")
+        current = store.get(uid)
+        if self.command == "HEAD":
+            if not current:
+                return self._send(404)
+            return self._send(200, b"", "text/calendar", {"ETag": current[0]})
+        if self.command == "PUT":
+            body = self._body().decode()
+            if self.headers.get("If-None-Match") == "*" and current:
+                return self._send(412)
+            if_match = self.headers.get("If-Match")
+            if if_match and (not current or if_match not in ("*", current[0])):
+                return self._send(412)
+            etag = f'"{uuid.uuid4().hex}"'
+            store[uid] = (etag, {}, body)
+            self._changed(uid)
+            return self._send(204 if current else 201, b"", "text/plain", {"ETag": etag})
+        if self.command == "DELETE":
+            if store.pop(uid, None) is None:
+                return self._send(404)
+            self._changed(uid)
+            return self._send(204)
+        return self._send(405)
+
+    def _authorized(self) -> bool:
+        if not self.server.passwords:
+            return True
+        scheme, _, token = (self.headers.get("Authorization") or "").partition(" ")
+        try:
+            username, _, password = base64.b64decode(token).decode().partition(":")
+        except ValueError:
+            return False
+        return scheme == "Basic" and self.server.passwords.get(username) == password
+
+    def _dispatch(self):
+        self._count()
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if not self._authorized():
+            self._body()
+            return self._send(401, b"", "text/plain", {"WWW-Authenticate": 'Basic realm="fake"'})
+        if self.server.kind == "gateway":
+            self._gateway()
+        else:
+            self._caldav()
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = do_REPORT = do_PROPFIND = _dispatch
+
+
+def event_ics(uid: str, summary: str, start: str, end: str, description: str = "") -> str:
+    """One VEVENT resource in the format agent_test.add_task writes."""
+    return "\r\n".join([
+        "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//ProSweet Bench//EN",
+        "BEGIN:VEVENT", f"UID:{uid}", "DTSTAMP:20250101T000000Z", f"SUMMARY:{summary}",
+        f"DESCRIPTION:{description}", f"DTSTART:{start}", f"DTEND:{end}",
+        "END:VEVENT", "END:VCALENDAR", "",
+    ])
+
+
+class FakeServer(ThreadingHTTPServer):
+    """
+    In-process stand-in for the Hono gateway (`kind="gateway"`) or Radicale
+    (`kind="caldav"`). Counts accepted TCP connections and requests so the
+    benchmarks can report connection reuse. `delay` adds a fixed per-request
+    service time to mimic a remote server.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, kind: str = "gateway", delay: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.kind = kind
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.store = {}  # uid -> (etag, gateway event dict, ics text)
+        self.calendar = "calendar"  # the one collection listed under every /<user>/
+        self.version = 0  # bumped on every CalDAV write; sync-token and CTag
+        self.changes = []  # (version, uid) log for sync-collection
+        self.connections = 0
+        self.requests = 0
+        self.passwords = {}  # username -> password; when set, other credentials get 401
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def seed(self, count: int, start: dt.date = None, per_day: int = 10):
+        """
+        Fill the store with `count` events, `per_day` a day (hourly when that
+        fits in 08:00-22:00) from `start` on (default 2025-01-01).
+        """
+        first = dt.datetime.combine(start or dt.date(2025, 1, 1), dt.time(8))
+        step = max(1, min(60, 840 // per_day))
+        for i in range(count):
+            day, slot = divmod(i, per_day)
+            begin = first + dt.timedelta(days=day, minutes=slot * step)
+            uid = f"seed-{i:07d}"
+            start_time = begin.strftime("%Y%m%dT%H%M%SZ")
+            end_time = (begin + dt.timedelta(minutes=45)).strftime("%Y%m%dT%H%M%SZ")
+            ics = event_ics(uid, f"Event {i}", start_time, end_time, f"Synthetic event number {i}")
+            gateway_event = {"summary": f"Event {i}", "description": f"Synthetic event number {i}",
+                             "start": iso_utc(start_time), "end": iso_utc(end_time)}
+            self.store[uid] = (f'"{i}"', gateway_event, ics)
+        with self.lock:
+            self.version += 1
+
+    def reset_counters(self):
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
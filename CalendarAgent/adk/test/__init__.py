@@ -1,3 +1,16 @@
-from .agent import root_agent
+"""
+ProSweet calendar agents.
+
+`root_agent` (the ADK planner in agent.py) is imported on first access,
+which is how ADK's loader asks for it, so importing the package or any of
+its tools and agents does not load google.adk.
+"""
 
 __all__ = ['root_agent']
+
+
+def __getattr__(name: str):
+    if name == "root_agent":
+        from .agent import root_agent
+        return root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
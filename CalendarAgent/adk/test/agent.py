@@ -0,0 +1,163 @@
+import datetime as dt
+import functools
+import os
+
+from google.adk.agents.llm_agent import Agent
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools.tool_context import ToolContext
+
+from . import alarm_agent as alarms, calendar_window, event_agent as events, free_busy, gemini_models, prompt_encoding
+
+# Credentials for sessions that do not carry `username` / `password` in their state.
+DEFAULT_USERNAME = os.environ.get("PROSWEET_USERNAME", "test")
+DEFAULT_PASSWORD = os.environ.get("PROSWEET_PASSWORD", "test")
+
+# session id -> UidAliases of the event table last shown in that session, so
+# tool calls naming e1, e2, ... reach the real event.
+_aliases = {}
+
+
+# ============================================================
+#  PER-TURN INSTRUCTIONS
+# ============================================================
+
+def _credentials(state) -> tuple:
+    return state.get("username") or DEFAULT_USERNAME, state.get("password") or DEFAULT_PASSWORD
+
+
+def _user_text(ctx: ReadonlyContext) -> str:
+    content = ctx.user_content
+    return " ".join(part.text for part in (content.parts if content else []) if part.text)
+
+
+def _calendar_instruction(agent, list_events):
+    """
+    Instruction provider: lists the calendar window for this turn and returns
+    the agent's turn_context(). Runs on every model call, after the static
+    instruction, so nothing is fetched or frozen at import time.
+    """
+    async def provider(ctx: ReadonlyContext) -> str:
+        username, password = _credentials(ctx.state)
+        window = calendar_window.window_for_prompt(_user_text(ctx))
+        listed = calendar_window.event_list(await list_events(username, password, window))
+        aliases = _aliases[ctx.session.id] = prompt_encoding.UidAliases()
+        return agent.turn_context(username, password, listed, window, aliases)
+    return provider
+
+
+def _resolve_aliases(tool, args: dict, tool_context: ToolContext):
+    """before_tool_callback: swap e1, e2, ... for the UIDs they stand for."""
+    aliases = _aliases.get(tool_context.session.id)
+    if aliases is not None:
+        args.update(aliases.resolve_args(args))
+    return None
+
+
+# ============================================================
+#  TOOLS
+# ============================================================
+
+def _tool(func, name: str):
+    """`func` under the name the instructions use (create_event, not create_event_async)."""
+    @functools.wraps(func)
+    async def tool(*args, **kwargs):
+        return await func(*args, **kwargs)
+    tool.__name__ = tool.__qualname__ = name
+    return tool
+
+
+def _range_tool(list_events):
+    async def get_events_in_range(start_date: str, end_date: str, tool_context: ToolContext) -> str:
+        """Loads the user's events between two dates (YYYY-MM-DD, inclusive) when the event they mean is not listed."""
+        username, password = _credentials(tool_context.state)
+        first_day, last_day = calendar_window.range_args({"start_date": start_date, "end_date": end_date})
+        window = calendar_window.day_window(first_day, last_day)
+        listed = calendar_window.event_list(await list_events(username, password, window))
+        aliases = _aliases.setdefault(tool_context.session.id, prompt_encoding.UidAliases())
+        return prompt_encoding.encode_events(listed, aliases)
+    return get_events_in_range
+
+
+async def _busy_index(list_events, username: str, password: str, first_day: dt.date, last_day: dt.date):
+    """BusyIndex of the user's events on local days first_day..last_day."""
+    # The gateway window is in UTC; a day either side covers any local offset
+    window = calendar_window.day_window(first_day - dt.timedelta(days=1), last_day + dt.timedelta(days=1))
+    listed = calendar_window.event_list(await list_events(username, password, window))
+    return free_busy.BusyIndex(listed, free_busy.span_for(first_day, last_day))
+
+
+def _planner_tools(list_events) -> list:
+    async def find_free_slots(duration_minutes: int, start_date: str, end_date: str, tool_context: ToolContext,
+                              count: int = free_busy.DEFAULT_SLOTS) -> str:
+        """
+        Finds the first free slots of `duration_minutes` between two dates (YYYY-MM-DD, inclusive), within working hours.
+        The slots are in the user's local time, as create_event and check_conflicts take them.
+        """
+        username, password = _credentials(tool_context.state)
+        first_day, last_day = calendar_window.range_args({"start_date": start_date, "end_date": end_date})
+        index = await _busy_index(list_events, username, password, first_day, last_day)
+        slots = index.free_slots(dt.timedelta(minutes=duration_minutes), first_day, last_day, count)
+        return free_busy.describe_slots(slots)
+
+    async def check_conflicts(start_time: str, end_time: str, tool_context: ToolContext) -> str:
+        """
+        Lists the events overlapping start_time..end_time (YYYY-MM-DDTHH:MM:SS), or says that time is free.
+        Times are the user's local time unless they end in Z (UTC) or carry an offset.
+        """
+        username, password = _credentials(tool_context.state)
+        start, end = calendar_window.tool_time(start_time), calendar_window.tool_time(end_time)
+        index = await _busy_index(list_events, username, password, start.date(), end.date())
+        found = index.conflicts(start.timestamp(), end.timestamp())
+        if not found:
+            return "That time is free."
+        aliases = _aliases.setdefault(tool_context.session.id, prompt_encoding.UidAliases())
+        return "Overlaps:\n" + prompt_encoding.encode_events(found, aliases)
+
+    return [find_free_slots, check_conflicts]
+
+
+def _tools(agent, list_events) -> list:
+    tools = [_tool(getattr(agent, name + "_async"), name) for name in agent.FAST_PATH.values()]
+    return tools + [_range_tool(list_events)]
+
+
+# ============================================================
+#  AGENTS
+# ============================================================
+
+event_agent = Agent(
+    model=gemini_models.MODEL_NAME,
+    name="event_agent",
+    description="Creates, moves and deletes calendar events.",
+    static_instruction=events.SYSTEM_INSTRUCTION,
+    instruction=_calendar_instruction(events, events.get_all_calendar_items_async),
+    tools=_tools(events, events.get_all_calendar_items_async),
+    before_tool_callback=_resolve_aliases,
+    output_key="events_results",
+)
+
+alarm_agent = Agent(
+    model=gemini_models.MODEL_NAME,
+    name="alarm_agent",
+    description="Creates, moves and deletes events with reminders (alarms).",
+    static_instruction=alarms.SYSTEM_INSTRUCTION,
+    instruction=_calendar_instruction(alarms, alarms.get_all_events_async),
+    tools=_tools(alarms, alarms.get_all_events_async),
+    before_tool_callback=_resolve_aliases,
+    output_key="alarm_results",
+)
+
+root_agent = Agent(
+    model=gemini_models.MODEL_NAME,
+    name="pro_sweet_plannel",
+    description="Plans Schedules",
+    static_instruction=(
+        "You plan the user's schedule and route calendar requests. Transfer anything about reminders or "
+        "alarms to `alarm_agent` and every other request to add, change or remove events to `event_agent`.\n"
+        "When the user wants to fit something into their days, call `find_free_slots` with its length and "
+        "the dates it may go on, pick the best of the slots it returns (or `check_conflicts` for a time "
+        "the user proposes) and then transfer to `event_agent` with that exact time."
+    ),
+    tools=_planner_tools(events.get_all_calendar_items_async),
+    sub_agents=[event_agent, alarm_agent],
+)
@@ -0,0 +1,341 @@
+"""
+Long-running HTTP front end for the agents: many users, one process.
+
+    python agent_service.py --agent alarm_agent --port 8085
+
+    POST /turn     {"user": "...", "password": "...", "prompt": "...", "calendar_id": "..."}
+                   -> 200 {"result": ...}   (calendar_id only for agent_test),
+                      401 when the calendar server refuses the credentials
+    GET  /health   -> {"running": n, "queued": n, "users": n[, "write_behind": {"depth", "lag_seconds", "failed"}]}
+    GET  /metrics  -> Prometheus text
+
+At most `concurrency` turns run at once and at most `queue` more wait for a
+slot; beyond that the service answers 503 with Retry-After instead of
+piling up work. A user's own turns run one at a time, in arrival order, and
+a user with `user_queue` turns already pending gets 429. Credentials the
+service has not seen are checked with the calendar server before a turn
+runs; everything kept between turns is kept per accepted credentials.
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import importlib
+import json
+import os
+import sys
+import time
+
+try:
+    from . import calendar_backend, chat_session, gemini_models, metrics, write_behind
+    from .http_client import credential_key
+except ImportError:
+    import calendar_backend
+    import chat_session
+    import gemini_models
+    import metrics
+    import write_behind
+    from http_client import credential_key
+
+
+# ============================================================
+#  CONFIGURATION
+# ============================================================
+
+# Turns running at once (each one may itself issue several tool calls).
+CONCURRENCY = int(os.environ.get("PROSWEET_SERVICE_CONCURRENCY", "8"))
+# Turns allowed to wait for a free slot before new ones are refused with 503.
+QUEUE_SIZE = int(os.environ.get("PROSWEET_SERVICE_QUEUE", "64"))
+# Pending turns per user before that user gets 429.
+USER_QUEUE_SIZE = int(os.environ.get("PROSWEET_SERVICE_USER_QUEUE", "4"))
+# A turn taking longer than this is abandoned with 504.
+TURN_TIMEOUT = float(os.environ.get("PROSWEET_TURN_TIMEOUT", "120"))
+# Idle users beyond this many are forgotten, least recently seen first.
+MAX_USERS = int(os.environ.get("PROSWEET_SERVICE_MAX_USERS", "1000"))
+
+MAX_BODY = 64 * 1024
+
+
+def load_agent(name: str):
+    """Import an agent module by name, from the package or next to this script."""
+    return importlib.import_module(f".{name}", __package__) if __package__ else importlib.import_module(name)
+
+
+def gemini_model_factory(agent):
+    """
+    One GenerativeModel per user (key from GOOGLE_API_KEY). They all share the
+    agent's static system instruction, and its context cache when enabled.
+    """
+    gemini_models.configure()
+    return lambda username: gemini_models.build_model(agent.SYSTEM_INSTRUCTION, agent.TOOLS,
+                                                      cache_key=agent.__name__)
+
+
+# ============================================================
+#  SERVICE
+# ============================================================
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str, headers: dict = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class UserState:
+    """
+    What the service keeps for one user between turns: the model handle and
+    the lock that orders their turns. It is kept under the credentials the
+    calendar server accepted, which never change for it. The calendar
+    replica and the pooled connections are already kept per user by
+    caldav_sync and http_client, the chat (PROSWEET_CHAT_SESSIONS=1) by
+    chat_session.
+    """
+
+    def __init__(self, username: str, password: str, model):
+        self.username = username
+        self.password = password
+        self.model = model
+        self.lock = asyncio.Lock()
+        self.pending = 0
+        self.turns = 0
+        self.last_seen = time.monotonic()
+
+
+class AgentService:
+    def __init__(self, agent, model_factory, concurrency: int = None, queue_size: int = None,
+                 user_queue_size: int = None, turn_timeout: float = None, max_users: int = None):
+        self.agent = agent
+        self.agent_name = agent.__name__
+        self.model_factory = model_factory
+        self.concurrency = concurrency or CONCURRENCY
+        self.queue_size = QUEUE_SIZE if queue_size is None else queue_size
+        self.user_queue_size = user_queue_size or USER_QUEUE_SIZE
+        self.turn_timeout = turn_timeout or TURN_TIMEOUT
+        self.max_users = max_users or MAX_USERS
+        self.users = collections.OrderedDict()  # credential_key -> UserState, least recently seen first
+        # Where credentials are checked: the agent's backend, or Radicale for agent_test.
+        self.backend = getattr(agent, "BACKEND", None) or calendar_backend.CalDAVBackend(lambda: agent.base_url)
+        self.running = 0
+        self.queued = 0
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+    async def _verify(self, username: str, password: str):
+        try:
+            accepted = await self.backend.check_credentials(username, password)
+        except Exception as e:
+            print(f"❌ Could not check the credentials of {username}: {e}")
+            raise HttpError(502, "calendar server unavailable", {"Retry-After": "1"})
+        if not accepted:
+            metrics.inc("service_rejected_total", reason="credentials")
+            raise HttpError(401, "the calendar server refused these credentials")
+
+    async def _user(self, username: str, password: str) -> UserState:
+        """
+        The state kept for these credentials. New ones are checked with the
+        calendar server first: a wrong password gets a 401, never the
+        state (model, chat, queued writes) of the user it names.
+        """
+        key = credential_key(username, password)
+        if key not in self.users:
+            await self._verify(username, password)
+        state = self.users.get(key)  # a concurrent turn may have added it meanwhile
+        if state is None:
+            state = self.users[key] = UserState(username, password, self.model_factory(username))
+        state.last_seen = time.monotonic()
+        self.users.move_to_end(key)
+        if len(self.users) > self.max_users:
+            for idle in [k for k, s in self.users.items() if not s.pending][:len(self.users) - self.max_users]:
+                del self.users[idle]
+                chat_session.end(self.agent_name.rpartition(".")[2], idle)
+        return state
+
+    async def _run_agent(self, user: UserState, prompt: str, calendar_id: str):
+        if self.agent_name == "agent_test":
+            return await self.agent.ask_gemini_async(user.username, user.password, calendar_id,
+                                                     user.model, prompt)
+        return await self.agent.ask_gemini_async(user.username, user.password, user.model, prompt)
+
+    async def turn(self, username: str, password: str, prompt: str, calendar_id: str = None):
+        """Run one agent turn for `username`, or raise HttpError when it cannot be admitted."""
+        if self.running + self.queued >= self.concurrency + self.queue_size:
+            metrics.inc("service_rejected_total", reason="busy")
+            raise HttpError(503, "service busy", {"Retry-After": "1"})
+        user = await self._user(username, password)
+        if user.pending >= self.user_queue_size:
+            metrics.inc("service_rejected_total", reason="user_busy")
+            raise HttpError(429, "too many pending turns for this user", {"Retry-After": "1"})
+
+        user.pending += 1
+        self.queued += 1
+        waiting = True
+        queued_at = time.perf_counter()
+        try:
+            async with user.lock, self._slots:
+                self.queued -= 1
+                waiting = False
+                self.running += 1
+                metrics.observe("service_queue_seconds", time.perf_counter() - queued_at)
+                try:
+                    with metrics.span("service_turn", agent=self.agent_name):
+                        return await asyncio.wait_for(self._run_agent(user, prompt, calendar_id),
+                                                      self.turn_timeout)
+                except asyncio.TimeoutError:
+                    raise HttpError(504, "turn timed out")
+                finally:
+                    self.running -= 1
+                    user.turns += 1
+        finally:
+            if waiting:
+                self.queued -= 1
+            user.pending -= 1
+
+    def health(self) -> dict:
+        health = {"agent": self.agent_name, "running": self.running, "queued": self.queued,
+                  "users": len(self.users)}
+        if write_behind.ENABLED:
+            health["write_behind"] = write_behind.stats()
+        return health
+
+    # ---------------- HTTP ----------------
+
+    async def handle(self, method: str, path: str, body: bytes):
+        """Route one request; returns (status, payload, headers)."""
+        if path == "/health" and method == "GET":
+            return 200, self.health(), {}
+        if path == "/metrics" and method == "GET":
+            return 200, metrics.prometheus_text(), {"Content-Type": "text/plain; version=0.0.4"}
+        if path != "/turn":
+            raise HttpError(404, "not found")
+        if method != "POST":
+            raise HttpError(405, "method not allowed", {"Allow": "POST"})
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            raise HttpError(400, "body is not JSON")
+        if not isinstance(request, dict) or not request.get("user") or not request.get("prompt"):
+            raise HttpError(400, "`user` and `prompt` are required")
+        result = await self.turn(str(request["user"]), str(request.get("password") or ""),
+                                 str(request["prompt"]), request.get("calendar_id"))
+        return 200, {"result": result}, {}
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                start = time.perf_counter()
+                try:
+                    status, payload, extra = await self.handle(method, path, body)
+                except HttpError as e:
+                    status, payload, extra = e.status, {"error": str(e)}, e.headers
+                except Exception as e:
+                    print(f"❌ {method} {path} failed: {e}")
+                    status, payload, extra = 500, {"error": "internal error"}, {}
+                metrics.observe("service_request_seconds", time.perf_counter() - start, path=path)
+                metrics.inc("service_requests_total", path=path, status=status)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await _write_response(writer, status, payload, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HttpError as e:
+            with contextlib.suppress(ConnectionError):
+                await _write_response(writer, e.status, {"error": str(e)}, e.headers, False)
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8085, ready=None):
+        server = await asyncio.start_server(self._serve_connection, host, port, backlog=1024)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+
+# ============================================================
+#  HTTP/1.1 WIRE FORMAT
+# ============================================================
+
+_REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large", 429: "Too Many Requests",
+            500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable",
+            504: "Gateway Timeout"}
+
+
+async def _read_request(reader):
+    """(method, path, headers, body) of the next request, or None when the client hung up."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "bad request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(400, "bad Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413, "body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?", 1)[0], headers, body
+
+
+async def _write_response(writer, status: int, payload, headers: dict, keep_alive: bool):
+    if isinstance(payload, str):
+        body = payload.encode()
+        content_type = headers.get("Content-Type", "text/plain; charset=utf-8")
+    else:
+        body = json.dumps(payload, default=str).encode()
+        content_type = "application/json"
+    head = [f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    head += [f"{k}: {v}" for k, v in headers.items() if k != "Content-Type"]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+# ============================================================
+#  MAIN
+# ============================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve agent turns over HTTP for many users.")
+    parser.add_argument("--agent", default="alarm_agent", choices=("alarm_agent", "event_agent", "agent_test"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8085)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--queue", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--quiet", action="store_true", help="silence the agents' per-call output")
+    args = parser.parse_args(argv)
+
+    agent = load_agent(args.agent)
+    service = AgentService(agent, gemini_model_factory(agent), args.concurrency, args.queue)
+    print(f"🚀 {args.agent} service on http://{args.host}:{args.port}", file=sys.stderr)
+    with open(os.devnull, "w") if args.quiet else contextlib.nullcontext(sys.stdout) as out, \
+            contextlib.redirect_stdout(out):
+        try:
+            asyncio.run(service.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            print("👋 Exiting.", file=sys.stderr)
+        finally:
+            metrics.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+import bisect
+import datetime as dt
+import functools
+import heapq
+import itertools
+import os
+import re
+import time
+from typing import NamedTuple
+
+from dateutil import rrule as dateutil_rrule
+
+try:
+    from . import calendar_window, prompt_encoding
+except ImportError:
+    import calendar_window
+    import prompt_encoding
+
+# ============================================================
+#  CONFIGURATION
+# ============================================================
+
+# How far ahead "next alarms" look and recurring events are expanded (the
+# gateway's GET /alarms uses the same 30 days).
+HORIZON_DAYS = int(os.environ.get("PROSWEET_ALARM_HORIZON_DAYS", "30"))
+
+# A question about reminders is answered without listing the calendar again
+# if the index was filled from a listing this recent (seconds) covering it.
+INDEX_MAX_AGE = float(os.environ.get("PROSWEET_ALARM_INDEX_MAX_AGE", "60"))
+
+# Upper bound on occurrences expanded per recurring event and query, so a
+# FREQ=MINUTELY rule cannot blow up the index.
+MAX_OCCURRENCES = 1000
+
+_DAY = 24 * 3600
+_UTC = dt.timezone.utc
+
+
+class Alarm(NamedTuple):
+    """One firing of one VALARM. Sorts by fire time (`at`, seconds since the epoch)."""
+    at: float
+    uid: str
+    summary: str
+    action: str
+    description: str
+    trigger: str
+
+    @property
+    def local_time(self) -> dt.datetime:
+        return dt.datetime.fromtimestamp(self.at)
+
+
+# ============================================================
+#  TRIGGERS AND TIMES
+# ============================================================
+
+_DURATION = re.compile(r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_trigger(trigger: str):
+    """
+    ("offset", seconds relative to the event start) for -PT10M, PT30S,
+    -P1D, P2W ..., ("at", epoch seconds) for an absolute UTC date-time,
+    or None. The same few triggers recur on every event, so parses are cached.
+    """
+    text = str(trigger or "").strip().upper()
+    match = _DURATION.match(text)
+    if match and text not in ("P", "-P", "+P", "PT", "-PT", "+PT"):
+        sign, weeks, days, hours, minutes, seconds = match.groups()
+        total = (((int(weeks or 0) * 7 + int(days or 0)) * 24 + int(hours or 0)) * 60
+                 + int(minutes or 0)) * 60 + int(seconds or 0)
+        return "offset", -total if sign == "-" else total
+    at = epoch(text)
+    return ("at", at) if at is not None and text.endswith("Z") else None
+
+
+def epoch(value):
+    """
+    Seconds since the epoch for a gateway (2025-01-01T09:00:00.000Z),
+    iCalendar (20250101T090000Z) or naive ISO time. Naive times and dates
+    are local, as the gateway reads what the agents send.
+    """
+    if not value:
+        return None
+    try:
+        return dt.datetime.fromisoformat(value).timestamp()  # the gateway's own format, the common case
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = dt.datetime.fromisoformat(prompt_encoding.compact_time(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return when.timestamp()
+
+
+@functools.lru_cache(maxsize=256)
+def _rule(rule: str, dtstart: float):
+    try:
+        return dateutil_rrule.rrulestr(rule, dtstart=dt.datetime.fromtimestamp(dtstart, _UTC), cache=True)
+    except (ValueError, TypeError) as e:
+        print(f"⚠️ Ignoring recurrence rule {rule!r}: {e}")
+        return None
+
+
+def occurrences(event: dict, start: float, end: float) -> list:
+    """Start times (epoch seconds) of `event` between `start` and `end`, expanding its RRULE."""
+    first = epoch(event.get("start") or event.get("start_time"))
+    if first is None:
+        return []
+    rule = event.get("rrule") and _rule(str(event["rrule"]), first)
+    if not rule:
+        return [first] if start <= first <= end else []
+    after = rule.xafter(dt.datetime.fromtimestamp(max(start, first), _UTC), count=MAX_OCCURRENCES, inc=True)
+    stop = dt.datetime.fromtimestamp(end, _UTC)
+    return [when.timestamp() for when in itertools.takewhile(lambda when: when <= stop, after)]
+
+
+# ============================================================
+#  EXPANSION
+# ============================================================
+
+def _fired(event: dict, start: float, end: float) -> list:
+    """Every firing of `event`'s alarms in [start, end], unsorted."""
+    alarms = event.get("alarms")
+    if not alarms or not isinstance(alarms, list):
+        return []
+    triggers = [(parse_trigger(a.get("trigger")), a) for a in alarms if isinstance(a, dict)]
+    offsets = [parsed[1] for parsed, _ in triggers if parsed and parsed[0] == "offset"]
+    # Occurrences whose alarms can fire in the range, for the earliest and latest offset at once
+    starts = occurrences(event, start - max(offsets, default=0), end - min(offsets, default=0)) if offsets else []
+
+    uid, summary = event.get("uid") or "", event.get("summary") or event.get("name") or ""
+    fired = []
+    for parsed, alarm in triggers:
+        if not parsed:
+            continue
+        kind, value = parsed
+        times = [value] if kind == "at" else [begin + value for begin in starts]
+        fired.extend(Alarm(at, uid, summary, alarm.get("action") or "DISPLAY",
+                           alarm.get("description") or "", alarm.get("trigger") or "")
+                     for at in times if start <= at <= end)
+    return fired
+
+
+def expand(events: list, start: float = None, end: float = None) -> list:
+    """
+    All alarm firings of `events` between `start` and `end` (epoch seconds,
+    default now .. now + HORIZON_DAYS), sorted by time. The Python
+    equivalent of the gateway's getAlarmTimestamps, without the round trip.
+    """
+    start = time.time() if start is None else start
+    end = start + HORIZON_DAYS * _DAY if end is None else end
+    fired = [alarm for event in events if isinstance(event, dict) for alarm in _fired(event, start, end)]
+    fired.sort()
+    return fired
+
+
+# ============================================================
+#  NEXT-ALARMS INDEX
+# ============================================================
+
+class AlarmIndex:
+    """
+    Sorted list of a user's alarm firings, fed from the agents' listings.
+    `between()` and `upcoming()` bisect into it (O(log n + k)); a listing
+    replaces the alarms of the events it returned in one merge.
+
+    Recurring events are expanded over `span` (from yesterday to
+    HORIZON_DAYS ahead, widened when a query asks for more).
+    """
+
+    def __init__(self):
+        self._alarms = []  # Alarm tuples, sorted
+        self._events = {}  # uid -> event the alarms came from
+        self.span = (0.0, 0.0)
+        self.listed = None  # (when, start, end) of the last listing fed in
+
+    def __len__(self):
+        return len(self._alarms)
+
+    def _default_span(self) -> tuple:
+        today = dt.datetime.combine(dt.date.today(), dt.time.min).timestamp()
+        return min(self.span[0] or today, today - _DAY), max(self.span[1], today + (HORIZON_DAYS + 1) * _DAY)
+
+    def _drop(self, uids: set):
+        if uids:
+            self._alarms = [a for a in self._alarms if a.uid not in uids]
+            for uid in uids:
+                self._events.pop(uid, None)
+
+    def _add(self, events: list):
+        fresh = expand(events, *self.span)
+        self._alarms = list(heapq.merge(self._alarms, fresh))
+        for event in events:
+            self._events[event["uid"]] = event
+
+    def update(self, events: list, window: tuple = None):
+        """
+        Take the events of a listing. With the listing's `window` (naive UTC
+        datetimes, as sent to the gateway), one-off events that started in it
+        but were not returned have been deleted and are dropped too.
+        """
+        events = [e for e in events if isinstance(e, dict) and e.get("uid")]
+        self.span = self._default_span()
+        gone = {e["uid"] for e in events if e["uid"] in self._events}
+        if window is not None:
+            start, end = (w.replace(tzinfo=_UTC).timestamp() for w in window)
+            listed = {e["uid"] for e in events}
+            gone |= {uid for uid, e in self._events.items()
+                     if uid not in listed and not e.get("rrule")
+                     and start <= (epoch(e.get("start") or e.get("start_time")) or 0) < end}
+            self.listed = (time.time(), start, end)
+        self._drop(gone)
+        self._add(events)
+
+    def forget(self, uid: str):
+        """Drop one event's alarms (it was deleted)."""
+        self._drop({uid} if uid in self._events else set())
+
+    def _cover(self, start: float, end: float):
+        if start >= self.span[0] and end <= self.span[1]:
+            return
+        self.span = (min(self.span[0], start), max(self.span[1], end))
+        self._alarms = expand(list(self._events.values()), *self.span)
+
+    def between(self, start: float, end: float) -> list:
+        """Firings with start <= at < end, in order."""
+        self._cover(start, end)
+        lo = bisect.bisect_left(self._alarms, (start,))
+        hi = bisect.bisect_left(self._alarms, (end,), lo)
+        return self._alarms[lo:hi]
+
+    def upcoming(self, count: int = 1, after: float = None) -> list:
+        """The next `count` firings after `after` (default now)."""
+        after = time.time() if after is None else after
+        self._cover(after, after + HORIZON_DAYS * _DAY)
+        lo = bisect.bisect_right(self._alarms, (after, chr(0x10FFFF)))
+        return [a for a in self._alarms[lo:lo + count] if a.at <= after + HORIZON_DAYS * _DAY]
+
+    def covers(self, start: float, end: float, max_age: float = None) -> bool:
+        """True if a listing newer than `max_age` seconds spanned start..end."""
+        max_age = INDEX_MAX_AGE if max_age is None else max_age
+        if self.listed is None:
+            return False
+        when, listed_start, listed_end = self.listed
+        return time.time() - when <= max_age and listed_start <= start and end <= listed_end
+
+
+# http_client.credential_key(username, password) -> AlarmIndex, fed by every
+# listing the agents make: only credentials the server accepted have one.
+_indexes = {}
+
+
+def index_for(user: str) -> AlarmIndex:
+    if user not in _indexes:
+        _indexes[user] = AlarmIndex()
+    return _indexes[user]
+
+
+def remember(user: str, events: list, window: tuple = None):
+    """Feed a listing (or just-written events) into the user's index."""
+    index_for(user).update(events, window)
+
+
+def forget(user: str, uid: str):
+    if user in _indexes:
+        _indexes[user].forget(uid)
+
+
+def drop(user: str):
+    """Throw the index away, e.g. when the server refused these credentials."""
+    _indexes.pop(user, None)
+
+
+# ============================================================
+#  QUESTIONS
+# ============================================================
+
+_ABOUT_ALARMS = re.compile(r"\b(reminders?|alarms?)\b", re.I)
+_ASKING = re.compile(r"^(what|which|when|whats|what's|show|list|any|do|are|is|tell)\b", re.I)
+_NEXT = re.compile(r"\bnext(?:\s+(\d+|one|two|three|four|five|ten))?\b", re.I)
+_NUMBERS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "ten": 10}
+# Words a question may use around the day and count without changing its meaning.
+_QUESTION_WORDS = {"what", "which", "when", "whats", "what's", "show", "list", "tell", "any", "do", "does",
+                   "did", "i", "have", "got", "are", "is", "there", "the", "my", "me", "for", "on", "set",
+                   "all", "upcoming", "coming", "up", "scheduled", "a", "anything", "reminder", "reminders",
+                   "alarm", "alarms", "will", "go", "goes", "off", "fire", "ring", "s"}
+
+
+class Question:
+    """A question about reminders answered from the index: firings in [start, end), at most `limit`."""
+
+    def __init__(self, start: float, end: float, limit: int = None, label: str = ""):
+        self.start = start
+        self.end = end
+        self.limit = limit
+        self.label = label
+
+    def alarms(self, index: AlarmIndex) -> list:
+        if self.limit:
+            return index.upcoming(self.limit, self.start)
+        return index.between(self.start, self.end)
+
+    def __repr__(self):
+        return f"Question({self.label!r}, limit={self.limit})"
+
+
+def match_question(prompt: str, today: dt.date = None, now: float = None):
+    """
+    Recognise "what reminders do I have today?", "any alarms on friday",
+    "when is my next alarm", "show my next 3 reminders" ... or return None
+    so the prompt goes to the model (which also handles adding reminders).
+    """
+    if not prompt or not _ABOUT_ALARMS.search(prompt):
+        return None
+    text = " ".join(prompt.strip().rstrip("?.!").split())
+    if not _ASKING.match(text):
+        return None
+    today = today or dt.date.today()
+    now = time.time() if now is None else now
+
+    day, rest = calendar_window.mentioned_day(text, today)
+    limit = None
+    nxt = _NEXT.search(rest)
+    if nxt:
+        count = (nxt.group(1) or "1").lower()
+        limit = _NUMBERS.get(count) or int(count)
+        rest = rest[:nxt.start()] + " " + rest[nxt.end():]
+    if any(w not in _QUESTION_WORDS for w in re.findall(r"[a-z0-9']+", rest.lower().replace("'s", " s"))):
+        return None  # something we did not understand ("this week", "for the flight" ...)
+    if day is not None and limit is None:
+        start = dt.datetime.combine(day, dt.time.min).timestamp()
+        return Question(start, start + _DAY, label=day.isoformat())
+    if day is None and limit is not None:
+        return Question(now, now + HORIZON_DAYS * _DAY, limit, label=f"next {limit}")
+    return None
+
+
+def describe(alarms: list, label: str) -> str:
+    """A short reply listing `alarms` (local times)."""
+    if not alarms:
+        return f"You have no reminders ({label})."
+    lines = [f"You have {len(alarms)} reminder{'s' if len(alarms) != 1 else ''} ({label}):"]
+    for alarm in alarms:
+        note = f" — {alarm.description}" if alarm.description else ""
+        lines.append(f"• {alarm.local_time.strftime('%a %Y-%m-%d %H:%M')} {alarm.summary}{note}")
+    return "\n".join(lines)
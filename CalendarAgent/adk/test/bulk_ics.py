@@ -0,0 +1,434 @@
+"""
+Bulk .ics import and export against Radicale (CalDAV).
+
+    python bulk_ics.py import calendar.ics --user admin --password ... --calendar <id>
+    python bulk_ics.py export backup.ics   --user admin --password ... --calendar <id>
+
+Import reads the file twice: first to index its UIDs and VTIMEZONEs, then
+to split it into one resource per UID (all the VEVENTs sharing a UID, i.e.
+recurrence overrides wherever they are in the file, with the VTIMEZONEs
+they use) and PUT them `--concurrency` at a time over the pooled connections, each with `If-None-Match: *` so nothing existing is
+overwritten and a rerun creates nothing twice.
+
+Export lists the collection with one PROPFIND and downloads it with
+calendar-multiget REPORTs of `--batch` resources, writing one VCALENDAR.
+
+Both print events per second as they go and keep their progress next to
+the file (`<file>.progress`); after an interruption, the same command
+picks up where it stopped (`--restart` to start over).
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from urllib.parse import quote
+
+import httpx
+
+try:
+    from . import metrics
+    from .caldav_sync import ETAGS_BODY, MULTIGET_BATCH, MULTIGET_BODY, XML_HEADERS, _escape, _parse_multistatus
+    from .http_client import get_async_client
+except ImportError:
+    import metrics
+    from caldav_sync import ETAGS_BODY, MULTIGET_BATCH, MULTIGET_BODY, XML_HEADERS, _escape, _parse_multistatus
+    from http_client import get_async_client
+
+DEFAULT_SERVER = os.environ.get("PROSWEET_CALDAV_URL", "http://localhost:5232")
+
+# Uploads or REPORTs in flight at once.
+CONCURRENCY = 8
+# Attempts per resource on network errors and 5xx before it is reported as failed.
+ATTEMPTS = 3
+
+_UID_NAMESPACE = uuid.UUID("6f0f2c1e-7f4e-4b8a-9a55-0c5b2f4f7e61")
+_TZID_PARAM = re.compile(r";TZID=(\"[^\"]*\"|[^;:]*)", re.I)
+
+
+# ============================================================
+#  SPLITTING
+# ============================================================
+
+def _logical(lines: list) -> list:
+    """Unfold continuation lines (only to read property values; the raw lines are what we send)."""
+    out = []
+    for line in lines:
+        if line[:1] in (" ", "\t") and out:
+            out[-1] += line[1:]
+        else:
+            out.append(line)
+    return out
+
+
+def _value(lines: list, name: str):
+    for line in _logical(lines):
+        head, _, value = line.partition(":")
+        if head.split(";", 1)[0].upper() == name:
+            return value.strip()
+    return None
+
+
+def _with_uid(lines: list, uid: str) -> list:
+    return [lines[0], f"UID:{uid}"] + lines[1:]
+
+
+class _Resource:
+    __slots__ = ("uid", "events", "tzids")
+
+    def __init__(self, uid: str):
+        self.uid = uid
+        self.events = []  # raw lines of each VEVENT
+        self.tzids = set()
+
+
+def _top_level(lines, header: list):
+    """
+    The raw lines of each component directly inside the VCALENDAR of a
+    stream of .ics lines; the calendar's VERSION/PRODID/CALSCALE go to `header`.
+    """
+    component, depth = None, 0
+    for raw in lines:
+        if raw.__class__ is bytes:
+            raw = raw.decode("utf-8", "replace")
+        line = raw.rstrip("\r\n")
+        if not line:
+            continue
+        upper = line.upper()
+        if component is None:
+            if upper.startswith("BEGIN:") and upper != "BEGIN:VCALENDAR":
+                component, depth = [line], 1
+            elif upper.split(":", 1)[0] in ("VERSION", "PRODID", "CALSCALE") and len(header) < 3:
+                header.append(line)
+            continue
+        component.append(line)
+        if upper.startswith("BEGIN:"):
+            depth += 1
+        elif upper.startswith("END:"):
+            depth -= 1
+        if not depth:
+            yield component
+            component = None
+
+
+def _event_uid(component: list) -> tuple:
+    """(uid, component); an event without a UID gets one derived from its content, so reruns agree."""
+    uid = _value(component, "UID")
+    if uid:
+        return uid, component
+    uid = str(uuid.uuid5(_UID_NAMESPACE, "\n".join(component)))
+    return uid, _with_uid(component, uid)
+
+
+def split_resources(read):
+    """
+    Yield (uid, ics) for every resource of an .ics file: all the VEVENTs
+    with one UID, wherever they are in the file, wrapped in a VCALENDAR with
+    the calendar's VERSION/PRODID and the VTIMEZONEs they refer to (also
+    those defined after them). `read()` returns a fresh iterator of the
+    file's lines and is called twice: the first pass counts each UID's
+    VEVENTs and keeps the VTIMEZONEs, the second yields each resource once
+    its last VEVENT is read, so only UIDs split across the file are held.
+    """
+    header, timezones, remaining = [], {}, collections.Counter()
+    for component in _top_level(read(), header):
+        kind = component[0].upper()
+        if kind == "BEGIN:VTIMEZONE":
+            timezones[_value(component, "TZID") or ""] = component
+        elif kind == "BEGIN:VEVENT":
+            remaining[_event_uid(component)[0]] += 1
+
+    def finish(resource):
+        body = ["BEGIN:VCALENDAR"] + (header or ["VERSION:2.0", "PRODID:-//ProSweet Planner//EN"])
+        body += [line for tzid in sorted(resource.tzids) if tzid in timezones for line in timezones[tzid]]
+        body += [line for event in resource.events for line in event]
+        return resource.uid, "\r\n".join(body + ["END:VCALENDAR", ""])
+
+    pending = {}  # uid -> _Resource whose VEVENTs are not all read yet
+    for component in _top_level(read(), []):
+        if component[0].upper() != "BEGIN:VEVENT":
+            continue
+        uid, component = _event_uid(component)
+        resource = pending.get(uid) or pending.setdefault(uid, _Resource(uid))
+        resource.events.append(component)
+        resource.tzids.update(m.strip('"') for m in _TZID_PARAM.findall("\n".join(_logical(component))))
+        remaining[uid] -= 1
+        if not remaining[uid]:
+            del pending[uid]
+            yield finish(resource)
+    for resource in pending.values():  # only if the file changed between the passes
+        yield finish(resource)
+
+
+def _read_lines(path: str):
+    with open(path, encoding="utf-8", errors="replace", newline="") as f:
+        yield from f
+
+
+def resource_href(collection_path: str, uid: str) -> str:
+    return f"{collection_path}{quote(uid, safe='@.-_')}.ics"
+
+
+# ============================================================
+#  PROGRESS
+# ============================================================
+
+class Progress:
+    """
+    Append-only log of finished work next to the file, plus the running
+    rate. Each line is written and flushed as soon as its work is done, so
+    an interrupted run loses at most what was in flight.
+    """
+
+    def __init__(self, path: str, restart: bool = False):
+        self.path = path + ".progress"
+        if restart and os.path.exists(self.path):
+            os.remove(self.path)
+        self.done = []
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.done = [json.loads(line) for line in f if line.strip()]
+        self._file = open(self.path, "a", encoding="utf-8")
+        self.counts = {}
+        self.started = time.perf_counter()
+        self._reported = self.started
+
+    def record(self, entry):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def count(self, outcome: str, n: int = 1):
+        self.counts[outcome] = self.counts.get(outcome, 0) + n
+        now = time.perf_counter()
+        if now - self._reported >= 2:
+            self._reported = now
+            print(f"  … {self.summary()}", flush=True)
+
+    def rate(self) -> float:
+        moved = sum(n for outcome, n in self.counts.items() if outcome != "failed")
+        return moved / max(time.perf_counter() - self.started, 1e-9)
+
+    def summary(self) -> str:
+        counts = ", ".join(f"{n} {outcome}" for outcome, n in sorted(self.counts.items()))
+        return f"{counts or 'nothing to do'} in {time.perf_counter() - self.started:.1f} s ({self.rate():.0f} events/s)"
+
+    def close(self, finished: bool):
+        self._file.close()
+        if finished:
+            os.remove(self.path)
+
+
+# ============================================================
+#  IMPORT
+# ============================================================
+
+async def _put(client, url: str, ics: str) -> str:
+    for attempt in range(1, ATTEMPTS + 1):
+        try:
+            response = await client.put(url, content=ics.encode("utf-8"),
+                                        headers={"Content-Type": "text/calendar; charset=utf-8",
+                                                 "If-None-Match": "*"})
+        except httpx.HTTPError as e:
+            error = str(e)
+        else:
+            if response.status_code in (200, 201, 204):
+                return "created"
+            if response.status_code == 412:
+                return "already there"
+            if response.status_code < 500 and response.status_code != 429:
+                print(f"❌ {url}: {response.status_code} {response.text[:200]}")
+                return "failed"
+            error = f"HTTP {response.status_code}"
+        if attempt < ATTEMPTS:
+            await asyncio.sleep(0.5 * 2 ** attempt)
+    print(f"❌ {url}: {error}")
+    return "failed"
+
+
+async def import_ics(path: str, server: str, username: str, password: str, calendar_id: str,
+                     concurrency: int = CONCURRENCY, restart: bool = False) -> dict:
+    """Upload every resource of the .ics file at `path`; returns {outcome: count}."""
+    collection = f"{server.rstrip('/')}/{username}/{calendar_id}/"
+    client = get_async_client(server, username, password)
+    progress = Progress(path, restart)
+    skip = set(progress.done)
+    if skip:
+        print(f"↩️ Resuming: {len(skip)} resources already imported.")
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def upload():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            uid, ics = item
+            outcome = await _put(client, resource_href(collection, uid), ics)
+            if outcome != "failed":
+                progress.record(uid)
+            progress.count(outcome)
+            metrics.inc("bulk_import_total", outcome=outcome)
+
+    workers = [asyncio.create_task(upload()) for _ in range(concurrency)]
+    try:
+        for uid, ics in split_resources(lambda: _read_lines(path)):
+            if uid in skip:
+                continue
+            await queue.put((uid, ics))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        progress.close(finished=all(w.done() and not w.cancelled() for w in workers)
+                       and not progress.counts.get("failed"))
+    print(f"✅ Import: {progress.summary()}")
+    return progress.counts
+
+
+# ============================================================
+#  EXPORT
+# ============================================================
+
+def _components(ics: str):
+    """(kind, lines, tzid) of each component directly inside the VCALENDAR of one resource."""
+    component, depth = None, 0
+    for line in ics.splitlines():
+        if not line:
+            continue
+        upper = line.upper()
+        if component is None:
+            if upper.startswith("BEGIN:") and upper != "BEGIN:VCALENDAR":
+                component, depth = [line], 1
+            continue
+        component.append(line)
+        if upper.startswith("BEGIN:"):
+            depth += 1
+        elif upper.startswith("END:"):
+            depth -= 1
+        if not depth:
+            kind = component[0][6:].upper()
+            yield kind, component, _value(component, "TZID") if kind == "VTIMEZONE" else None
+            component = None
+
+
+async def _list_hrefs(client, collection: str) -> list:
+    response = await client.request("PROPFIND", collection, content=ETAGS_BODY, headers={**XML_HEADERS, "Depth": "1"})
+    response.raise_for_status()
+    return sorted(href for href, _, _ in _parse_multistatus(response.content)
+                  if href is not None and not href.endswith("/"))
+
+
+async def _multiget(client, collection: str, hrefs: list) -> list:
+    body = MULTIGET_BODY.format(hrefs="".join(f"<D:href>{_escape(h)}</D:href>" for h in hrefs))
+    for attempt in range(1, ATTEMPTS + 1):
+        try:
+            response = await client.request("REPORT", collection, content=body,
+                                            headers={**XML_HEADERS, "Depth": "1"})
+            response.raise_for_status()
+            return [props.get("calendar-data") or "" for href, _, props in _parse_multistatus(response.content)
+                    if href is not None and "calendar-data" in props]
+        except httpx.HTTPError:
+            if attempt == ATTEMPTS:
+                raise
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+
+async def export_ics(path: str, server: str, username: str, password: str, calendar_id: str,
+                     batch: int = MULTIGET_BATCH, concurrency: int = CONCURRENCY, restart: bool = False) -> dict:
+    """Download the whole calendar into one .ics file at `path`; returns {outcome: count}."""
+    collection = f"{server.rstrip('/')}/{username}/{calendar_id}/"
+    client = get_async_client(server, username, password)
+    part = path + ".part"
+    progress = Progress(path, restart or not os.path.exists(part))
+
+    # Resume: keep the .part file up to the last batch recorded as written
+    done, size = set(), 0
+    for entry in progress.done:
+        done.update(entry["hrefs"])
+        size = entry["size"]
+    out = open(part, "r+b" if size else "wb")
+    out.truncate(size)
+    out.seek(size)
+    timezones = set()
+    if size:
+        print(f"↩️ Resuming: {len(done)} resources already exported.")
+        timezones = {tzid for kind, _, tzid in _components(open(part, encoding="utf-8").read()) if tzid}
+    else:
+        out.write(b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//ProSweet Planner//EN\r\n")
+
+    hrefs = [h for h in await _list_hrefs(client, collection) if h not in done]
+    batches = [hrefs[i:i + batch] for i in range(0, len(hrefs), batch)]
+    slots = asyncio.Semaphore(concurrency)
+
+    async def fetch(hrefs: list):
+        async with slots:
+            resources = await _multiget(client, collection, hrefs)
+        # No await from here on: each batch lands in the file in one piece
+        events = 0
+        for ics in resources:
+            for kind, lines, tzid in _components(ics):
+                if kind == "VTIMEZONE":
+                    if tzid in timezones:
+                        continue
+                    timezones.add(tzid)
+                events += kind == "VEVENT"
+                out.write(("\r\n".join(lines) + "\r\n").encode("utf-8"))
+        out.flush()
+        progress.record({"size": out.tell(), "hrefs": hrefs})
+        progress.count("exported", events)
+        metrics.inc("bulk_export_total", events)
+
+    finished = False
+    try:
+        await asyncio.gather(*(fetch(b) for b in batches))
+        out.write(b"END:VCALENDAR\r\n")
+        finished = True
+    finally:
+        out.close()
+        progress.close(finished)
+    os.replace(part, path)
+    print(f"✅ Export: {progress.summary()}")
+    return progress.counts
+
+
+# ============================================================
+#  COMMAND LINE
+# ============================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk .ics import/export for a Radicale calendar.")
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("file")
+    parser.add_argument("--server", default=DEFAULT_SERVER)
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", default=os.environ.get("PROSWEET_PASSWORD"))
+    parser.add_argument("--calendar", required=True)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--batch", type=int, default=MULTIGET_BATCH, help="hrefs per calendar-multiget (export)")
+    parser.add_argument("--restart", action="store_true", help="ignore the progress of an earlier run")
+    args = parser.parse_args(argv)
+    if args.password is None:
+        import getpass
+        args.password = getpass.getpass("Password: ")
+
+    if args.command == "import":
+        job = import_ics(args.file, args.server, args.user, args.password, args.calendar,
+                         args.concurrency, args.restart)
+    else:
+        job = export_ics(args.file, args.server, args.user, args.password, args.calendar,
+                         args.batch, args.concurrency, args.restart)
+    try:
+        counts = asyncio.run(job)
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted; run the same command again to resume.")
+        sys.exit(130)
+    sys.exit(1 if counts.get("failed") else 0)
+
+
+if __name__ == "__main__":
+    main()
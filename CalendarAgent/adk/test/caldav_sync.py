@@ -0,0 +1,534 @@
+import asyncio
+import datetime as dt
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+try:
+    from . import event_store, metrics
+    from .ical_stream import aiter_vevents, parse_ics
+except ImportError:
+    import event_store
+    import metrics
+    from ical_stream import aiter_vevents, parse_ics
+
+# ============================================================
+#  NAMESPACES / REQUEST BODIES
+# ============================================================
+
+DAV = "DAV:"
+CALDAV = "urn:ietf:params:xml:ns:caldav"
+CS = "http://calendarserver.org/ns/"
+
+# RFC 6578: an empty <sync-token/> asks for the full listing plus a token.
+SYNC_COLLECTION_BODY = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<D:sync-collection xmlns:D="DAV:">'
+    "<D:sync-token>{token}</D:sync-token>"
+    "<D:sync-level>1</D:sync-level>"
+    "<D:prop><D:getetag/></D:prop>"
+    "</D:sync-collection>"
+)
+
+CTAG_BODY = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<D:propfind xmlns:D="DAV:" xmlns:CS="http://calendarserver.org/ns/">'
+    "<D:prop><CS:getctag/><D:sync-token/></D:prop>"
+    "</D:propfind>"
+)
+
+CALENDARS_BODY = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<D:propfind xmlns:D="DAV:"><D:prop><D:resourcetype/></D:prop></D:propfind>'
+)
+
+ETAGS_BODY = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<D:propfind xmlns:D="DAV:"><D:prop><D:getetag/></D:prop></D:propfind>'
+)
+
+MULTIGET_BODY = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<C:calendar-multiget xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">'
+    "<D:prop><D:getetag/><C:calendar-data/></D:prop>"
+    "{hrefs}"
+    "</C:calendar-multiget>"
+)
+
+# RFC 4791 calendar-query: the events overlapping a time range, with only
+# the properties listed in {props} sent back.
+CALENDAR_QUERY_BODY = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">'
+    "<D:prop><D:getetag/><C:calendar-data>"
+    '<C:comp name="VCALENDAR"><C:prop name="VERSION"/><C:comp name="VEVENT">{props}</C:comp></C:comp>'
+    "</C:calendar-data></D:prop>"
+    '<C:filter><C:comp-filter name="VCALENDAR"><C:comp-filter name="VEVENT">'
+    '<C:time-range start="{start}" end="{end}"/>'
+    "</C:comp-filter></C:comp-filter></C:filter>"
+    "</C:calendar-query>"
+)
+
+# Event properties a range query asks for; the rest (descriptions, alarms,
+# attendees) stays on the server.
+RANGE_PROPS = ("UID", "SUMMARY", "DTSTART", "DTEND", "DURATION", "RRULE", "RECURRENCE-ID")
+
+XML_HEADERS = {"Content-Type": "application/xml; charset=utf-8"}
+
+# How many hrefs to ask for in one calendar-multiget REPORT.
+MULTIGET_BATCH = 200
+
+# Replicas synced more recently than this (seconds) are served without a round trip.
+SYNC_MAX_AGE = float(os.environ.get("PROSWEET_SYNC_MAX_AGE", "0"))
+
+
+# ============================================================
+#  REPLICA
+# ============================================================
+
+class CalendarReplica:
+    """
+    Local copy of one Radicale calendar collection.
+
+    `items` maps each resource href to its last known ETag and the events it
+    contains. `sync_token` is the RFC 6578 token of the last successful sync;
+    `ctag` is the CalendarServer collection tag used when the server does not
+    support sync-collection. The sync code only goes through the methods
+    below, so StoredReplica can keep the same data on disk instead.
+    """
+
+    store = None
+
+    def __init__(self, collection_url: str):
+        self.collection_url = collection_url
+        path = collection_url.split("://", 1)[-1]
+        self.path = path[path.find("/"):] if "/" in path else "/"
+        self.items = {}  # href -> {"etag": str | None, "events": [dict]}
+        self.sync_token = None
+        self.ctag = None
+        self.synced_at = 0.0
+        self.lock = None  # asyncio.Lock, created lazily on the loop that syncs
+        self.refreshing = None  # background sync task, see local_view()
+
+    def href_for(self, uid: str) -> str:
+        return f"{self.path}{uid}.ics"
+
+    @property
+    def warm(self) -> bool:
+        """True once the replica holds a complete listing it can answer from."""
+        return self.synced_at > 0
+
+    def events(self) -> list:
+        return [event for item in self.items.values() for event in item["events"]]
+
+    def between(self, start: str, end: str) -> list:
+        """Events overlapping [start, end), given as compact UTC times."""
+        return [event for event in self.events() if _overlaps(event, start, end)]
+
+    def etag_for(self, uid: str):
+        return self.etag(self.href_for(uid))
+
+    # ---------------- sync ----------------
+
+    def etag(self, href: str):
+        item = self.items.get(href)
+        return item["etag"] if item else None
+
+    def etags(self) -> dict:
+        """href -> ETag of every resource held."""
+        return {href: item["etag"] for href, item in self.items.items()}
+
+    def store_resources(self, resources: list):
+        """Keep (href, etag, events) resources just downloaded."""
+        for href, etag, events in resources:
+            self.items[href] = {"etag": etag, "events": events}
+
+    def drop(self, hrefs):
+        for href in hrefs:
+            self.items.pop(href, None)
+
+    def replace(self, resources: list):
+        """Start over from a complete (href, etag, events) listing."""
+        self.items = {}
+        self.store_resources(resources)
+
+    def save_state(self):
+        """Called after every successful sync."""
+
+    # ---------------- local writes ----------------
+
+    def apply_put(self, uid: str, etag, event: dict):
+        """Record one of our own successful PUTs so the next sync does not refetch it."""
+        self.store_resources([(self.href_for(uid), etag, [event])])
+
+    def apply_delete(self, uid: str):
+        """Record one of our own successful DELETEs."""
+        self.drop([self.href_for(uid)])
+
+
+class StoredReplica(CalendarReplica):
+    """
+    CalendarReplica backed by an event_store.EventStore: resources, events
+    and the sync-token / CTag survive the process, and reads go through the
+    store's indexes instead of holding the calendar in memory.
+    """
+
+    def __init__(self, collection_url: str, store: event_store.EventStore):
+        super().__init__(collection_url)
+        self.items = None
+        self.store = store
+        self.sync_token = store.get_meta("sync_token")
+        self.ctag = store.get_meta("ctag")
+
+    @property
+    def warm(self) -> bool:
+        return self.synced_at > 0 or self.sync_token is not None or self.ctag is not None
+
+    def events(self) -> list:
+        return self.store.events()
+
+    def between(self, start: str, end: str) -> list:
+        return self.store.between(start, end)
+
+    def etag(self, href: str):
+        return self.store.etag(href)
+
+    def etags(self) -> dict:
+        return self.store.etags()
+
+    def store_resources(self, resources: list):
+        self.store.put_many(resources)
+
+    def drop(self, hrefs):
+        self.store.delete_many(hrefs)
+
+    def replace(self, resources: list):
+        self.store.clear()
+        self.store.put_many(resources)
+
+    def save_state(self):
+        self.store.set_meta(sync_token=self.sync_token, ctag=self.ctag)
+
+
+_replicas = {}
+_replicas_lock = threading.Lock()
+
+
+def get_replica(base_url: str, username: str, calendar_id: str) -> CalendarReplica:
+    """
+    Return the shared replica for this user's calendar, created on first use:
+    from its on-disk store when event_store.ENABLED, otherwise empty.
+    """
+    collection_url = f"{base_url.rstrip('/')}/{username}/{calendar_id}/"
+    with _replicas_lock:
+        replica = _replicas.get(collection_url)
+        if replica is None:
+            if event_store.ENABLED:
+                replica = StoredReplica(collection_url, event_store.store_for(collection_url))
+            else:
+                replica = CalendarReplica(collection_url)
+            _replicas[collection_url] = replica
+        return replica
+
+
+# ============================================================
+#  SYNC
+# ============================================================
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _response(response: ET.Element) -> tuple:
+    href = response.findtext(f"{{{DAV}}}href")
+    status = response.findtext(f"{{{DAV}}}status")
+    props = {}
+    for propstat in response.iter(f"{{{DAV}}}propstat"):
+        if " 200 " not in (propstat.findtext(f"{{{DAV}}}status") or ""):
+            continue
+        for prop in propstat.find(f"{{{DAV}}}prop"):
+            props[_local(prop.tag)] = prop.text
+    return href, status, props
+
+
+def _parse_multistatus(body: bytes):
+    """
+    Yield (href, status, props) for each <response> of a multistatus body,
+    where props maps local property names to their text (200 propstats only).
+    A top-level sync-token is yielded last as (None, None, {"sync-token": ...}).
+    """
+    root = ET.fromstring(body)
+    for response in root.iter(f"{{{DAV}}}response"):
+        yield _response(response)
+    token = root.findtext(f"{{{DAV}}}sync-token")
+    if token:
+        yield None, None, {"sync-token": token}
+
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+async def _multiget(client, replica: CalendarReplica, hrefs: list):
+    """Download and parse the given resources with calendar-multiget REPORTs."""
+    metrics.inc("sync_resources_fetched_total", len(hrefs))
+    for i in range(0, len(hrefs), MULTIGET_BATCH):
+        batch = hrefs[i:i + MULTIGET_BATCH]
+        body = MULTIGET_BODY.format(hrefs="".join(f"<D:href>{_escape(h)}</D:href>" for h in batch))
+        response = await client.request("REPORT", replica.collection_url, content=body,
+                                        headers={**XML_HEADERS, "Depth": "1"})
+        response.raise_for_status()
+        replica.store_resources([
+            (href, props.get("getetag"), parse_ics(props["calendar-data"] or ""))
+            for href, status, props in _parse_multistatus(response.content)
+            if href is not None and "calendar-data" in props
+        ])
+
+
+async def _sync_collection(client, replica: CalendarReplica) -> bool:
+    """RFC 6578 incremental sync. Returns False if the server refused the REPORT."""
+    body = SYNC_COLLECTION_BODY.format(token=_escape(replica.sync_token or ""))
+    response = await client.request("REPORT", replica.collection_url, content=body,
+                                    headers={**XML_HEADERS, "Depth": "1"})
+    if response.status_code in (403, 409) and replica.sync_token:
+        # <valid-sync-token/> precondition: our token expired, start over.
+        metrics.inc("retries_total", reason="sync_token_expired")
+        replica.sync_token = None
+        return await _sync_collection(client, replica)
+    if response.status_code in (400, 403, 404, 405, 409, 501):
+        return False  # no sync-collection support
+    response.raise_for_status()
+
+    initial = replica.sync_token is None
+    # A full listing compares against every held ETag at once; a delta looks up the few it names.
+    held = replica.etags() if initial else None
+    known_etag = held.get if initial else replica.etag
+    changed, removed, seen, token = [], [], set(), None
+    for href, status, props in _parse_multistatus(response.content):
+        if href is None:
+            token = props["sync-token"]
+            continue
+        if href.endswith("/"):
+            continue  # the collection itself
+        if status and " 404 " in status:
+            removed.append(href)
+            continue
+        seen.add(href)
+        etag = props.get("getetag")
+        if etag is None or known_etag(href) != etag:
+            changed.append(href)
+
+    if initial:
+        # A fresh listing is authoritative: drop anything the server no longer has.
+        removed.extend(h for h in held if h not in seen)
+    replica.drop(removed)
+
+    await _multiget(client, replica, changed)
+    replica.sync_token = token
+    return True
+
+
+async def _sync_by_etags(client, replica: CalendarReplica):
+    """Fallback: compare the collection CTag, then per-resource ETags."""
+    response = await client.request("PROPFIND", replica.collection_url, content=CTAG_BODY,
+                                    headers={**XML_HEADERS, "Depth": "0"})
+    response.raise_for_status()
+    ctag = None
+    for href, _, props in _parse_multistatus(response.content):
+        if href is not None:
+            ctag = props.get("getctag") or props.get("sync-token")
+    if ctag is not None and ctag == replica.ctag:
+        return
+
+    response = await client.request("PROPFIND", replica.collection_url, content=ETAGS_BODY,
+                                    headers={**XML_HEADERS, "Depth": "1"})
+    response.raise_for_status()
+    remote = {}
+    for href, _, props in _parse_multistatus(response.content):
+        if href is None or href.endswith("/"):
+            continue
+        remote[href] = props.get("getetag")
+
+    held = replica.etags()
+    replica.drop([h for h in held if h not in remote])
+    changed = [h for h, etag in remote.items() if h not in held or etag is None or held[h] != etag]
+    await _multiget(client, replica, changed)
+    replica.ctag = ctag
+
+
+async def _sync_by_full_get(client, replica: CalendarReplica):
+    """
+    Last resort for servers without REPORT or PROPFIND support: stream the
+    whole collection and parse it line by line as it arrives. Resources are
+    keyed by UID since a plain GET carries no hrefs or ETags.
+    """
+    items = {}
+    async with client.stream("GET", replica.collection_url) as response:
+        response.raise_for_status()
+        async for event in aiter_vevents(response.aiter_lines()):
+            items.setdefault(replica.href_for(event["uid"]), []).append(event)
+    replica.replace([(href, None, events) for href, events in items.items()])
+
+
+async def sync_replica(client, replica: CalendarReplica, max_age: float = None) -> list:
+    """
+    Bring the replica up to date and return its events.
+
+    Tries an RFC 6578 sync-collection REPORT first; if the server refuses it
+    (or the token expired) falls back to a CTag/ETag comparison. Either way
+    only new or changed resources are downloaded and re-parsed. Servers with
+    neither get a streamed full GET. Skips the
+    round trip entirely when the last sync is younger than `max_age` seconds.
+    """
+    import httpx  # imported on first use, see http_client._new_async_client()
+
+    if replica.lock is None:
+        replica.lock = asyncio.Lock()
+    if max_age is None:
+        max_age = SYNC_MAX_AGE
+    async with replica.lock:
+        if max_age and time.monotonic() - replica.synced_at < max_age:
+            return replica.events()
+        mode = "sync-collection"
+        if not await _sync_collection(client, replica):
+            replica.sync_token = None
+            try:
+                mode = "etags"
+                await _sync_by_etags(client, replica)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in (405, 501):
+                    raise
+                mode = "full-get"
+                await _sync_by_full_get(client, replica)
+        metrics.inc("syncs_total", mode=mode)
+        replica.save_state()
+        replica.synced_at = time.monotonic()
+        return replica.events()
+
+
+# ============================================================
+#  DISCOVERY
+# ============================================================
+
+async def find_calendars(client, home_url: str) -> list:
+    """URLs of the calendar collections directly under a user's home (Radicale: /<user>/)."""
+    response = await client.request("PROPFIND", home_url, content=CALENDARS_BODY,
+                                    headers={**XML_HEADERS, "Depth": "1"})
+    response.raise_for_status()
+    calendars = []
+    for element in ET.fromstring(response.content).iter(f"{{{DAV}}}response"):
+        if element.find(f"{{{DAV}}}propstat/{{{DAV}}}prop/{{{DAV}}}resourcetype/{{{CALDAV}}}calendar") is not None:
+            calendars.append(str(response.url.join(element.findtext(f"{{{DAV}}}href"))))
+    return calendars
+
+
+# ============================================================
+#  TIME-RANGE QUERY
+# ============================================================
+
+async def aiter_multistatus(chunks):
+    """
+    Incremental _parse_multistatus() over an async iterable of byte chunks
+    (e.g. `httpx.Response.aiter_bytes()`). Each <response> is yielded as
+    soon as its closing tag arrives and then cleared, so only one resource
+    is held in memory however large the answer.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    tag = f"{{{DAV}}}response"
+    async for chunk in chunks:
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            if element.tag == tag:
+                yield _response(element)
+                element.clear()
+    parser.close()
+
+
+def ical_utc(moment: dt.datetime) -> str:
+    """A time-range bound; naive datetimes are UTC, as in calendar_window.window_params()."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(dt.timezone.utc)
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+
+async def query_range(client, collection_url: str, start: dt.datetime, end: dt.datetime,
+                      props: tuple = RANGE_PROPS):
+    """
+    Events overlapping [start, end) through a calendar-query REPORT, so the
+    server does the filtering and sends back only `props` of each match.
+    Returns None when the server does not support the REPORT.
+    """
+    body = CALENDAR_QUERY_BODY.format(start=ical_utc(start), end=ical_utc(end),
+                                      props="".join(f'<C:prop name="{p}"/>' for p in props))
+    events = []
+    async with client.stream("REPORT", collection_url, content=body,
+                             headers={**XML_HEADERS, "Depth": "1"}) as response:
+        if response.status_code in (400, 403, 404, 405, 501):
+            return None
+        response.raise_for_status()
+        async for href, _, props_found in aiter_multistatus(response.aiter_bytes()):
+            if href and props_found.get("calendar-data"):
+                events.extend(parse_ics(props_found["calendar-data"]))
+        metrics.inc("range_query_bytes_total", response.num_bytes_downloaded)
+    metrics.inc("range_queries_total", mode="calendar-query")
+    return events
+
+
+def _overlaps(event: dict, start: str, end: str) -> bool:
+    """Compare compact iCalendar times as strings; dates sort before their own times."""
+    begin = event.get("start_time") or ""
+    finish = event.get("end_time") or begin
+    return bool(begin) and begin < end and (finish > start or finish == begin >= start)
+
+
+async def events_between(client, replica: CalendarReplica, start: dt.datetime, end: dt.datetime) -> list:
+    """
+    Events of the replica's collection overlapping [start, end): asked of
+    the server with query_range(), or, where calendar-query is refused,
+    taken from the synced replica and filtered here.
+    """
+    events = await query_range(client, replica.collection_url, start, end)
+    if events is not None:
+        return events
+    metrics.inc("range_queries_total", mode="replica")
+    first, last = ical_utc(start), ical_utc(end)
+    return [event for event in await sync_replica(client, replica) if _overlaps(event, first, last)]
+
+
+# ============================================================
+#  LOCAL READS
+# ============================================================
+
+async def _refresh(client, replica: CalendarReplica):
+    import httpx
+
+    try:
+        await sync_replica(client, replica)
+    except (httpx.HTTPError, ET.ParseError) as e:
+        print(f"⚠️ Background sync failed: {e}")
+        metrics.inc("fetch_errors_total", agent="sync")
+
+
+def refresh_in_background(client, replica: CalendarReplica):
+    """Start a sync on the running loop unless one is already under way."""
+    if replica.refreshing is None or replica.refreshing.done():
+        replica.refreshing = asyncio.ensure_future(_refresh(client, replica))
+
+
+async def local_view(client, replica: CalendarReplica, window: tuple = None) -> list:
+    """
+    Events of the replica (only those in `window=(start, end)` if given)
+    without waiting on the server: the first call on a cold replica syncs,
+    later ones answer from the local copy and refresh it in the background,
+    so the answer is at most one sync behind.
+    """
+    if replica.warm:
+        refresh_in_background(client, replica)
+        metrics.inc("local_reads_total", mode="warm")
+    else:
+        await sync_replica(client, replica)
+        metrics.inc("local_reads_total", mode="cold")
+    if window is None:
+        return replica.events()
+    return replica.between(ical_utc(window[0]), ical_utc(window[1]))
@@ -0,0 +1,355 @@
+"""
+Where the agents' calendar reads and writes go.
+
+    PROSWEET_BACKEND=gateway   through the Hono gateway's REST API (default)
+    PROSWEET_BACKEND=caldav    straight to Radicale (PROSWEET_CALDAV_URL)
+
+Both backends answer in the gateway's shapes, as httpx.Response objects, so
+the agents handle either the same way: list_events() gives {"events": [...]}
+with uid, summary, description, start, end, etag and alarms per event;
+create_event() {"created": {uid, etag}}; update_event() {"updated": {uid,
+etag}} or {"ok": false, "status": 412|404}; delete_event() {"ok": ...}.
+
+The gateway looks up the user's calendars before every call and re-encodes
+everything as JSON; CalDAVBackend finds the calendar once per user (or takes
+PROSWEET_CALENDAR), lists with one calendar-query REPORT and writes events
+and their VALARMs as iCalendar itself.
+"""
+import datetime as dt
+import os
+import uuid
+from urllib.parse import quote
+
+try:
+    from . import caldav_sync, calendar_window, metrics
+    from .http_client import get_async_client
+    from .ical_stream import parse_ics
+except ImportError:
+    import caldav_sync
+    import calendar_window
+    import metrics
+    from http_client import get_async_client
+    from ical_stream import parse_ics
+
+# ============================================================
+#  CONFIGURATION
+# ============================================================
+
+BACKEND = os.environ.get("PROSWEET_BACKEND", "gateway")
+CALDAV_URL = os.environ.get("PROSWEET_CALDAV_URL", "http://localhost:5232")
+# Calendar (collection name under the user's home) to use; the first one found when empty.
+CALENDAR = os.environ.get("PROSWEET_CALENDAR", "")
+
+# calendar-query for every VEVENT (in {time_range}, when given), whole resources.
+EVENTS_QUERY_BODY = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">'
+    "<D:prop><D:getetag/><C:calendar-data/></D:prop>"
+    '<C:filter><C:comp-filter name="VCALENDAR"><C:comp-filter name="VEVENT">{time_range}'
+    "</C:comp-filter></C:comp-filter></C:filter>"
+    "</C:calendar-query>"
+)
+
+
+def auth_refused(error: Exception) -> bool:
+    """True when `error` is the server turning the credentials down (401 or 403)."""
+    return getattr(getattr(error, "response", None), "status_code", None) in (401, 403)
+
+
+def _url(base_url):
+    """Accept a URL or a function returning it (read on every call, so it can be changed later)."""
+    return base_url if callable(base_url) else (lambda: base_url)
+
+
+# ============================================================
+#  GATEWAY
+# ============================================================
+
+class GatewayBackend:
+    """The Hono gateway's /events API."""
+
+    name = "gateway"
+
+    def __init__(self, base_url):
+        self.base_url = _url(base_url)
+
+    async def check_credentials(self, username: str, password: str) -> bool:
+        """False when the gateway refuses the credentials (an empty listing); other failures raise."""
+        now = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+        response = await self.list_events(username, password, (now, now))
+        if response.status_code in (401, 403):
+            return False
+        response.raise_for_status()
+        return True
+
+    async def list_events(self, username: str, password: str, window: tuple = None) -> "httpx.Response":
+        url = self.base_url()
+        params = calendar_window.window_params(window) if window else {"all": "true"}
+        return await get_async_client(url, username, password).get(f"{url}/events", params=params)
+
+    async def create_event(self, username: str, password: str, data: dict, uid: str = None) -> "httpx.Response":
+        url = self.base_url()
+        client = get_async_client(url, username, password)
+        payload = {**data, "uid": uid} if uid else data
+        response = await client.post(f"{url}/events", json=payload)
+        if response.status_code == 401:
+            # some deployments only accept writes under the user's own path
+            print("⚠️ Received 401 — retrying with username in URL...")
+            metrics.inc("retries_total", backend=self.name, reason="401_user_path")
+            response = await client.post(f"{url}/{username}/events", json=payload)
+        return response
+
+    async def update_event(self, username: str, password: str, uid: str, data: dict,
+                           etag: str = None) -> "httpx.Response":
+        url = self.base_url()
+        return await get_async_client(url, username, password).put(
+            f"{url}/events/{uid}", json=data, headers={"If-Match": etag} if etag else {})
+
+    async def delete_event(self, username: str, password: str, uid: str) -> "httpx.Response":
+        url = self.base_url()
+        return await get_async_client(url, username, password).delete(f"{url}/events/{uid}")
+
+
+# ============================================================
+#  ICALENDAR
+# ============================================================
+
+def escape_text(value) -> str:
+    """RFC 5545 TEXT escaping (the inverse of ical_stream.unescape_text)."""
+    return (str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold(line: str) -> str:
+    """Fold a content line into pieces of at most 75 octets, continued after CRLF and a space."""
+    if len(line) <= 75 and line.isascii():
+        return line
+    pieces, piece, size = [], "", 0
+    for ch in line:
+        width = len(ch.encode())
+        if size + width > 75:
+            pieces.append(piece)
+            piece, size = "", 1  # the continuation's leading space counts
+        piece += ch
+        size += width
+    pieces.append(piece)
+    return "\r\n ".join(pieces)
+
+
+def ical_time(value) -> str:
+    """A tool call's ISO time as a UTC iCalendar time (read as calendar_window.tool_time() says)."""
+    return caldav_sync.ical_utc(calendar_window.tool_time(value))
+
+
+def iso_time(value: str) -> str:
+    """
+    A compact iCalendar time in the gateway's format: 2025-01-01T09:00:00.000Z
+    for UTC, 2025-01-01T09:00:00 for floating times, 2025-01-01 for dates.
+    """
+    if not value or len(value) < 15:
+        return f"{value[0:4]}-{value[4:6]}-{value[6:8]}" if value and len(value) == 8 else value
+    iso = f"{value[0:4]}-{value[4:6]}-{value[6:8]}T{value[9:11]}:{value[11:13]}:{value[13:15]}"
+    return iso + ".000Z" if value.endswith("Z") else iso
+
+
+def _is_duration(trigger: str) -> bool:
+    return trigger.lstrip("+-").upper().startswith("P")
+
+
+def alarm_lines(alarm: dict, summary: str) -> list:
+    """
+    One VALARM as content lines. Triggers are durations relative to the
+    start (-PT10M) or absolute ISO times, as the gateway takes them; DISPLAY
+    and EMAIL alarms get the DESCRIPTION (and SUMMARY) RFC 5545 requires.
+    """
+    action = str(alarm.get("action") or "DISPLAY").upper()
+    trigger = str(alarm.get("trigger") or "-PT10M").strip()
+    lines = ["BEGIN:VALARM", f"ACTION:{action}"]
+    if _is_duration(trigger):
+        lines.append(f"TRIGGER:{trigger.upper()}")
+    else:
+        lines.append(f"TRIGGER;VALUE=DATE-TIME:{ical_time(trigger)}")
+    if action in ("DISPLAY", "EMAIL"):
+        lines.append(f"DESCRIPTION:{escape_text(alarm.get('description') or summary)}")
+    if action == "EMAIL":
+        lines.append(f"SUMMARY:{escape_text(alarm.get('summary') or summary)}")
+        for attendee in alarm.get("attendees") or []:
+            lines.append(f"ATTENDEE:{attendee if ':' in attendee else 'mailto:' + attendee}")
+    lines.append("END:VALARM")
+    return lines
+
+
+def event_ics(uid: str, data: dict) -> str:
+    """A gateway event body (summary, start, end, description, location, alarms, rrule, allDay) as .ics."""
+    summary = data.get("summary") or ""
+    if data.get("allDay"):
+        start = f"DTSTART;VALUE=DATE:{str(data['start'])[:10].replace('-', '')}"
+        end = f"DTEND;VALUE=DATE:{str(data['end'])[:10].replace('-', '')}"
+    else:
+        start, end = f"DTSTART:{ical_time(data['start'])}", f"DTEND:{ical_time(data['end'])}"
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "CALSCALE:GREGORIAN",
+        "PRODID:-//ProSweet Planner//EN",
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{caldav_sync.ical_utc(dt.datetime.now(dt.timezone.utc))}",
+        f"SUMMARY:{escape_text(summary)}",
+        start,
+        end,
+    ]
+    if data.get("description"):
+        lines.append(f"DESCRIPTION:{escape_text(data['description'])}")
+    if data.get("location"):
+        lines.append(f"LOCATION:{escape_text(data['location'])}")
+    if data.get("rrule"):
+        lines.append(f"RRULE:{str(data['rrule']).removeprefix('RRULE:')}")
+    for alarm in data.get("alarms") or []:
+        if isinstance(alarm, dict):
+            lines.extend(alarm_lines(alarm, summary))
+    lines += ["END:VEVENT", "END:VCALENDAR", ""]
+    return "\r\n".join(fold(line) for line in lines)
+
+
+def gateway_event(event: dict, href: str, etag: str) -> dict:
+    """An ical_stream event (parsed with alarms) in the shape GET /events returns."""
+    alarms = [{**alarm, "trigger": alarm.get("trigger") if _is_duration(alarm.get("trigger") or "P")
+               else iso_time(alarm["trigger"])} for alarm in event.get("alarms") or ()]
+    return {
+        "uid": event.get("uid"),
+        "summary": event.get("summary"),
+        "description": event.get("description"),
+        "start": iso_time(event.get("start_time")),
+        "end": iso_time(event.get("end_time")),
+        "allDay": len(event.get("start_time") or "") == 8,
+        "rrule": event.get("rrule"),
+        "etag": etag,
+        "href": href,
+        "alarms": alarms,
+    }
+
+
+# ============================================================
+#  DIRECT CALDAV
+# ============================================================
+
+def _answer(response: "httpx.Response", status: int, body: dict) -> "httpx.Response":
+    """A gateway-shaped answer to a CalDAV request (kept as its request, for raise_for_status)."""
+    import httpx  # imported on first use, see http_client._new_async_client()
+
+    return httpx.Response(status, json=body, request=response.request)
+
+
+class CalDAVBackend:
+    """
+    Radicale itself. The calendar is the first one under /<user>/ unless
+    `calendar` names it; the href of every listed event is remembered, so
+    events other clients stored under another name than <uid>.ics can still
+    be updated and deleted by UID.
+    """
+
+    name = "caldav"
+
+    def __init__(self, base_url=CALDAV_URL, calendar: str = None):
+        self.base_url = _url(base_url)
+        self.calendar = calendar
+        self._collections = {}  # (server, username) -> collection URL
+        self._hrefs = {}        # (username, uid) -> resource URL
+
+    async def collection(self, username: str, password: str) -> str:
+        url = self.base_url().rstrip("/")
+        key = (url, username)
+        if key not in self._collections:
+            if self.calendar:
+                self._collections[key] = f"{url}/{quote(username)}/{quote(self.calendar)}/"
+            else:
+                client = get_async_client(url, username, password)
+                calendars = await caldav_sync.find_calendars(client, f"{url}/{quote(username)}/")
+                if not calendars:
+                    import httpx
+
+                    raise httpx.HTTPError(f"No calendars found for {username}")
+                self._collections[key] = calendars[0]
+        return self._collections[key]
+
+    async def check_credentials(self, username: str, password: str) -> bool:
+        """False when Radicale refuses the credentials (a Depth: 0 PROPFIND of the home); other failures raise."""
+        url = self.base_url().rstrip("/")
+        response = await get_async_client(url, username, password).request(
+            "PROPFIND", f"{url}/{quote(username)}/", headers={**caldav_sync.XML_HEADERS, "Depth": "0"})
+        if response.status_code in (401, 403):
+            return False
+        response.raise_for_status()
+        return True
+
+    async def _href(self, username: str, password: str, uid: str) -> str:
+        href = self._hrefs.get((username, uid))
+        return href or f"{await self.collection(username, password)}{quote(uid, safe='@.-_')}.ics"
+
+    async def list_events(self, username: str, password: str, window: tuple = None) -> "httpx.Response":
+        client = get_async_client(self.base_url(), username, password)
+        collection = await self.collection(username, password)
+        time_range = ""
+        if window:
+            time_range = (f'<C:time-range start="{caldav_sync.ical_utc(window[0])}" '
+                          f'end="{caldav_sync.ical_utc(window[1])}"/>')
+        events = []
+        async with client.stream("REPORT", collection, content=EVENTS_QUERY_BODY.format(time_range=time_range),
+                                 headers={**caldav_sync.XML_HEADERS, "Depth": "1"}) as response:
+            if response.status_code != 207:
+                await response.aread()
+                return response
+            # hrefs are absolute paths; httpx's URL.join would cost more than parsing the event
+            origin = f"{response.url.scheme}://{response.url.netloc.decode('ascii')}"
+            async for href, _, props in caldav_sync.aiter_multistatus(response.aiter_bytes()):
+                if not href or not props.get("calendar-data"):
+                    continue
+                href = origin + href if href.startswith("/") else href
+                for event in parse_ics(props["calendar-data"], alarms=True):
+                    events.append(gateway_event(event, href, props.get("getetag")))
+                    self._hrefs[(username, event.get("uid"))] = href
+        return _answer(response, 200, {"events": events})
+
+    async def _put(self, username: str, password: str, uid: str, data: dict, headers: dict) -> "httpx.Response":
+        href = await self._href(username, password, uid)
+        response = await get_async_client(self.base_url(), username, password).put(
+            href, content=event_ics(uid, data).encode("utf-8"),
+            headers={"Content-Type": "text/calendar; charset=utf-8", **headers})
+        if response.is_success:
+            self._hrefs[(username, uid)] = href
+        return response
+
+    async def create_event(self, username: str, password: str, data: dict, uid: str = None) -> "httpx.Response":
+        uid = uid or data.get("uid") or str(uuid.uuid4())
+        response = await self._put(username, password, uid, data, {"If-None-Match": "*"})
+        if not response.is_success:
+            return _answer(response, response.status_code, {"ok": False, "status": response.status_code})
+        return _answer(response, 200, {"created": {"uid": uid, "etag": response.headers.get("ETag"),
+                                                   "href": str(response.request.url)}})
+
+    async def update_event(self, username: str, password: str, uid: str, data: dict,
+                           etag: str = None) -> "httpx.Response":
+        # Without an ETag, If-Match: * still makes it an update: a missing UID fails instead of being created.
+        response = await self._put(username, password, uid, data, {"If-Match": etag or "*"})
+        if response.status_code == 412 and not etag:
+            return _answer(response, 404, {"ok": False, "status": 404})  # as the gateway reports it
+        if not response.is_success:
+            return _answer(response, response.status_code, {"ok": False, "status": response.status_code})
+        return _answer(response, 200, {"updated": {"uid": uid, "etag": response.headers.get("ETag"),
+                                                   "href": str(response.request.url)}})
+
+    async def delete_event(self, username: str, password: str, uid: str) -> "httpx.Response":
+        href = await self._href(username, password, uid)
+        response = await get_async_client(self.base_url(), username, password).delete(href)
+        if response.is_success:
+            self._hrefs.pop((username, uid), None)
+            return _answer(response, 200, {"ok": True, "status": response.status_code})
+        return _answer(response, response.status_code, {"ok": False, "status": response.status_code})
+
+
+def from_env(gateway_url):
+    """The backend PROSWEET_BACKEND selects; `gateway_url` is the agent's gateway (URL or function)."""
+    if BACKEND == "caldav":
+        return CalDAVBackend(lambda: CALDAV_URL, CALENDAR or None)
+    return GatewayBackend(gateway_url)
@@ -0,0 +1,269 @@
+import datetime as dt
+import os
+import re
+
+# ============================================================
+#  WINDOW CONFIGURATION
+# ============================================================
+
+# Default slice of the calendar sent with every prompt, relative to today.
+WINDOW_PAST_DAYS = int(os.environ.get("PROSWEET_WINDOW_PAST_DAYS", "7"))
+WINDOW_FUTURE_DAYS = int(os.environ.get("PROSWEET_WINDOW_FUTURE_DAYS", "30"))
+
+# How many times the model may ask to look further before we stop fetching.
+MAX_WIDEN_ROUNDS = 2
+
+get_events_in_range_schema = {
+    "name": "get_events_in_range",
+    "description": (
+        "Loads the user's events between two dates when the event they mean is not in the list "
+        "you were given (the list only covers a window around today)."
+    ),
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "start_date": {"type": "string", "description": "YYYY-MM-DD, inclusive"},
+            "end_date": {"type": "string", "description": "YYYY-MM-DD, inclusive"},
+        },
+        "required": ["start_date", "end_date"],
+    },
+}
+
+# ============================================================
+#  DATE MENTIONS
+# ============================================================
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+# Month names and their usual abbreviations only, so "marathon 5" or "decide 3" are not dates.
+_MONTH = (r"\b(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+          r"sep(?:t|tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b\.?")
+
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_SLASH_DATE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b")
+_MONTH_DAY = re.compile(_MONTH + r"\s+(\d{1,2})(?:st|nd|rd|th)?\b(?:,?\s+(\d{4}))?")
+_DAY_MONTH = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?" + _MONTH + r"(?:,?\s+(\d{4}))?")
+_MONTH_ONLY = re.compile(r"\b(?:in|during)\s+" + _MONTH + r"(?:\s+(\d{4}))?\b")
+_RELATIVE = re.compile(r"\b(in|next|last|past)\s+(\d+|a|an)?\s*(day|week|month|year)s?\b")
+_NAMED_DAY = re.compile(r"\b(?:(the\s+day\s+after\s+tomorrow)|(today|tonight)|(tomorrow))\b")
+_WEEKDAY = re.compile(r"\b(?:(next|this)\s+)?(mon|tue|wed|thu|fri|sat|sun)[a-z]*day\b")
+_WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def _safe_date(year: int, month: int, day: int):
+    try:
+        return dt.date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _nearest_year(month: int, day: int, today: dt.date):
+    """A date given without a year means its closest occurrence to today."""
+    candidates = [_safe_date(today.year + k, month, day) for k in (-1, 0, 1)]
+    candidates = [c for c in candidates if c]
+    return min(candidates, key=lambda c: abs((c - today).days)) if candidates else None
+
+
+def _add_months(day: dt.date, months: int) -> dt.date:
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    month = month % 12 + 1
+    return dt.date(year, month, min(day.day, 28))
+
+
+def _explicit_days(text: str, today: dt.date):
+    """(span, date) of every written-out date in `text` (already lower-cased)."""
+    for match in _ISO_DATE.finditer(text):
+        y, m, d = match.groups()
+        yield match.span(), _safe_date(int(y), int(m), int(d))
+    for match in _SLASH_DATE.finditer(text):
+        m, d, y = match.groups()
+        if y:
+            year = int(y) + (2000 if len(y) == 2 else 0)
+            yield match.span(), _safe_date(year, int(m), int(d))
+        else:
+            yield match.span(), _nearest_year(int(m), int(d), today)
+    for match in _MONTH_DAY.finditer(text):
+        month, d, y = _MONTHS[match.group(1)[:3]], int(match.group(2)), match.group(3)
+        yield match.span(), _safe_date(int(y), month, d) if y else _nearest_year(month, d, today)
+    for match in _DAY_MONTH.finditer(text):
+        d, month, y = int(match.group(1)), _MONTHS[match.group(2)[:3]], match.group(3)
+        yield match.span(), _safe_date(int(y), month, d) if y else _nearest_year(month, d, today)
+
+
+def mentioned_ranges(text: str, today: dt.date = None) -> list:
+    """
+    Find the dates a user prompt refers to, as (first_day, last_day) pairs.
+
+    Understands ISO dates, M/D[/Y], "March 14[, 2026]", "14th of March",
+    "in March", and relative phrases such as "next month" or "in 3 weeks".
+    """
+    today = today or dt.date.today()
+    text = text.lower()
+    ranges = [(day, day) for _, day in _explicit_days(text, today) if day]
+
+    for match in _MONTH_ONLY.findall(text):
+        month, y = _MONTHS[match[0][:3]], match[1]
+        first = _safe_date(int(y), month, 1) if y else _nearest_year(month, 15, today).replace(day=1)
+        last = _add_months(first, 1) - dt.timedelta(days=1)
+        ranges.append((first, last))
+    for direction, count, unit in _RELATIVE.findall(text):
+        n = 1 if count in ("", "a", "an") else int(count)
+        sign = -1 if direction in ("last", "past") else 1
+        if unit == "day":
+            target = today + dt.timedelta(days=sign * n)
+        elif unit == "week":
+            target = today + dt.timedelta(weeks=sign * n)
+        elif unit == "month":
+            target = _add_months(today, sign * n)
+        else:
+            target = _add_months(today, sign * 12 * n)
+        ranges.append((min(today, target) - dt.timedelta(days=7), max(today, target) + dt.timedelta(days=7)))
+    return ranges
+
+
+def mentioned_day(text: str, today: dt.date = None) -> tuple:
+    """
+    The one day a phrase names ("tomorrow", "friday", "next tuesday",
+    "March 14", "2026-03-14") and the text left once that mention is cut
+    out, as (date, rest). (None, text) if it names no day, or more than one.
+    """
+    today = today or dt.date.today()
+    lowered = text.lower()
+    found = [(span, day) for span, day in _explicit_days(lowered, today)]
+    for match in _NAMED_DAY.finditer(lowered):
+        offset = 2 if match.group(1) else 0 if match.group(2) else 1
+        found.append((match.span(), today + dt.timedelta(days=offset)))
+    for match in _WEEKDAY.finditer(lowered):
+        ahead = (_WEEKDAYS.index(match.group(2)) - today.weekday()) % 7
+        if match.group(1) == "next" and ahead == 0:
+            ahead = 7
+        found.append((match.span(), today + dt.timedelta(days=ahead)))
+    if len(found) != 1 or not found[0][1]:
+        return None, text
+    (start, end), day = found[0]
+    return day, " ".join((text[:start] + " " + text[end:]).split())
+
+
+# ============================================================
+#  WINDOWS
+# ============================================================
+
+def default_window(today: dt.date = None) -> tuple:
+    """(start, end) datetimes of the slice of calendar sent with every prompt."""
+    today = today or dt.date.today()
+    start = dt.datetime.combine(today - dt.timedelta(days=WINDOW_PAST_DAYS), dt.time.min)
+    end = dt.datetime.combine(today + dt.timedelta(days=WINDOW_FUTURE_DAYS + 1), dt.time.min)
+    return start, end
+
+
+def day_window(first_day: dt.date, last_day: dt.date) -> tuple:
+    """(start, end) datetimes covering whole days `first_day`..`last_day`."""
+    start = dt.datetime.combine(first_day, dt.time.min)
+    end = dt.datetime.combine(last_day + dt.timedelta(days=1), dt.time.min)
+    return start, end
+
+
+def widen(window: tuple, first_day: dt.date, last_day: dt.date) -> tuple:
+    """Smallest window covering both `window` and the given days."""
+    start, end = day_window(first_day, last_day)
+    return min(window[0], start), max(window[1], end)
+
+
+def window_for_prompt(user_prompt: str, today: dt.date = None) -> tuple:
+    """Default window, widened to include any date the prompt mentions."""
+    window = default_window(today)
+    for first_day, last_day in mentioned_ranges(user_prompt, today):
+        window = widen(window, first_day, last_day)
+    return window
+
+
+def range_args(args: dict) -> tuple:
+    """Parse `get_events_in_range` arguments into (first_day, last_day)."""
+    first = dt.date.fromisoformat(str(args["start_date"])[:10])
+    last = dt.date.fromisoformat(str(args["end_date"])[:10])
+    return min(first, last), max(first, last)
+
+
+def requested_ranges(calls: list, decode) -> list:
+    """
+    range_args() of every `get_events_in_range` call among `calls`. A call
+    whose dates cannot be read is skipped: it loads nothing, the others
+    still do.
+    """
+    ranges = []
+    for call in calls:
+        if call.name != "get_events_in_range":
+            continue
+        try:
+            ranges.append(range_args(decode(call.name, call.args)))
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"⚠️ Ignoring get_events_in_range with unreadable dates: {e}")
+    return ranges
+
+
+def tool_time(value) -> dt.datetime:
+    """
+    The start_time / end_time of a tool call as an aware datetime. This is
+    the rule every backend follows: a time with Z or an offset is that
+    moment, a naive one is the user's local time (as the gateway's
+    `new Date(...)` reads it). Window bounds are not tool times: they are
+    naive UTC.
+    """
+    return dt.datetime.fromisoformat(str(value).strip().replace("Z", "+00:00")).astimezone()
+
+
+def window_params(window: tuple) -> dict:
+    """Query parameters for the gateway's `GET /events?start=&end=`."""
+    start, end = window
+    return {"start": start.isoformat() + "Z", "end": end.isoformat() + "Z"}
+
+
+def event_list(payload) -> list:
+    """The gateway answers `{"events": [...]}`; accept either that or a bare list."""
+    if isinstance(payload, dict):
+        return payload.get("events") or []
+    return payload or []
+
+
+def merge_events(events: list, extra: list) -> list:
+    """Add `extra` events not already present (by UID) to `events`."""
+    seen = {e.get("uid") for e in events}
+    return events + [e for e in extra if e.get("uid") not in seen]
+
+
+def describe(window: tuple) -> str:
+    start, end = window
+    return f"{start.date().isoformat()} to {(end - dt.timedelta(days=1)).date().isoformat()}"
+
+
+# ============================================================
+#  ETAGS
+# ============================================================
+
+# (username, uid) -> ETag the gateway last reported for that event, so an
+# update can be sent as one conditional PUT without looking the event up again.
+_etags = {}
+
+
+def remember_etags(username: str, events: list):
+    """Cache the ETags of listed (or just written) events."""
+    for event in events:
+        if isinstance(event, dict) and event.get("uid") and event.get("etag"):
+            _etags[(username, event["uid"])] = event["etag"]
+
+
+def cached_etag(username: str, uid: str):
+    return _etags.get((username, uid))
+
+
+def forget_etag(username: str, uid: str):
+    _etags.pop((username, uid), None)
+
+
+def if_match_header(username: str, uid: str) -> dict:
+    """`If-Match` header for a conditional update, or {} when the ETag is unknown."""
+    etag = cached_etag(username, uid)
+    return {"If-Match": etag} if etag else {}
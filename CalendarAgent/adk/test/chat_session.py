@@ -0,0 +1,170 @@
+"""
+Multi-turn chat sessions: the calendar goes to the model once, later turns
+only say what changed.
+
+A ChatSession wraps `model.start_chat()` for one user of one agent. Its
+first message is the agent's usual prompt (the snapshot); each later one
+carries the rows of events added or changed since the model last saw them,
+the ids of those deleted, and the user's text. Sessions are kept under
+http_client.credential_key(), so another password for the same username
+never resumes the user's chat. UID aliases live as long as
+the session, so e7 means the same event in every message. The results of
+the tools the model called go back as function responses at the head of
+the next message. A new day, or a history past SESSION_TOKEN_BUDGET, starts
+the session over from a fresh snapshot.
+"""
+import datetime as dt
+import json
+import os
+
+try:
+    from . import metrics, prompt_encoding
+except ImportError:
+    import metrics
+    import prompt_encoding
+
+# ============================================================
+#  CONFIGURATION
+# ============================================================
+
+ENABLED = os.environ.get("PROSWEET_CHAT_SESSIONS", "0") == "1"
+# Estimated (or billed) tokens of history after which the next turn starts a new chat.
+SESSION_TOKEN_BUDGET = int(os.environ.get("PROSWEET_SESSION_TOKEN_BUDGET", "32000"))
+
+
+def _start(event: dict) -> str:
+    return prompt_encoding.compact_time(event.get("start") or event.get("start_time"))
+
+
+# ============================================================
+#  SESSION
+# ============================================================
+
+class ChatSession:
+    def __init__(self, model, agent: str):
+        self.model = model
+        self.agent = agent
+        self.chat = None
+        self._clear()
+
+    def _clear(self):
+        self.aliases = prompt_encoding.UidAliases()
+        self.tokens = 0   # size of the history, as last billed or estimated
+        self._day = None
+        self._seen = {}   # uid -> (start, row key) as the model last saw the event
+        self._asked = []  # names of the function calls in the model's last answer
+        self._answers = []
+
+    def start(self) -> bool:
+        """
+        Begin a turn. True when the session (re)started, so the turn must
+        send the whole snapshot (its prompt built with `self.aliases`) and
+        report it with saw().
+        """
+        if self.chat is not None and self._day == dt.date.today() and self.tokens <= SESSION_TOKEN_BUDGET:
+            return False
+        reason = "new" if self.chat is None else "day" if self._day != dt.date.today() else "compacted"
+        metrics.inc("chat_sessions_total", agent=self.agent, reason=reason)
+        self._clear()
+        self.chat = self.model.start_chat()
+        self._day = dt.date.today()
+        return True
+
+    def saw(self, events: list, text: str):
+        """Record the `events` whose rows made it into `text` as known to the model."""
+        for event in events:
+            uid = event.get("uid")
+            if uid in self.aliases and f"\n{self.aliases.alias(uid)}|" in text:
+                self._seen[uid] = (_start(event), prompt_encoding.row_key(event))
+
+    def changes(self, events: list, window: tuple, shown: list = None, budget: int = None) -> str:
+        """
+        What the model does not know yet about a listing of `window`: rows
+        of the events of `shown` (default: all of `events`) it has not seen,
+        of the events it saw that changed since, and the ids of the ones it
+        saw starting in the window but no longer listed. "" when nothing
+        changed.
+        """
+        shown = events if shown is None else shown
+        changed = [e for e in events if e.get("uid") in self._seen
+                   and self._seen[e["uid"]][1] != prompt_encoding.row_key(e)]
+        changed += [e for e in shown if e.get("uid") and e["uid"] not in self._seen]
+        listed = {e.get("uid") for e in events}
+        first, last = (w.strftime("%Y-%m-%dT%H:%M") for w in window)
+        removed = [uid for uid, (start, _) in self._seen.items() if uid not in listed and first <= start < last]
+
+        lines = []
+        if changed:
+            table = prompt_encoding.encode_events(changed, self.aliases, budget)
+            lines.append(f"Events added or changed since the last message:\n{table}")
+            self.saw(changed, "\n" + table)
+        if removed:
+            lines.append("Events deleted since the last message: "
+                         + ", ".join(self.aliases.alias(uid) for uid in removed))
+            for uid in removed:
+                del self._seen[uid]
+        return "\n".join(lines)
+
+    def answer(self, name: str, response: dict):
+        """Queue the function response to a call of the model's last answer."""
+        self._answers.append((name, response))
+
+    def answer_results(self, results: list):
+        """Queue the outcome of dispatch.run_calls() results."""
+        for name, _, result in results:
+            self.answer(name, {"result": "done" if result else "failed"})
+
+    def _replies(self) -> list:
+        # Every call of the last answer gets a response, in order; unanswered ones were not run.
+        answers, parts = list(self._answers), []
+        for name in self._asked:
+            i = next((i for i, (n, _) in enumerate(answers) if n == name), None)
+            response = answers.pop(i)[1] if i is not None else {"result": "not run"}
+            parts.append({"function_response": {"name": name, "response": response}})
+        self._asked, self._answers = [], []
+        return parts
+
+    async def send(self, text: str = None, stream: bool = False):
+        """
+        Send the owed function responses and `text`; returns the model's
+        answer. A streamed answer must be read to the end and passed to
+        received().
+        """
+        parts = self._replies() + ([text] if text else [])
+        message_tokens = prompt_encoding.estimate_tokens(json.dumps(parts, default=str))
+        metrics.observe("chat_message_tokens", message_tokens, buckets=metrics.TOKEN_BUCKETS, agent=self.agent)
+        self.tokens += message_tokens
+        response = await self.chat.send_message_async(parts, stream=stream)
+        if not stream:
+            self.received(response)
+        return response
+
+    def received(self, response):
+        """Take note of the calls in the model's answer and of the history's size."""
+        self._asked = [part.function_call.name for part in response.candidates[0].content.parts
+                       if getattr(part, "function_call", None)]
+        usage = getattr(response, "usage_metadata", None)
+        billed = getattr(usage, "prompt_token_count", 0) or 0
+        if billed:
+            self.tokens = billed + (getattr(usage, "candidates_token_count", 0) or 0)
+            return
+        for part in response.candidates[0].content.parts:
+            call = getattr(part, "function_call", None)
+            self.tokens += prompt_encoding.estimate_tokens(
+                (getattr(part, "text", "") or "") + (f"{call.name}{dict(call.args)}" if call else ""))
+
+
+# (agent, credential_key) -> ChatSession
+_sessions = {}
+
+
+def session_for(agent: str, user: str, model) -> ChatSession:
+    """The user's session with `model`; a different model (e.g. a rebuilt one) starts a new session."""
+    session = _sessions.get((agent, user))
+    if session is None or session.model is not model:
+        session = _sessions[(agent, user)] = ChatSession(model, agent)
+    return session
+
+
+def end(agent: str, user: str):
+    _sessions.pop((agent, user), None)
@@ -0,0 +1,77 @@
+"""
+`prosweet` command line.
+
+    prosweet events  [--user U] [--password P] [--backend B]   chat with the event agent
+    prosweet alarms  [--user U] [--password P] [--backend B]   chat with the alarm agent
+    prosweet radicale [--user U] [--password P]                chat with agent_test (Radicale, asks for the calendar)
+    prosweet serve   ...                                       agent_service (HTTP, many users)
+    prosweet bulk    import|export FILE ...                    bulk .ics transfer (bulk_ics)
+    prosweet journal ...                                       write-behind journal (write_behind)
+
+Only the module a command needs is imported, once the command is known, so
+`prosweet --help` and every command's own --help start without loading
+Gemini or the HTTP stack. Credentials default to PROSWEET_USER and
+PROSWEET_PASSWORD and are asked for when unset; the Gemini key comes from
+GOOGLE_API_KEY. --backend gateway|caldav overrides PROSWEET_BACKEND (caldav
+talks to Radicale at PROSWEET_CALDAV_URL without going through the gateway).
+"""
+import argparse
+import getpass
+import importlib
+import os
+import sys
+
+# Commands whose module parses its own arguments: name -> (module, help).
+PASSTHROUGH = {
+    "serve": ("agent_service", "serve agent turns over HTTP for many users"),
+    "bulk": ("bulk_ics", "bulk .ics import and export against Radicale"),
+    "journal": ("write_behind", "inspect or retry the write-behind journal"),
+}
+
+# Interactive agents: name -> (module, help).
+AGENTS = {
+    "events": ("event_agent", "chat with the event agent"),
+    "alarms": ("alarm_agent", "chat with the alarm agent"),
+    "radicale": ("agent_test", "chat with the Radicale agent (agent_test)"),
+}
+
+
+def _module(name: str):
+    return importlib.import_module(f".{name}", __package__)
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="prosweet", description="ProSweet calendar agents.")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+    for name, (_, text) in AGENTS.items():
+        command = commands.add_parser(name, help=text)
+        command.add_argument("--user", default=os.environ.get("PROSWEET_USER"))
+        command.add_argument("--password", default=os.environ.get("PROSWEET_PASSWORD"))
+        command.add_argument("--backend", choices=("gateway", "caldav"))
+    for name, (_, text) in PASSTHROUGH.items():
+        commands.add_parser(name, help=text, add_help=False)
+    return parser
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in PASSTHROUGH:
+        module, _ = PASSTHROUGH[argv[0]]
+        return _module(module).main(argv[1:]) or 0
+
+    args = _parser().parse_args(argv)
+    username = args.user or input("Username: ")
+    password = args.password or getpass.getpass("Password: ")
+    if args.backend:
+        os.environ["PROSWEET_BACKEND"] = args.backend  # read when the agent is imported below
+    agent = _module(AGENTS[args.command][0])
+    agent.gemini_models.configure()
+    try:
+        agent.main(username, password)
+    except (KeyboardInterrupt, EOFError):
+        print("\n👋 Exiting.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import asyncio
+import contextlib
+import json
+import os
+
+try:
+    from . import metrics
+except ImportError:
+    import metrics
+
+# How many tool calls from one model response may hit the server at once.
+MAX_CONCURRENT_CALLS = int(os.environ.get("PROSWEET_MAX_CONCURRENT_CALLS", "4"))
+
+
+# ============================================================
+#  RESPONSE PARTS
+# ============================================================
+
+def function_calls(response) -> list:
+    """Every function call in the first candidate, in the order the model issued them."""
+    parts = response.candidates[0].content.parts
+    return [part.function_call for part in parts
+            if hasattr(part, "function_call") and part.function_call]
+
+
+def response_text(response) -> str:
+    """The text parts of the first candidate, joined."""
+    parts = response.candidates[0].content.parts
+    return "".join(getattr(part, "text", "") or "" for part in parts)
+
+
+# ============================================================
+#  DISPATCH
+# ============================================================
+
+class CallRunner:
+    """
+    Runs tool calls as they are handed over, under run_calls()' rules. A
+    call that repeats one of an earlier drain() (the model writing again
+    after a get_events_in_range round) is not run again: the same function
+    on the same `event_uid`, whatever its other arguments, or for a create
+    the same arguments.
+    """
+
+    def __init__(self, handlers: dict, decode=None, limit: int = None):
+        self.handlers = handlers
+        self.decode = decode
+        self._semaphore = asyncio.Semaphore(limit or MAX_CONCURRENT_CALLS)
+        self._uid_locks = {}
+        self._started = []  # calls handed over, by identity
+        self._tasks = []    # (key, task) since the last drain()
+        self._done = set()  # keys of drained calls
+
+    @staticmethod
+    def _key(name: str, args) -> tuple:
+        uid = args.get("event_uid") if hasattr(args, "get") else None
+        if uid:
+            return name, uid
+        try:
+            return name, json.dumps(dict(args), sort_keys=True, default=str)
+        except (TypeError, ValueError):
+            return name, repr(args)
+
+    def start(self, call):
+        """Start `call` unless it was already handed over; it runs in the background."""
+        if any(started is call for started in self._started):
+            return
+        self._started.append(call)
+        try:
+            args = self.decode(call.name, call.args) if self.decode else call.args
+        except Exception as e:
+            # Fails on its own, like a call whose handler raises: the others still run.
+            self._tasks.append(((call.name, id(call)), asyncio.ensure_future(self._unreadable(call.name, e))))
+            return
+        key = self._key(call.name, args)
+        if key in self._done:
+            return
+        self._tasks.append((key, asyncio.ensure_future(self._run(call.name, args))))
+
+    @staticmethod
+    async def _unreadable(name: str, error: Exception):
+        print(f"❌ `{name}` failed: unreadable arguments ({error})")
+        metrics.inc("tool_calls_total", function=name, outcome="failed")
+        return name, {}, None
+
+    async def _run(self, name: str, args):
+        handler = self.handlers.get(name)
+        if handler is None:
+            print(f"⚠️ Unknown function call: {name}")
+            metrics.inc("tool_calls_total", function=name, outcome="unknown")
+            return name, args, None
+        uid = args.get("event_uid") if hasattr(args, "get") else None
+        lock = self._uid_locks.setdefault(uid, asyncio.Lock()) if uid else None
+        try:
+            async with contextlib.AsyncExitStack() as stack:
+                if lock is not None:
+                    await stack.enter_async_context(lock)
+                await stack.enter_async_context(self._semaphore)
+                with metrics.span("tool_call", function=name):
+                    result = await handler(**args)
+        except Exception as e:
+            print(f"❌ `{name}` failed: {e}")
+            result = None
+        metrics.inc("tool_calls_total", function=name, outcome="ok" if result else "failed")
+        return name, args, result
+
+    async def drain(self) -> list:
+        """Wait for the calls started since the last drain(); [(name, args, result)] in start order."""
+        tasks, self._tasks = self._tasks, []
+        results = list(await asyncio.gather(*(task for _, task in tasks)))
+        self._done.update(key for key, _ in tasks)
+        return results
+
+
+async def run_calls(calls: list, handlers: dict, decode=None, limit: int = None) -> list:
+    """
+    Run the tool calls of one model response and return
+    [(name, args, result)] in the order they were issued.
+
+    Calls run concurrently, at most `limit` (MAX_CONCURRENT_CALLS) at a time.
+    Calls on the same `event_uid` are dependent and run one after another in
+    their original order. An unknown function, a call whose arguments cannot
+    be decoded or a call that raises gives a None result without cancelling
+    the others. `decode(name, args)` turns
+    the raw protobuf args into the keyword arguments passed to the handler.
+    """
+    runner = CallRunner(handlers, decode, limit)
+    for call in calls:
+        runner.start(call)
+    return await runner.drain()
+
+
+# ============================================================
+#  STREAMING
+# ============================================================
+
+async def stream_response(response, runner: CallRunner = None, on_text=None, hold: tuple = ()) -> list:
+    """
+    Read a streamed response (`stream=True`) as it arrives: text parts go to
+    `on_text`, and each function call is handed to `runner` as soon as its
+    chunk is in, so it runs while the model is still writing the rest. From
+    the first call named in `hold` on, calls are only collected. Returns
+    every function call of the response, in order; `response` itself holds
+    the whole answer once this returns.
+    """
+    calls, holding = [], False
+    async for chunk in response:
+        if not chunk.candidates:
+            continue
+        for part in chunk.candidates[0].content.parts:
+            call = getattr(part, "function_call", None)
+            if call:
+                calls.append(call)
+                holding = holding or call.name in hold
+                if runner is not None and not holding:
+                    runner.start(call)
+            elif getattr(part, "text", "") and on_text is not None:
+                on_text(part.text)
+    return calls
+
+
+class TextEcho:
+    """`on_text` for stream_response(): prints the reply as it arrives, `header` first."""
+
+    def __init__(self, header: str = None):
+        self.header = header
+        self.text = ""
+
+    def __call__(self, chunk: str):
+        if not self.text and self.header:
+            print(self.header)
+        self.text += chunk
+        print(chunk, end="", flush=True)
+
+    def close(self):
+        if self.text:
+            print()
@@ -0,0 +1,275 @@
+"""
+Lexical retrieval over a user's events, so a prompt such as "move my
+Differential Equations exam" carries the few events it can be about instead
+of the whole window.
+
+EventIndex scores event summaries and descriptions against the user's text
+with BM25; query words that are not in the vocabulary (typos, "diff" for
+"differential", plurals) are matched to the words sharing most of their
+trigrams. Like alarm_engine's index it is fed by every listing the agents
+make and by their own writes, one event at a time.
+"""
+import datetime as dt
+import heapq
+import math
+import os
+import re
+
+try:
+    from . import calendar_window, prompt_encoding
+except ImportError:
+    import calendar_window
+    import prompt_encoding
+
+# ============================================================
+#  CONFIGURATION
+# ============================================================
+
+ENABLED = os.environ.get("PROSWEET_RETRIEVAL", "1") != "0"
+# Windows with at most this many events go to the model whole.
+MIN_EVENTS = int(os.environ.get("PROSWEET_RETRIEVAL_MIN_EVENTS", "30"))
+# Best matches shown, and the events nearest to now shown alongside them.
+TOP_K = int(os.environ.get("PROSWEET_RETRIEVAL_TOP_K", "8"))
+RECENT_EVENTS = int(os.environ.get("PROSWEET_RETRIEVAL_RECENT", "6"))
+# Estimated tokens the selected event table may take.
+TOKEN_BUDGET = int(os.environ.get("PROSWEET_RETRIEVAL_TOKEN_BUDGET", "1200"))
+
+# Matches scoring below this share of the best one are noise ("my", a date word).
+MIN_RELATIVE_SCORE = 0.3
+# A vocabulary word stands in for a query word when it has this share of its trigrams.
+MIN_TRIGRAM_OVERLAP = 0.7
+MAX_EXPANSIONS = 16
+
+K1, B = 1.2, 0.75
+SUMMARY_BOOST = 2  # summary words count this many times over description words
+
+_WORD = re.compile(r"\w+")
+# Words that say what to do rather than which event: never worth matching on.
+_STOPWORDS = {
+    "a", "an", "the", "my", "our", "your", "me", "i", "to", "for", "from", "on", "at", "in", "of", "by",
+    "with", "and", "or", "is", "it", "this", "that", "please", "can", "you", "next", "new",
+    "move", "moved", "reschedule", "push", "shift", "change", "update", "rename", "delete", "remove",
+    "cancel", "add", "create", "schedule", "book", "set", "put", "make", "event", "events",
+    "reminder", "reminders", "alarm", "alarms", "today", "tomorrow", "am", "pm",
+}
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word[-1] == "s" and word[-2] != "s" else word
+
+
+def words(text: str) -> list:
+    """Lowercased, lightly stemmed words of `text`."""
+    return [_stem(w) for w in _WORD.findall(str(text or "").lower())]
+
+
+def trigrams(word: str) -> set:
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+# ============================================================
+#  INDEX
+# ============================================================
+
+class EventIndex:
+    """
+    BM25 over (summary, description) of a user's events, keyed by UID.
+
+    Postings are kept per word with each event's term frequency, so
+    updating one event only touches its own words; `_grams` maps each
+    trigram to the vocabulary words containing it for fuzzy query words.
+    """
+
+    def __init__(self):
+        self._events = {}    # uid -> event
+        self._docs = {}      # uid -> ({word: tf}, length)
+        self._postings = {}  # word -> {uid: tf}
+        self._grams = {}     # trigram -> {word}
+        self._total = 0      # sum of document lengths
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, uid):
+        return uid in self._docs
+
+    def _remove(self, uid: str):
+        terms, length = self._docs.pop(uid)
+        self._events.pop(uid, None)
+        self._total -= length
+        for word in terms:
+            postings = self._postings[word]
+            del postings[uid]
+            if not postings:
+                del self._postings[word]
+                for gram in trigrams(word):
+                    self._grams[gram].discard(word)
+
+    def _add(self, event: dict):
+        uid = event["uid"]
+        terms = {}
+        for word in words(event.get("summary")):
+            terms[word] = terms.get(word, 0) + SUMMARY_BOOST
+        for word in words(event.get("description")):
+            terms[word] = terms.get(word, 0) + 1
+        for word, tf in terms.items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+                for gram in trigrams(word):
+                    self._grams.setdefault(gram, set()).add(word)
+            postings[uid] = tf
+        length = sum(terms.values())
+        self._docs[uid] = (terms, length)
+        self._events[uid] = event
+        self._total += length
+
+    def update(self, events: list, window: tuple = None):
+        """
+        Take the events of a listing (or ones just written). With the
+        listing's `window` (naive UTC datetimes), events that started in it
+        but were not returned have been deleted and are dropped too.
+        """
+        events = [e for e in events if isinstance(e, dict) and e.get("uid")]
+        if window is not None:
+            listed = {e["uid"] for e in events}
+            first, last = (w.strftime("%Y-%m-%dT%H:%M") for w in window)
+            for uid in [uid for uid, e in self._events.items() if uid not in listed
+                        and first <= prompt_encoding.compact_time(e.get("start") or e.get("start_time")) < last]:
+                self._remove(uid)
+        for event in events:
+            if event["uid"] in self._docs:
+                self._remove(event["uid"])
+            self._add(event)
+
+    def forget(self, uid: str):
+        if uid in self._docs:
+            self._remove(uid)
+
+    def event(self, uid: str) -> dict:
+        return self._events.get(uid)
+
+    def _expand(self, word: str) -> list:
+        """(vocabulary word, weight) pairs standing in for a query word."""
+        if word in self._postings:
+            return [(word, 1.0)]
+        grams = trigrams(word)
+        if not grams:
+            return []
+        shared = {}
+        for gram in grams:
+            for candidate in self._grams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        close = [(count / len(grams), candidate) for candidate, count in shared.items()
+                 if count / len(grams) >= MIN_TRIGRAM_OVERLAP]
+        return [(candidate, overlap) for overlap, candidate in heapq.nlargest(MAX_EXPANSIONS, close)]
+
+    def search(self, text: str, k: int = TOP_K) -> list:
+        """The `k` best (score, uid) matches for `text`, best first; only events scoring > 0."""
+        if not self._docs:
+            return []
+        count, average = len(self._docs), self._total / len(self._docs)
+        scores = {}
+        for word in dict.fromkeys(w for w in words(text) if w not in _STOPWORDS):
+            best = {}  # uid -> best contribution of this query word
+            for term, weight in self._expand(word):
+                postings = self._postings[term]
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for uid, tf in postings.items():
+                    length = self._docs[uid][1]
+                    score = weight * idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average))
+                    if score > best.get(uid, 0.0):
+                        best[uid] = score
+            for uid, score in best.items():
+                scores[uid] = scores.get(uid, 0.0) + score
+        return heapq.nlargest(k, ((score, uid) for uid, score in scores.items()))
+
+
+# http_client.credential_key(username, password) -> EventIndex, fed by every
+# listing the agents make: a wrong password never searches the user's index.
+_indexes = {}
+
+
+def index_for(user: str) -> EventIndex:
+    if user not in _indexes:
+        _indexes[user] = EventIndex()
+    return _indexes[user]
+
+
+def remember(user: str, events: list, window: tuple = None):
+    """Feed a listing (or just-written events) into the user's index."""
+    index_for(user).update(events, window)
+
+
+def forget(user: str, uid: str):
+    if user in _indexes:
+        _indexes[user].forget(uid)
+
+
+def drop(user: str):
+    """Throw the index away, e.g. when the server refused these credentials."""
+    _indexes.pop(user, None)
+
+
+# ============================================================
+#  SELECTION
+# ============================================================
+
+def _start(event: dict) -> str:
+    return prompt_encoding.compact_time(event.get("start") or event.get("start_time"))
+
+
+def select(user: str, events: list, user_prompt: str, k: int = None, recent: int = None,
+           budget: int = None) -> list:
+    """
+    The events to show the model for `user_prompt`, in order of start: its
+    `k` best matches (from anything the index has seen, not only `events`),
+    the events on any day the prompt names, and the `recent` events of
+    `events` nearest to now, taken in that order while they fit `budget`
+    estimated tokens. None when retrieval does not apply (disabled, a
+    window small enough to send whole, or no match), so the caller sends
+    `events` as before.
+    """
+    k = TOP_K if k is None else k
+    recent = RECENT_EVENTS if recent is None else recent
+    budget = TOKEN_BUDGET if budget is None else budget
+    if not ENABLED or len(events) <= MIN_EVENTS:
+        return None
+    index = index_for(user)
+    days = [(first.isoformat(), (last + dt.timedelta(days=1)).isoformat())
+            for first, last in calendar_window.mentioned_ranges(user_prompt)]
+    # A named day settles ties between events of the same title, so rank every match then.
+    hits = index.search(user_prompt, len(index) if days else k)
+    if not hits:
+        return None
+
+    def on_named_day(event: dict) -> bool:
+        return any(first <= _start(event) < last for first, last in days)
+
+    floor = hits[0][0] * MIN_RELATIVE_SCORE
+    matched = [index.event(uid) for score, uid in hits if score >= floor]
+    matched = ([e for e in matched if on_named_day(e)] + [e for e in matched if not on_named_day(e)])[:k]
+    named = [e for e in events if on_named_day(e)]
+    now = dt.datetime.now().strftime("%Y-%m-%dT%H:%M")
+    upcoming = sorted((e for e in events if _start(e) >= now), key=_start)[:recent]
+
+    with_alarms = any(e.get("alarms") for e in events)
+    chosen, seen = [], set()
+    for event in matched + named + upcoming:
+        uid = event.get("uid")
+        if uid in seen:
+            continue
+        cost = prompt_encoding.event_tokens(event, with_alarms)
+        if cost > budget:
+            break
+        budget -= cost
+        seen.add(uid)
+        chosen.append(event)
+    return sorted(chosen, key=_start)
+
+
+def heading(window: tuple, shown: int, total: int = None) -> str:
+    """Title of the prompt's event table: the window, or that it holds select()'s pick of `total`."""
+    if total is None:
+        return f"Events from {calendar_window.describe(window)}"
+    return f"The {shown} events most relevant to the request (of {total} from {calendar_window.describe(window)})"
@@ -0,0 +1,201 @@
+"""
+On-disk copy of a CalDAV calendar collection, one SQLite file per user and
+calendar, so a new agent process starts from the last sync instead of an
+empty view.
+
+caldav_sync.CalendarReplica writes every synced resource here (with its
+ETag and the sync-token / CTag it was synced at) and reads events back by
+time range, UID or href through the indexes below; the next sync-collection
+REPORT then only brings what changed since.
+"""
+import calendar
+import hashlib
+import os
+import sqlite3
+import threading
+
+# ============================================================
+#  CONFIGURATION
+# ============================================================
+
+ENABLED = os.environ.get("PROSWEET_EVENT_STORE", "1") == "1"
+STORE_DIR = os.environ.get("PROSWEET_EVENT_STORE_DIR",
+                           os.path.join(os.path.expanduser("~"), ".prosweet", "events"))
+
+# Event fields kept per row, as produced by ical_stream.VEventParser.
+FIELDS = ("uid", "summary", "description", "start_time", "end_time", "rrule")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    href TEXT PRIMARY KEY,
+    etag TEXT
+);
+CREATE INDEX IF NOT EXISTS resources_etag ON resources (etag);
+CREATE TABLE IF NOT EXISTS events (
+    href TEXT NOT NULL,        -- resource the event belongs to (overrides share one)
+    uid TEXT,
+    summary TEXT,
+    description TEXT,
+    start_time TEXT,           -- compact iCalendar form, as parsed
+    end_time TEXT,
+    rrule TEXT,
+    start_at REAL,             -- the same as seconds since the epoch (floating times as UTC)
+    end_at REAL                -- start_at when the event has no end
+);
+CREATE INDEX IF NOT EXISTS events_href ON events (href);
+CREATE INDEX IF NOT EXISTS events_uid ON events (uid);
+CREATE INDEX IF NOT EXISTS events_start ON events (start_at);
+CREATE INDEX IF NOT EXISTS events_end ON events (end_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,      -- sync_token | ctag | longest
+    value TEXT
+);
+"""
+
+
+def epoch(value) -> float:
+    """Seconds since the epoch of a compact YYYYMMDD[THHMMSS[Z]] time; None if unreadable."""
+    try:
+        if len(value) == 8:
+            return calendar.timegm((int(value[:4]), int(value[4:6]), int(value[6:8]), 0, 0, 0))
+        return calendar.timegm((int(value[:4]), int(value[4:6]), int(value[6:8]),
+                                int(value[9:11]), int(value[11:13]), int(value[13:15])))
+    except (TypeError, ValueError):
+        return None
+
+
+# ============================================================
+#  STORE
+# ============================================================
+
+class EventStore:
+    """
+    Resources (href -> ETag) and their events for one collection.
+
+    Range reads bisect the start index between the window start minus the
+    longest event ever stored and the window end, so they cost the same
+    however many events lie outside the window. WAL mode, so readers never
+    wait for a sync that is writing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        if "rrule" not in {row[1] for row in self._db.execute("PRAGMA table_info(events)")}:
+            # Stored before RRULE was kept: add the column and drop the sync state so the
+            # next sync fetches every event again.
+            self._db.execute("ALTER TABLE events ADD COLUMN rrule TEXT")
+            self.clear()
+        self._longest = float(self.get_meta("longest") or 0)
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _event(row) -> dict:
+        return dict(zip(FIELDS, row))
+
+    # ---------------- sync state ----------------
+
+    def get_meta(self, key: str):
+        rows = self._execute("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def set_meta(self, **values):
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", values.items())
+
+    # ---------------- resources ----------------
+
+    def etag(self, href: str):
+        rows = self._execute("SELECT etag FROM resources WHERE href = ?", (href,))
+        return rows[0][0] if rows else None
+
+    def etags(self) -> dict:
+        """href -> ETag of every resource (for a full listing comparison)."""
+        return dict(self._execute("SELECT href, etag FROM resources"))
+
+    def put_many(self, items: list):
+        """Store (href, etag, events) resources in one transaction, replacing what they held."""
+        longest = self._longest
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for href, etag, events in items:
+                    rows = []
+                    for e in events:
+                        start_at = epoch(e.get("start_time"))
+                        end_at = epoch(e.get("end_time")) or start_at
+                        if start_at is not None and end_at > start_at:
+                            longest = max(longest, end_at - start_at)
+                        rows.append((href, e.get("uid"), e.get("summary"), e.get("description"),
+                                     e.get("start_time"), e.get("end_time"), e.get("rrule"), start_at, end_at))
+                    self._db.execute("DELETE FROM events WHERE href = ?", (href,))
+                    self._db.execute("INSERT OR REPLACE INTO resources (href, etag) VALUES (?, ?)", (href, etag))
+                    self._db.executemany(
+                        "INSERT INTO events (href, uid, summary, description, start_time, end_time, rrule, "
+                        "start_at, end_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                if longest > self._longest:
+                    self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('longest', ?)", (str(longest),))
+                self._db.execute("COMMIT")
+                self._longest = longest
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def delete_many(self, hrefs):
+        hrefs = [(href,) for href in hrefs]
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany("DELETE FROM events WHERE href = ?", hrefs)
+            self._db.executemany("DELETE FROM resources WHERE href = ?", hrefs)
+            self._db.execute("COMMIT")
+
+    def clear(self):
+        with self._lock:
+            self._db.executescript("DELETE FROM events; DELETE FROM resources; DELETE FROM meta;")
+            self._longest = 0.0
+
+    # ---------------- events ----------------
+
+    def events(self) -> list:
+        return [self._event(r) for r in self._execute(f"SELECT {', '.join(FIELDS)} FROM events ORDER BY start_at")]
+
+    def between(self, start: str, end: str) -> list:
+        """Events overlapping [start, end) (compact times), by start; instantaneous ones at `start` included."""
+        first, last = epoch(start), epoch(end)
+        rows = self._execute(
+            f"SELECT {', '.join(FIELDS)} FROM events WHERE start_at >= ? AND start_at < ? "
+            "AND (end_at > ? OR (end_at = start_at AND start_at >= ?)) ORDER BY start_at",
+            (first - self._longest, last, first, first))
+        return [self._event(r) for r in rows]
+
+    def by_uid(self, uid: str) -> list:
+        return [self._event(r) for r in self._execute(f"SELECT {', '.join(FIELDS)} FROM events WHERE uid = ?", (uid,))]
+
+    def __len__(self):
+        return self._execute("SELECT COUNT(*) FROM resources")[0][0]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def path_for(collection_url: str) -> str:
+    return os.path.join(STORE_DIR, hashlib.sha1(collection_url.encode()).hexdigest()[:16] + ".sqlite3")
+
+
+def store_for(collection_url: str) -> EventStore:
+    """The shared store of one collection, opened on first use."""
+    with _stores_lock:
+        store = _stores.get(collection_url)
+        if store is None:
+            store = _stores[collection_url] = EventStore(path_for(collection_url))
+        return store
@@ -0,0 +1,158 @@
+import bisect
+import datetime as dt
+import itertools
+import os
+
+try:
+    from . import alarm_engine
+except ImportError:
+    import alarm_engine
+
+# ============================================================
+#  CONFIGURATION
+# ============================================================
+
+# Free slots are only offered inside these local hours ("HH:MM-HH:MM").
+WORKING_HOURS = os.environ.get("PROSWEET_WORKING_HOURS", "08:00-20:00")
+
+# Slots offered per question unless the caller asks for another number.
+DEFAULT_SLOTS = 5
+
+
+def _hours(text: str) -> tuple:
+    first, _, last = text.partition("-")
+    return dt.time.fromisoformat(first.strip()), dt.time.fromisoformat(last.strip())
+
+
+# ============================================================
+#  INTERVAL INDEX
+# ============================================================
+
+def _all_day(event: dict) -> bool:
+    start = str(event.get("start") or event.get("start_time") or "")
+    return bool(event.get("allDay") or event.get("wholeDay")) or len(start) in (8, 10)
+
+
+class BusyIndex:
+    """
+    Busy time of a set of events, for overlap checks and free-slot search.
+
+    Keeps two sorted views, built once in O(n log n):
+      - every event occurrence by start, with the running maximum of the
+        ends, so `conflicts()` bisects to the last candidate and walks back
+        only over events that can still overlap;
+      - the merged busy intervals (disjoint, so starts and ends are both
+        sorted), which `is_free()` and `free_slots()` bisect into.
+
+    Times are seconds since the epoch. Recurring events are expanded with
+    alarm_engine.occurrences() over `span`; all-day events do not block time.
+    """
+
+    def __init__(self, events: list, span: tuple = None):
+        span = span or (float("-inf"), float("inf"))
+        items = []
+        for event in events:
+            if not isinstance(event, dict) or _all_day(event):
+                continue
+            start = alarm_engine.epoch(event.get("start") or event.get("start_time"))
+            end = alarm_engine.epoch(event.get("end") or event.get("end_time"))
+            if start is None:
+                continue
+            length = max((end or start) - start, 0)
+            begins = alarm_engine.occurrences(event, span[0] - length, span[1]) if event.get("rrule") else [start]
+            items.extend((begin, begin + length, event) for begin in begins)
+        items.sort(key=lambda item: item[:2])
+
+        self._starts = [start for start, _, _ in items]
+        self._ends = [end for _, end, _ in items]
+        self._events = [event for _, _, event in items]
+        self._max_end = list(itertools.accumulate(self._ends, max))
+
+        merged = []
+        for start, end, _ in items:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self._busy_starts = [start for start, _ in merged]
+        self._busy_ends = [end for _, end in merged]
+
+    def __len__(self):
+        return len(self._starts)
+
+    def conflicts(self, start: float, end: float) -> list:
+        """Events overlapping [start, end), earliest first."""
+        found = []
+        i = bisect.bisect_left(self._starts, end) - 1
+        while i >= 0 and self._max_end[i] > start:
+            if self._ends[i] > start:
+                found.append(self._events[i])
+            i -= 1
+        found.reverse()
+        return found
+
+    def is_free(self, start: float, end: float) -> bool:
+        """True if nothing overlaps [start, end)."""
+        i = bisect.bisect_right(self._busy_ends, start)
+        return i == len(self._busy_starts) or self._busy_starts[i] >= end
+
+    def gaps(self, start: float, end: float):
+        """Free intervals inside [start, end), in order."""
+        i = bisect.bisect_right(self._busy_ends, start)
+        cursor = start
+        while cursor < end:
+            if i == len(self._busy_starts):
+                yield cursor, end
+                return
+            if self._busy_starts[i] > cursor:
+                yield cursor, min(self._busy_starts[i], end)
+            cursor = max(cursor, self._busy_ends[i])
+            i += 1
+
+    def free_slots(self, duration: dt.timedelta, first_day: dt.date, last_day: dt.date,
+                   count: int = DEFAULT_SLOTS, hours: tuple = None) -> list:
+        """
+        The first `count` free (start, end) local datetimes of `duration`
+        between `first_day` and `last_day` (inclusive), within working
+        `hours` (default WORKING_HOURS) and not in the past.
+        """
+        opens, closes = hours or _hours(WORKING_HOURS)
+        length = duration.total_seconds()
+        now = dt.datetime.now().timestamp()
+        slots = []
+        day = first_day
+        while day <= last_day and len(slots) < count:
+            day_start = max(dt.datetime.combine(day, opens).timestamp(), now)
+            day_end = dt.datetime.combine(day, closes).timestamp()
+            for gap_start, gap_end in self.gaps(day_start, day_end):
+                begin = _round_up(gap_start)
+                if gap_end - begin >= length:
+                    slots.append((_local(begin), _local(begin + length)))
+                    if len(slots) == count:
+                        break
+            day += dt.timedelta(days=1)
+        return slots
+
+
+def _round_up(seconds: float, step: int = 300) -> float:
+    """Start slots on the next 5 minutes, not at 10:07:13."""
+    return -(-seconds // step) * step
+
+
+def _local(seconds: float) -> dt.datetime:
+    return dt.datetime.fromtimestamp(seconds)
+
+
+def span_for(first_day: dt.date, last_day: dt.date) -> tuple:
+    """Epoch seconds covering whole local days `first_day`..`last_day`."""
+    start = dt.datetime.combine(first_day, dt.time.min).timestamp()
+    end = dt.datetime.combine(last_day + dt.timedelta(days=1), dt.time.min).timestamp()
+    return start, end
+
+
+def describe_slots(slots: list) -> str:
+    """One line per slot, in the naive local ISO form the event tools take."""
+    if not slots:
+        return "No free slot of that length in those days."
+    return "\n".join(f"{start.strftime('%Y-%m-%dT%H:%M:%S')} to {end.strftime('%Y-%m-%dT%H:%M:%S')} "
+                     f"({start.strftime('%a')})" for start, end in slots)
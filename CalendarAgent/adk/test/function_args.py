@@ -0,0 +1,165 @@
+import json
+
+try:
+    from google.protobuf.struct_pb2 import Value as _Value
+except ImportError:  # protobuf only comes with the Gemini SDK
+    _Value = None
+
+# ============================================================
+#  VALUE CONVERTERS
+# ============================================================
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def _from_value(value):
+    kind = value.WhichOneof("kind")
+    if kind == "string_value":
+        return value.string_value
+    if kind == "number_value":
+        return value.number_value
+    if kind == "bool_value":
+        return value.bool_value
+    if kind == "struct_value":
+        return value.struct_value.fields
+    if kind == "list_value":
+        return value.list_value.values
+    return None
+
+
+def _native(value):
+    """
+    Unwrap one level of protobuf: proto-plus MapComposite / RepeatedComposite
+    become the raw upb containers underneath (much cheaper to read) and a
+    struct `Value` becomes its scalar or container. Plain values pass through.
+    """
+    if isinstance(value, _SCALARS):
+        return value
+    if value.__class__ is _Value:
+        return _from_value(value)
+    pb = getattr(value, "_pb", None)
+    return value if pb is None else pb
+
+
+def plain(value):
+    """
+    Convert protobuf containers (MapComposite, RepeatedComposite, Struct
+    values) to dicts and lists, for values no schema describes.
+    """
+    value = _native(value)
+    if isinstance(value, _SCALARS):
+        return value
+    if hasattr(value, "items"):
+        return {k: plain(v) for k, v in value.items()}
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    try:
+        return [plain(v) for v in value]  # upb repeated containers only support indexing
+    except TypeError:
+        return str(value)
+
+
+def _string(value):
+    value = _native(value)
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # Struct numbers are floats: 42 arrives as 42.0
+    return "" if value is None else str(value)
+
+
+def _integer(value):
+    value = _native(value)
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return value
+
+
+def _number(value):
+    value = _native(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _boolean(value):
+    value = _native(value)
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+def _compile(schema: dict):
+    """Build a converter function for one JSON-schema node, once, up front."""
+    kind = (schema or {}).get("type")
+    if kind == "string":
+        return _string
+    if kind == "integer":
+        return _integer
+    if kind == "number":
+        return _number
+    if kind == "boolean":
+        return _boolean
+    if kind == "array":
+        item = _compile(schema.get("items"))
+
+        def array(value):
+            value = _native(value)
+            if isinstance(value, str):
+                # The model sometimes sends a list as its JSON text.
+                text = value.strip()
+                if not text.startswith("["):
+                    return []
+                try:
+                    value = json.loads(text)
+                except ValueError:
+                    return []
+            elif hasattr(value, "items"):
+                value = [value]  # a single object where a list was expected
+            try:
+                value = iter(value)
+            except TypeError:
+                return []  # a number or null where a list was expected
+            return [item(v) for v in value]
+        return array
+    if kind == "object":
+        fields = {name: _compile(sub) for name, sub in (schema.get("properties") or {}).items()}
+
+        def obj(value):
+            value = _native(value)
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    return {}
+            if not hasattr(value, "items"):
+                return {}
+            if not fields:
+                return plain(value)
+            return {k: fields[k](v) for k, v in value.items() if k in fields}
+        return obj
+    return plain
+
+
+# ============================================================
+#  DECODER
+# ============================================================
+
+class ArgDecoder:
+    """
+    Turn the protobuf `args` of a Gemini function call into the keyword
+    arguments of the matching tool function, typed as its declared schema
+    says. Arguments the schema does not declare are dropped.
+    """
+
+    def __init__(self, schemas: list):
+        self._decoders = {schema["name"]: _compile(schema.get("parameters") or {"type": "object"})
+                          for schema in schemas}
+
+    def decode(self, name: str, args) -> dict:
+        decoder = self._decoders.get(name)
+        if decoder is None:
+            return plain(args) if args is not None else {}
+        return decoder(args if args is not None else {})
@@ -0,0 +1,94 @@
+import datetime as dt
+import os
+import threading
+
+try:
+    from . import metrics
+except ImportError:
+    import metrics
+
+# ============================================================
+#  CONFIGURATION
+# ============================================================
+
+MODEL_NAME = os.environ.get("PROSWEET_MODEL", "gemini-2.5-flash")
+
+# Stream responses: text replies are shown as they arrive and each function
+# call runs as soon as it is complete, before the rest of the response.
+STREAM_RESPONSES = os.environ.get("PROSWEET_STREAM", "0") == "1"
+
+# When > 0, each agent's system instruction and tool declarations are
+# stored once on Google's side as an explicit context cache (for this many
+# seconds) and every request refers to it instead of re-sending them.
+# Below the model's minimum cacheable size the API refuses; we then fall
+# back to the plain model, which still gets Gemini's implicit prefix cache
+# because the static part always comes first and never changes.
+CONTEXT_CACHE_TTL = float(os.environ.get("PROSWEET_CONTEXT_CACHE_TTL", "0"))
+
+# Recreate a cache this long before it expires rather than racing its expiry.
+_REFRESH_MARGIN = dt.timedelta(minutes=2)
+
+_caches = {}  # (model, cache key) -> CachedContent, or None once the API refused
+_lock = threading.Lock()
+
+
+# ============================================================
+#  MODELS
+# ============================================================
+
+def _genai():
+    # The SDK takes most of a second to import; only pay for it once a model is needed.
+    import google.generativeai as genai
+    return genai
+
+
+def configure(api_key: str = None):
+    """Set the Gemini API key (default: GOOGLE_API_KEY)."""
+    _genai().configure(api_key=api_key or os.environ.get("GOOGLE_API_KEY"))
+
+
+def _context_cache(model_name: str, cache_key: str, system_instruction: str, tools: list):
+    key = (model_name, cache_key)
+    with _lock:
+        if key in _caches:
+            cached = _caches[key]
+            if cached is None:
+                return None
+            if cached.expire_time - dt.datetime.now(dt.timezone.utc) > _REFRESH_MARGIN:
+                return cached
+        try:
+            cached = _genai().caching.CachedContent.create(
+                model=f"models/{model_name}",
+                display_name=f"prosweet-{cache_key}",
+                system_instruction=system_instruction,
+                tools=tools,
+                ttl=dt.timedelta(seconds=CONTEXT_CACHE_TTL),
+            )
+            metrics.inc("context_caches_created_total", agent=cache_key)
+        except Exception as e:
+            print(f"⚠️ Context cache not available for {cache_key} ({e}); sending the instructions inline.")
+            cached = None
+        _caches[key] = cached
+        return cached
+
+
+def build_model(system_instruction: str, tools: list, cache_key: str = None, model_name: str = None):
+    """
+    A GenerativeModel whose fixed instructions and tool schemas travel as
+    `system_instruction` / `tools` (the cacheable prefix), so each turn only
+    sends its own small delta. With PROSWEET_CONTEXT_CACHE_TTL set and a
+    `cache_key`, models for the same agent share one explicit context cache.
+    """
+    genai = _genai()
+    model_name = model_name or MODEL_NAME
+    if CONTEXT_CACHE_TTL > 0 and cache_key:
+        cached = _context_cache(model_name, cache_key, system_instruction, tools)
+        if cached is not None:
+            return genai.GenerativeModel.from_cached_content(cached)
+    return genai.GenerativeModel(model_name=model_name, tools=tools, system_instruction=system_instruction)
+
+
+def cached_tokens(response) -> int:
+    """Prompt tokens Gemini served from a (implicit or explicit) cache for this response."""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "cached_content_token_count", 0) or 0
@@ -0,0 +1,231 @@
+import asyncio
+import base64
+import contextlib
+import hashlib
+import os
+import threading
+import functools
+import weakref
+
+try:
+    from . import metrics
+except ImportError:
+    import metrics
+
+# ============================================================
+#  POOL CONFIGURATION
+# ============================================================
+
+# One pool per (server, credentials). `pool_connections` is how many host pools a
+# session keeps, `pool_maxsize` is how many keep-alive sockets each host pool
+# may hold open at once (i.e. concurrent requests to that host).
+POOL_CONNECTIONS = int(os.environ.get("PROSWEET_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.environ.get("PROSWEET_POOL_MAXSIZE", "16"))
+POOL_ENABLED = os.environ.get("PROSWEET_POOL_ENABLED", "1") != "0"
+DEFAULT_TIMEOUT = float(os.environ.get("PROSWEET_HTTP_TIMEOUT", "10"))
+
+_sessions: dict = {}
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> {(server, credential_key): AsyncClient}
+_lock = threading.Lock()
+_loop = None
+
+
+def configure_pools(pool_connections: int = None, pool_maxsize: int = None, enabled: bool = None):
+    """Change pool sizes (or disable pooling). Existing sessions are closed so the new sizes apply."""
+    global POOL_CONNECTIONS, POOL_MAXSIZE, POOL_ENABLED
+    if pool_connections is not None:
+        POOL_CONNECTIONS = pool_connections
+    if pool_maxsize is not None:
+        POOL_MAXSIZE = pool_maxsize
+    if enabled is not None:
+        POOL_ENABLED = enabled
+    close_all_sessions()
+
+
+@functools.lru_cache(maxsize=1024)
+def basic_auth_header(username: str, password: str) -> str:
+    """
+    Build the value of a Basic `Authorization` header. Cached, so the
+    session or client for credentials seen before does not re-encode it.
+    """
+    return "Basic " + base64.b64encode(f"{username}:{password}".encode()).decode()
+
+
+@functools.lru_cache(maxsize=1024)
+def credential_key(username: str, password: str) -> str:
+    """
+    "<username>:<fingerprint>" for keying anything kept per user: a wrong
+    password gets its own key instead of the user's state. The fingerprint
+    is salted and stretched (PBKDF2), so it may be written to disk.
+    """
+    salt = b"prosweet\0" + username.encode()
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, 10_000)
+    return f"{username}:{digest.hex()[:24]}"
+
+
+# ============================================================
+#  SESSIONS
+# ============================================================
+
+@functools.lru_cache(maxsize=None)
+def _requests():
+    """
+    `requests` and the session class, imported on first use: only the
+    synchronous helpers need them, the agents themselves run on httpx.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    class _TimeoutSession(requests.Session):
+        """Session that applies DEFAULT_TIMEOUT when a call does not pass one."""
+
+        def request(self, method, url, **kwargs):
+            kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+            return super().request(method, url, **kwargs)
+
+    return _TimeoutSession, HTTPAdapter
+
+
+def _new_session(base_url: str, username: str, password: str) -> "requests.Session":
+    session_class, adapter_class = _requests()
+    session = session_class()
+    adapter = adapter_class(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    scheme = base_url.split("://", 1)[0] + "://"
+    session.mount(scheme, adapter)
+    # Encoded once per session instead of once per request.
+    session.headers["Authorization"] = basic_auth_header(username, password)
+    session.hooks["response"].append(metrics.on_requests_response)
+    return session
+
+
+def get_session(base_url: str, username: str, password: str) -> "requests.Session":
+    """
+    Return the keep-alive session for this server and these credentials.
+
+    Sessions are shared by every tool function, so consecutive calls to the
+    same Radicale / Hono server reuse the same TCP connection instead of
+    opening a new one each time. Another password for the same user gets
+    its own session: a shared Authorization header is never rewritten
+    under requests in flight.
+
+    With pooling disabled this is a new session the caller owns and must
+    close; session() does that for a `with` block either way.
+    """
+    if not POOL_ENABLED:
+        return _new_session(base_url, username, password)
+
+    key = (base_url.rstrip("/"), credential_key(username, password))
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _new_session(base_url, username, password)
+            _sessions[key] = session
+        return session
+
+
+@contextlib.contextmanager
+def session(base_url: str, username: str, password: str):
+    """
+    get_session() for a `with` block: the pooled session, left open for the
+    next caller, or with pooling disabled a new one closed (with its
+    sockets) at the end of the block.
+    """
+    if POOL_ENABLED:
+        yield get_session(base_url, username, password)
+        return
+    with _new_session(base_url, username, password) as unpooled:
+        yield unpooled
+
+
+def close_all_sessions():
+    """Close every pooled session (and its sockets)."""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+    with _lock:
+        loops = [(loop, list(clients.values())) for loop, clients in _async_clients.items()]
+        _async_clients.clear()
+    for loop, clients in loops:
+        if loop.is_closed():
+            continue
+        for client in clients:
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            else:
+                loop.run_until_complete(client.aclose())
+
+
+def pool_stats() -> dict:
+    """Number of TCP connections each pooled session has opened so far."""
+    stats = {}
+    with _lock:
+        items = list(_sessions.items())
+    for (base_url, credentials), session in items:
+        opened = 0
+        for adapter in session.adapters.values():
+            for pool in list(adapter.poolmanager.pools._container.values()):
+                opened += pool.num_connections
+        username = credentials.rsplit(":", 1)[0]
+        stats[f"{username}@{base_url}"] = stats.get(f"{username}@{base_url}", 0) + opened
+    return stats
+
+
+# ============================================================
+#  ASYNC CLIENTS
+# ============================================================
+
+def _new_async_client(base_url: str, username: str, password: str) -> "httpx.AsyncClient":
+    # httpx is imported on first use: with the CLI it loads (click, rich,
+    # pygments) it would be most of an agent module's import time.
+    import httpx
+
+    # With pooling disabled every request gets its own connection, which is
+    # what the agents did before the shared clients existed.
+    keepalive = POOL_MAXSIZE if POOL_ENABLED else 0
+    limits = httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=keepalive)
+    return httpx.AsyncClient(
+        headers={"Authorization": basic_auth_header(username, password)},
+        limits=limits,
+        timeout=DEFAULT_TIMEOUT,
+        event_hooks={"request": [metrics.on_request], "response": [metrics.on_response]},
+    )
+
+
+def get_async_client(base_url: str, username: str, password: str) -> "httpx.AsyncClient":
+    """
+    Async counterpart of get_session(): one pooled httpx.AsyncClient per
+    (server, credentials) and per running event loop, so many coroutines can
+    share the same keep-alive connections.
+    """
+    loop = asyncio.get_running_loop()
+    key = (base_url.rstrip("/"), credential_key(username, password))
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None or client.is_closed:
+            client = _new_async_client(base_url, username, password)
+            clients[key] = client
+        return client
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="prosweet-io", daemon=True).start()
+        return _loop
+
+
+def run_sync(coro):
+    """
+    Run a coroutine from synchronous code and return its result.
+
+    Every call goes to the same long-lived background event loop, so the
+    async clients (and their open connections) survive between calls. Must
+    not be called from inside a running event loop's thread — await the
+    coroutine there instead.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
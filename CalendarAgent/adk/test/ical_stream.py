@@ -0,0 +1,251 @@
+import datetime as dt
+import re
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+    ZoneInfoNotFoundError = Exception
+
+# ============================================================
+#  VALUE HELPERS
+# ============================================================
+
+_UNESCAPE = {"n": "\n", "N": "\n", ",": ",", ";": ";", "\\": "\\"}
+_ESCAPED = re.compile(r"\\(.)")
+# One ;NAME=value parameter, the value possibly quoted (and then holding ; or :)
+_QUOTED_PARAM = re.compile(r';([^;=]*)=("[^"]*"|[^;]*)')
+
+
+def _unescape_match(match) -> str:
+    ch = match.group(1)
+    return _UNESCAPE.get(ch, ch)
+
+
+def unescape_text(value: str) -> str:
+    """Undo RFC 5545 TEXT escaping (\\n, \\, \\; \\\\)."""
+    if "\\" not in value:
+        return value
+    return _ESCAPED.sub(_unescape_match, value)
+
+
+def split_property(line: str):
+    """
+    Split a content line into (NAME, {PARAM: value}, value).
+
+    Parameter values may be quoted and contain ':' or ';', so the split
+    point is the first ':' outside double quotes.
+    """
+    colon = line.find(":")
+    if colon >= 0 and '"' not in line[:colon]:
+        head, value = line[:colon], line[colon + 1:]
+    else:
+        head, value = _split_quoted(line)
+    if head is None:
+        return line.upper(), {}, ""
+
+    if ";" not in head:
+        return head.upper(), {}, value
+    if '"' in head:
+        name = head.split(";", 1)[0]
+        return name.upper(), {key.upper(): val.strip('"') for key, val in _QUOTED_PARAM.findall(head)}, value
+    name, *raw_params = head.split(";")
+    params = {}
+    for raw in raw_params:
+        key, _, val = raw.partition("=")
+        params[key.upper()] = val.strip('"')
+    return name.upper(), params, value
+
+
+def _split_quoted(line: str):
+    in_quotes = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            in_quotes = not in_quotes
+        elif ch == ":" and not in_quotes:
+            return line[:i], line[i + 1:]
+    return None, ""
+
+
+_tz_cache = {}
+
+
+def _zone(tzid: str):
+    if tzid not in _tz_cache:
+        try:
+            _tz_cache[tzid] = ZoneInfo(tzid) if ZoneInfo else None
+        except (ZoneInfoNotFoundError, ValueError):
+            _tz_cache[tzid] = None
+    return _tz_cache[tzid]
+
+
+def normalize_time(params: dict, value: str) -> str:
+    """
+    Normalise a DTSTART/DTEND value to the compact forms the agents use:
+    `YYYYMMDDTHHMMSSZ` for UTC (TZID times are converted when the zone is
+    known), `YYYYMMDDTHHMMSS` for floating times and `YYYYMMDD` for all-day
+    (VALUE=DATE) values.
+    """
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return value[:8]
+    tzid = params.get("TZID")
+    if tzid and not value.endswith("Z"):
+        zone = _zone(tzid)
+        if zone is not None:
+            try:
+                local = dt.datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]),
+                                    int(value[9:11]), int(value[11:13]), int(value[13:15]), tzinfo=zone)
+            except ValueError:
+                return value
+            return local.astimezone(dt.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return value
+
+
+# ============================================================
+#  STREAMING PARSER
+# ============================================================
+
+class VEventParser:
+    """
+    Single-pass VEVENT parser fed one physical line at a time.
+
+    Handles line folding (continuation lines start with a space or tab),
+    quoted parameters, TZID and VALUE=DATE times and TEXT escaping, and
+    ignores properties of nested components such as VALARM unless
+    `alarms=True`, which adds an "alarms" list of {action, trigger,
+    description, summary} to each event. Only the event currently being
+    read is held in memory, so a collection of any size can be parsed
+    straight off the socket.
+    """
+
+    FIELDS = {"UID": "uid", "SUMMARY": "summary", "DESCRIPTION": "description",
+              "DTSTART": "start_time", "DTEND": "end_time", "RRULE": "rrule"}
+    ALARM_FIELDS = {"ACTION": "action", "TRIGGER": "trigger", "DESCRIPTION": "description",
+                    "SUMMARY": "summary"}
+
+    def __init__(self, alarms: bool = False):
+        self._pending = None  # current logical line, until we know it is not folded further
+        self._stack = []      # open components, innermost last
+        self._event = None
+        self._alarms = alarms
+        self._alarm = None    # VALARM being read, when alarms are kept
+
+    def feed(self, line) -> list:
+        """Consume one physical line; return the events it completed (usually none)."""
+        if line.__class__ is bytes:
+            line = line.decode("utf-8", "replace")
+        line = line.rstrip("\r\n")
+        if not line:
+            return []  # blank lines are not content lines (and chunked readers emit them)
+        if line[0] in " \t":
+            if self._pending is not None:
+                self._pending += line[1:]
+            return []
+        pending, self._pending = self._pending, line
+        if pending is None:
+            return []
+        done = self._logical_line(pending)
+        return [done] if done else []
+
+    def close(self) -> list:
+        """Flush the last buffered line at end of input."""
+        done = self._logical_line(self._pending) if self._pending is not None else None
+        self._pending = None
+        return [done] if done else []
+
+    def _logical_line(self, line: str):
+        colon = line.find(":")
+        semi = line.find(";", 0, colon if colon >= 0 else len(line))
+        name = line[:semi if semi >= 0 else colon].upper()
+
+        if name == "BEGIN":
+            component = line[colon + 1:].strip().upper()
+            self._stack.append(component)
+            if component == "VEVENT" and len(self._stack) <= 2:
+                self._event = dict.fromkeys(self.FIELDS.values())
+                if self._alarms:
+                    self._event["alarms"] = []
+            elif component == "VALARM" and self._alarms and self._event is not None and self._stack[-2] == "VEVENT":
+                self._alarm = {}
+            return None
+        if name == "END":
+            component = line[colon + 1:].strip().upper()
+            if self._stack:
+                self._stack.pop()
+            if component == "VALARM" and self._alarm is not None:
+                self._event["alarms"].append(self._alarm)
+                self._alarm = None
+                return None
+            if component == "VEVENT" and self._event is not None and "VEVENT" not in self._stack:
+                event, self._event = self._event, None
+                return event
+            return None
+
+        if self._alarm is not None:
+            return self._alarm_line(name, semi, colon, line)
+        key = self.FIELDS.get(name)
+        if key is None or self._event is None or self._stack[-1] != "VEVENT":
+            return None
+        if semi < 0:
+            params, value = {}, line[colon + 1:]
+        else:
+            _, params, value = split_property(line)
+        if key == "start_time" or key == "end_time":
+            self._event[key] = normalize_time(params, value)
+        else:
+            self._event[key] = unescape_text(value).strip()
+        return None
+
+    def _alarm_line(self, name: str, semi: int, colon: int, line: str):
+        key = self.ALARM_FIELDS.get(name)
+        if key is None or self._stack[-1] != "VALARM":
+            return None
+        if semi < 0:
+            params, value = {}, line[colon + 1:]
+        else:
+            _, params, value = split_property(line)
+        if key == "trigger":
+            # a duration relative to the start (-PT10M) or, with VALUE=DATE-TIME, an absolute time
+            self._alarm[key] = normalize_time(params, value) if params.get("VALUE") == "DATE-TIME" else value.strip()
+        elif key == "action":
+            self._alarm[key] = value.strip().upper()
+        else:
+            self._alarm[key] = unescape_text(value).strip()
+        return None
+
+
+def iter_vevents(lines, alarms: bool = False):
+    """Yield one event dict per VEVENT from an iterable of lines (str or bytes)."""
+    parser = VEventParser(alarms)
+    for line in lines:
+        yield from parser.feed(line)
+    yield from parser.close()
+
+
+async def aiter_vevents(lines, alarms: bool = False):
+    """Async variant of iter_vevents() for `httpx.Response.aiter_lines()`."""
+    parser = VEventParser(alarms)
+    async for line in lines:
+        for event in parser.feed(line):
+            yield event
+    for event in parser.close():
+        yield event
+
+
+def iter_lines_from_chunks(chunks):
+    """Split raw byte chunks (e.g. `iter_content()`) into lines without buffering the whole body."""
+    tail = b""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def parse_ics(text: str, alarms: bool = False) -> list:
+    """Parse a complete iCalendar document held in memory."""
+    return list(iter_vevents(text.splitlines(), alarms))
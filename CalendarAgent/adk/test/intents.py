@@ -0,0 +1,278 @@
+import datetime as dt
+import os
+import re
+from types import SimpleNamespace
+
+try:
+    from . import calendar_window, prompt_encoding
+except ImportError:
+    import calendar_window
+    import prompt_encoding
+
+# ============================================================
+#  CONFIGURATION
+# ============================================================
+
+# Set to 0 to send every prompt to the model.
+FAST_PATH_ENABLED = os.environ.get("PROSWEET_FAST_PATH", "1") != "0"
+
+# Length of a new event when the prompt gives only its start.
+DEFAULT_DURATION = dt.timedelta(hours=1)
+
+# Anything that hints at more than one plain step goes to the model.
+_UNSURE = re.compile(r"\b(and|or|then|also|every|each|all|except|unless|if|but|not|don't|"
+                     r"remind|alarm|reminder|repeat|recurring|daily|weekly|monthly)\b|[?,;]")
+
+_CREATE = re.compile(r"^(?:add|create|schedule|book)\s+(?P<rest>.+)$", re.I)
+_UPDATE = re.compile(r"^(?:move|reschedule|push|shift)\s+(?P<title>.+?)\s+to\s+(?P<when>.+)$", re.I)
+_DELETE = re.compile(r"^(?:delete|remove|cancel)\s+(?P<title>.+)$", re.I)
+
+_CLOCK = r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?"
+_TIME = re.compile(r"\b(?:at\s+)?(?:(noon|midday|midnight)|(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b|(\d{1,2}):(\d{2})\b)", re.I)
+_SPAN = re.compile(r"\b(?:from\s+)?" + _CLOCK + r"\s*(?:-|–|to|until|till)\s*" + _CLOCK + r"\b", re.I)
+_DURATION = re.compile(r"\bfor\s+(?:(half\s+an\s+hour)|(an?|\d+(?:\.\d+)?)\s*(hours?|hrs?|h|minutes?|mins?|m)\b)", re.I)
+
+# Words that carry no meaning in a title or around a date.
+_FILLER = {"my", "the", "a", "an", "our", "this", "that", "event", "at", "on", "for", "from", "to", "by", "of", "in"}
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class Intent:
+    """
+    A command resolved without the model: `action` is create, update or
+    delete, `args` the tool arguments (name, summary, start_time, end_time,
+    event_uid as applicable) and `event` the existing event it refers to.
+    """
+
+    def __init__(self, action: str, args: dict, event: dict = None):
+        self.action = action
+        self.args = args
+        self.event = event
+
+    def call(self, name: str, **extra):
+        """The intent as a function call, shaped like the model's for dispatch.run_calls()."""
+        return SimpleNamespace(name=name, args={**self.args, **extra})
+
+    def __repr__(self):
+        return f"Intent({self.action!r}, {self.args!r})"
+
+
+# ============================================================
+#  PHRASES
+# ============================================================
+
+def _hour(hour: str, minute: str, meridiem: str):
+    hour, minute = int(hour), int(minute or 0)
+    meridiem = (meridiem or "").lower()
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return dt.time(hour, minute)
+
+
+def _cut(text: str, match) -> str:
+    return " ".join((text[:match.start()] + " " + text[match.end():]).split())
+
+
+def _take_time(text: str) -> tuple:
+    """(time, rest) for one clearly written clock time ("3pm", "10:30", "noon")."""
+    matches = list(_TIME.finditer(text))
+    if len(matches) != 1:
+        return None, text
+    word, hour, minute, meridiem, hour24, minute24 = matches[0].groups()
+    if word:
+        when = dt.time(0) if word.lower() == "midnight" else dt.time(12)
+    elif hour:
+        when = _hour(hour, minute, meridiem)
+    else:
+        when = _hour(hour24, minute24, None)
+    return (when, _cut(text, matches[0])) if when else (None, text)
+
+
+def _take_span(text: str) -> tuple:
+    """(start, end, rest) for "from 7 to 8am", "2-3pm", "14:00-15:30"."""
+    match = _SPAN.search(text)
+    if not match:
+        return None, None, text
+    h1, m1, p1, h2, m2, p2 = match.groups()
+    if not (p1 or p2 or m1 or m2):
+        return None, None, text  # "2-3" could be anything
+    start = _hour(h1, m1, p1 or p2)
+    end = _hour(h2, m2, p2 or p1)
+    if p2 and not p1 and start and end and start > end:
+        start = _hour(h1, m1, "am")  # "11-1pm"
+    if not start or not end or end <= start:
+        return None, None, text
+    return start, end, _cut(text, match)
+
+
+def _take_duration(text: str) -> tuple:
+    match = _DURATION.search(text)
+    if not match:
+        return None, text
+    half, amount, unit = match.groups()
+    if half:
+        return dt.timedelta(minutes=30), _cut(text, match)
+    amount = 1.0 if amount.lower() in ("a", "an") else float(amount)
+    minutes = amount * 60 if unit.lower().startswith("h") else amount
+    return dt.timedelta(minutes=minutes), _cut(text, match)
+
+
+def _words(text: str) -> list:
+    return [w for w in _WORD.findall(text.lower().replace("'s", "")) if w not in _FILLER]
+
+
+def _title(text: str) -> str:
+    """Drop filler words around a title ("my", "at", "on" ...), keep the inside as typed."""
+    words = text.split()
+    while words and words[0].lower() in _FILLER:
+        words.pop(0)
+    while words and words[-1].lower() in _FILLER:
+        words.pop()
+    return " ".join(words)
+
+
+# ============================================================
+#  EVENTS
+# ============================================================
+
+def _local(value) -> dt.datetime:
+    """Event time as naive local time (gateway times are UTC, marked Z)."""
+    text = prompt_encoding.compact_time(value)
+    if not text:
+        return None
+    try:
+        when = dt.datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if when.tzinfo:
+        when = when.astimezone().replace(tzinfo=None)
+    return when
+
+
+def _start(event: dict):
+    return _local(event.get("start") or event.get("start_time"))
+
+
+def _end(event: dict):
+    return _local(event.get("end") or event.get("end_time"))
+
+
+def find_events(title: str, events: list, day: dt.date = None, exact: bool = False) -> list:
+    """
+    Events whose title contains every word of `title` (with `exact`, no
+    other word either) and that start on `day`, if given. Recurring events
+    are left out: a change to one occurrence or to the whole series is the
+    model's call.
+    """
+    wanted = set(_words(title))
+    if not wanted:
+        return []
+
+    def titled(event: dict) -> bool:
+        words = set(_words(event.get("summary") or event.get("name") or ""))
+        return words == wanted if exact else wanted <= words
+
+    found = [e for e in events if not e.get("rrule") and titled(e)]
+    if day is not None:
+        found = [e for e in found if (_start(e) or dt.datetime.min).date() == day]
+    return found
+
+
+def _iso(when: dt.datetime) -> str:
+    """A naive local time as UTC with a Z: the gateway, Radicale and agent_test all read that the same way."""
+    return when.astimezone(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _existing(event: dict) -> dict:
+    return {"name": event.get("summary") or "", "summary": event.get("description") or "",
+            "event_uid": event.get("uid")}
+
+
+# ============================================================
+#  MATCHING
+# ============================================================
+
+def _match_delete(text: str, events: list, today: dt.date):
+    title = _DELETE.match(text).group("title")
+    day, title = calendar_window.mentioned_day(title, today)
+    if day is None:
+        return None  # the listing is a window: the same title may be on a day outside it
+    found = find_events(_title(title), events, day, exact=True)
+    if len(found) != 1:
+        return None
+    return Intent("delete", {"event_uid": found[0].get("uid")}, found[0])
+
+
+def _match_update(text: str, events: list, today: dt.date):
+    match = _UPDATE.match(text)
+    day, title = calendar_window.mentioned_day(match.group("title"), today)
+    new_day, when = calendar_window.mentioned_day(match.group("when"), today)
+    new_time, when = _take_time(when)
+    if _words(when) or (new_day is None and new_time is None):
+        return None  # something in the target we did not understand
+
+    found = find_events(_title(title), events, day)
+    if len(found) > 1 and day is None and new_day is not None:
+        found = find_events(_title(title), events, new_day)  # "move standup to 10am tomorrow"
+    if len(found) != 1:
+        return None
+    event = found[0]
+    start, end = _start(event), _end(event)
+    if start is None:
+        return None
+    length = (end - start) if end and end > start else DEFAULT_DURATION
+    new_start = dt.datetime.combine(new_day or start.date(), new_time or start.time())
+    return Intent("update", {**_existing(event), "start_time": _iso(new_start),
+                             "end_time": _iso(new_start + length)}, event)
+
+
+def _match_create(text: str, today: dt.date):
+    rest = _CREATE.match(text).group("rest")
+    day, rest = calendar_window.mentioned_day(rest, today)
+    start, end, rest = _take_span(rest)
+    if start is None:
+        start, rest = _take_time(rest)
+    length, rest = _take_duration(rest)
+    title = _title(rest)
+    if day is None or start is None or not title or (end and length):
+        return None
+    begin = dt.datetime.combine(day, start)
+    finish = dt.datetime.combine(day, end) if end else begin + (length or DEFAULT_DURATION)
+    return Intent("create", {"name": title[:1].upper() + title[1:], "summary": "",
+                             "start_time": _iso(begin), "end_time": _iso(finish)})
+
+
+def match(prompt: str, events: list, today: dt.date = None):
+    """
+    Resolve a plain one-step command against the listed events, or return
+    None so the prompt goes to the model:
+
+        delete|remove|cancel <title> [<day>]
+        move|reschedule <title> [<day>] to <day> and/or <time>
+        add|create|schedule <title> <day> <time or span> [for <duration>]
+
+    A title must match exactly one event (all its words, in any order). A
+    delete, which cannot be taken back, must also name the day (the window
+    listed always covers it) and give the event's whole title. Anything
+    ambiguous, compound ("and", "every", ...) or not fully understood is
+    left to the model.
+    """
+    if not FAST_PATH_ENABLED or not prompt:
+        return None
+    today = today or dt.date.today()
+    text = " ".join(prompt.strip().rstrip(".!").split())
+    text = re.sub(r"^(?:please\s+|can you\s+|could you\s+)", "", text, flags=re.I)
+    lowered = text.lower()
+    if _UNSURE.search(lowered):
+        return None
+    if _DELETE.match(lowered):
+        return _match_delete(text, events, today)
+    if _UPDATE.match(lowered):
+        return _match_update(text, events, today)
+    if _CREATE.match(lowered):
+        return _match_create(text, today)
+    return None
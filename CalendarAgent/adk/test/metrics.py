@@ -0,0 +1,231 @@
+import contextlib
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+# ============================================================
+#  CONFIGURATION
+# ============================================================
+
+# When set, every finished span is appended to this file as one JSON line,
+# and flush() appends a snapshot of every series.
+METRICS_JSONL = os.environ.get("PROSWEET_METRICS_JSONL")
+# When set, flush() rewrites this file in the Prometheus text format
+# (e.g. for node_exporter's textfile collector).
+METRICS_PROM = os.environ.get("PROSWEET_METRICS_PROM")
+
+PREFIX = "prosweet_"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> float
+_histograms = {}  # (name, labels) -> _Histogram
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+# ============================================================
+#  RECORDING
+# ============================================================
+
+def inc(name: str, value: float = 1, **labels):
+    """Add `value` to a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+    """Record one sample in a histogram."""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram(buckets)
+        histogram.observe(value)
+
+
+@contextlib.contextmanager
+def span(name: str, **labels):
+    """
+    Time a block into the `<name>_seconds` histogram. An exception escaping
+    the block also counts in `<name>_errors_total`.
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        inc(f"{name}_errors_total", error=error, **labels)
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        observe(f"{name}_seconds", seconds, **labels)
+        if METRICS_JSONL:
+            _append({"ts": time.time(), "span": name, "labels": labels, "seconds": seconds, "error": error})
+
+
+def timed(name: str, **labels):
+    """Decorator form of span() for plain and async functions."""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with span(name, **labels):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with span(name, **labels):
+                    return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _append(record: dict):
+    line = json.dumps(record, default=str) + "\n"
+    with _lock, open(METRICS_JSONL, "a", encoding="utf-8") as out:
+        out.write(line)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+# ============================================================
+#  EXPORT
+# ============================================================
+
+def snapshot() -> list:
+    """Every series as a plain dict (the records write_jsonl() emits)."""
+    with _lock:
+        records = [{"type": "counter", "name": name, "labels": dict(labels), "value": value}
+                   for (name, labels), value in _counters.items()]
+        for (name, labels), h in _histograms.items():
+            records.append({"type": "histogram", "name": name, "labels": dict(labels),
+                            "buckets": dict(zip(h.buckets, h.counts)), "sum": h.sum, "count": h.count})
+    return records
+
+
+def write_jsonl(path: str):
+    """Append the current value of every series to `path`, one JSON object per line."""
+    now = time.time()
+    with open(path, "a", encoding="utf-8") as out:
+        for record in snapshot():
+            out.write(json.dumps({"ts": now, **record}) + "\n")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict, **extra) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in items.items())
+    return "{" + body + "}"
+
+
+def prometheus_text() -> str:
+    """All series in the Prometheus text exposition format."""
+    lines, typed = [], set()
+    for record in sorted(snapshot(), key=lambda r: r["name"]):
+        name = PREFIX + record["name"]
+        if name not in typed:
+            lines.append(f"# TYPE {name} {record['type']}")
+            typed.add(name)
+        labels = record["labels"]
+        if record["type"] == "counter":
+            lines.append(f"{name}{_labels(labels)} {record['value']}")
+            continue
+        cumulative = 0
+        for bound, count in record["buckets"].items():
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {record['count']}")
+        lines.append(f"{name}_sum{_labels(labels)} {record['sum']}")
+        lines.append(f"{name}_count{_labels(labels)} {record['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def flush():
+    """Export to whichever of PROSWEET_METRICS_JSONL / PROSWEET_METRICS_PROM is set."""
+    if METRICS_JSONL:
+        write_jsonl(METRICS_JSONL)
+    if METRICS_PROM:
+        tmp = METRICS_PROM + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as out:
+            out.write(prometheus_text())
+        os.replace(tmp, METRICS_PROM)
+
+
+# ============================================================
+#  HTTP HOOKS
+# ============================================================
+
+def _content_length(headers) -> int:
+    try:
+        return int(headers.get("content-length") or 0)
+    except ValueError:
+        return 0
+
+
+async def on_request(request):
+    """httpx request hook: remember when the request left."""
+    request.extensions["prosweet_start"] = time.perf_counter()
+    inc("http_request_bytes_total", _content_length(request.headers), method=request.method)
+
+
+async def on_response(response):
+    """
+    httpx response hook: count the request, its latency (to response headers)
+    and the response size from Content-Length (the body has not been read yet).
+    """
+    request = response.request
+    start = request.extensions.get("prosweet_start")
+    if start is not None:
+        observe("http_request_seconds", time.perf_counter() - start, method=request.method)
+    inc("http_requests_total", method=request.method, status=response.status_code)
+    inc("http_response_bytes_total", _content_length(response.headers), method=request.method)
+    if response.status_code >= 400:
+        inc("http_errors_total", method=request.method, status=response.status_code)
+
+
+def on_requests_response(response, *args, **kwargs):
+    """`requests` response hook: same series as the httpx hooks."""
+    method = response.request.method
+    observe("http_request_seconds", response.elapsed.total_seconds(), method=method)
+    inc("http_requests_total", method=method, status=response.status_code)
+    inc("http_request_bytes_total", _content_length(response.request.headers), method=method)
+    inc("http_response_bytes_total", _content_length(response.headers), method=method)
+    if response.status_code >= 400:
+        inc("http_errors_total", method=method, status=response.status_code)
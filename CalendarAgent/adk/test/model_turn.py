@@ -0,0 +1,141 @@
+"""
+The model's part of an agent turn, shared by event_agent and alarm_agent.
+
+The agent fetches its window of the calendar and tries the fast path; what
+is left is done here: the prompt (in a chat session, only what changed),
+up to calendar_window.MAX_WIDEN_ROUNDS get_events_in_range rounds, and the
+tool calls of the model's final answer.
+"""
+import asyncio
+
+try:
+    from . import calendar_window, chat_session, dispatch, event_index, gemini_models, metrics, prompt_encoding
+    from .http_client import credential_key
+except ImportError:
+    import calendar_window
+    import chat_session
+    import dispatch
+    import event_index
+    import gemini_models
+    import metrics
+    import prompt_encoding
+    from http_client import credential_key
+
+# Reply when the turn's listing failed: nothing is answered from older data.
+FETCH_FAILED = "I couldn't read your calendar just now, so I haven't done anything. Please try again."
+# Reply when the model still wants other dates after the last widen round.
+GAVE_UP = ("I couldn't find the event you mean in the dates I looked at. "
+           "Could you tell me when it is?")
+
+
+async def ask(agent: str, model, username: str, password: str, user_prompt: str, events: list,
+              window: tuple, *, handlers: dict, args, fetch, build_prompt, static_tokens: int,
+              header: str = None):
+    """
+    Ask `model` about `user_prompt` given the `events` listed in `window`
+    and run what it calls. `args` is the agent's function_args.ArgDecoder,
+    `fetch(username, password, window)` its listing call (None when it
+    failed) and
+    `build_prompt`/`static_tokens` its prompt. Returns the model's text
+    reply (printed after `header` unless it was streamed), GAVE_UP, or
+    [(name, args, result)] for the calls that ran.
+    """
+    def phase(name: str):
+        return metrics.span("turn_phase", agent=agent, phase=name)
+
+    user = credential_key(username, password)
+    # In a chat session the model already has the calendar from earlier turns: send what changed
+    session = chat_session.session_for(agent, user, model) if chat_session.ENABLED else None
+    snapshot = session is None or session.start()
+    aliases = session.aliases if session else prompt_encoding.UidAliases()  # e1, e2, ... in the prompt -> real UIDs
+    # A large window is cut down to the events the request can be about
+    with phase("retrieve"):
+        shown = event_index.select(user, events, user_prompt)
+    metrics.inc("retrieval_total", agent=agent, outcome="skipped" if shown is None else "selected")
+
+    decode = lambda name, raw: aliases.resolve_args(args.decode(name, raw))
+    # Streaming: each call starts as soon as the model has written it, text shows as it comes
+    runner = dispatch.CallRunner(handlers, decode) if gemini_models.STREAM_RESPONSES else None
+    echo = dispatch.TextEcho(header)
+    early = []  # results of calls that ran in a get_events_in_range round
+
+    prompt = None
+    for _ in range(calendar_window.MAX_WIDEN_ROUNDS + 1):
+        with phase("prompt"):
+            table, total = (events, None) if shown is None else (shown, len(events))
+            if session is None or snapshot:
+                prompt = build_prompt(username, password, table, window, user_prompt, aliases, total=total)
+            elif prompt is None:
+                budget = prompt_encoding.PROMPT_TOKEN_BUDGET - static_tokens - prompt_encoding.estimate_tokens(user_prompt)
+                prompt = f"{session.changes(events, window, shown, budget)}\n\nUser: {user_prompt}".lstrip()
+            else:
+                prompt = ""  # the ranges it asked for went back as function responses
+        with phase("model"):
+            if session is None:
+                response = await model.generate_content_async([prompt], stream=runner is not None)
+            else:
+                if snapshot:
+                    session.saw(table, prompt)
+                    snapshot = False
+                response = await session.send(prompt, stream=runner is not None)
+            if runner is not None:
+                streamed = await dispatch.stream_response(response, runner, echo, hold=("get_events_in_range",))
+                if session is not None:
+                    session.received(response)
+        metrics.observe("prompt_tokens", prompt_encoding.prompt_tokens(prompt, response),
+                        buckets=metrics.TOKEN_BUCKETS, agent=agent)
+        metrics.inc("prompt_cached_tokens_total", gemini_models.cached_tokens(response), agent=agent)
+        calls = dispatch.function_calls(response) if runner is None else streamed
+
+        # The model asked to look outside the window: fetch just those ranges and ask again
+        ranges = calendar_window.requested_ranges(calls, args.decode)
+        if not ranges:
+            break
+        if runner is not None:  # calls it made before asking have run: they count, and get their answers
+            ran = await runner.drain()
+            early += ran
+            if session is not None:
+                session.answer_results(ran)
+        with phase("fetch"):
+            fetched = await asyncio.gather(*(
+                fetch(username, password, calendar_window.day_window(first_day, last_day))
+                for first_day, last_day in ranges))
+        for (first_day, last_day), extra in zip(ranges, fetched):
+            if extra is None:  # not a delta against nothing: the model would take every event as deleted
+                if session is not None:
+                    session.answer("get_events_in_range", {"error": "those dates could not be listed"})
+                continue
+            extra = calendar_window.event_list(extra)
+            if session is not None:
+                found = session.changes(extra, calendar_window.day_window(first_day, last_day))
+                session.answer("get_events_in_range", {"events": found or "(no events besides those already listed)"})
+            events = calendar_window.merge_events(events, extra)
+            if shown is not None:  # what the model asked for goes in whole
+                shown = calendar_window.merge_events(shown, extra)
+            window = calendar_window.widen(window, first_day, last_day)
+
+    calls = [c for c in calls if c.name != "get_events_in_range"]
+    if ranges:
+        print(f"⚠️ The model was still asking for more events after {calendar_window.MAX_WIDEN_ROUNDS} rounds; giving up.")
+        metrics.inc("widen_exhausted_total", agent=agent)
+    echo.close()
+    if not calls and not early:
+        text = GAVE_UP if ranges else dispatch.response_text(response)
+        if ranges or not echo.text:  # a streamed reply was shown as it arrived
+            if header:
+                print(header)
+            print(text)
+        return text
+
+    if calls:
+        print(f"\n🤖 Gemini called {len(calls)} function(s): {', '.join(f'`{c.name}`' for c in calls)}")
+    with phase("dispatch"):
+        if runner is None:
+            ran = await dispatch.run_calls(calls, handlers, decode=decode)
+        else:
+            for call in calls:
+                runner.start(call)  # those held back; the others are already running
+            ran = await runner.drain()
+    if session is not None:
+        session.answer_results(ran)  # sent with the next message
+    return early + ran
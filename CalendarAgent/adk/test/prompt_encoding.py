@@ -0,0 +1,192 @@
+import datetime as dt
+import json
+import os
+
+# ============================================================
+#  BUDGET
+# ============================================================
+
+# Hard cap on the size of a whole prompt, in (estimated) tokens.
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROSWEET_PROMPT_TOKEN_BUDGET", "8000"))
+
+# Descriptions longer than this are cut; the model rarely needs more to pick an event.
+DESCRIPTION_CHARS = int(os.environ.get("PROSWEET_DESCRIPTION_CHARS", "60"))
+
+# Gemini averages about four characters per token on this kind of text.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap offline token estimate (no tokenizer round trip)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def static_tokens(system_instruction: str, tools: list = ()) -> int:
+    """Estimated size of the fixed prefix every request carries: system instruction and tool schemas."""
+    return estimate_tokens(system_instruction) + estimate_tokens(json.dumps(list(tools), default=str))
+
+
+def prompt_tokens(prompt: str, response=None) -> int:
+    """Prompt size as Gemini billed it (`usage_metadata`) when known, else estimated."""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "prompt_token_count", 0) or estimate_tokens(prompt)
+
+
+# ============================================================
+#  UID ALIASES
+# ============================================================
+
+class UidAliases:
+    """
+    Short per-turn names (e1, e2, ...) for event UIDs.
+
+    The prompt only shows the aliases; resolve_args() maps them back to the
+    real UIDs before a function call is dispatched. Values that are not an
+    alias (e.g. the model copied a real UID) are passed through unchanged.
+    """
+
+    UID_ARGS = ("event_uid", "uid")
+
+    def __init__(self):
+        self._alias = {}  # uid -> alias
+        self._uid = {}    # alias -> uid
+
+    def alias(self, uid: str) -> str:
+        if uid not in self._alias:
+            name = f"e{len(self._alias) + 1}"
+            self._alias[uid] = name
+            self._uid[name] = uid
+        return self._alias[uid]
+
+    def __contains__(self, uid):
+        return uid in self._alias
+
+    def resolve(self, value):
+        return self._uid.get(value, value) if isinstance(value, str) else value
+
+    def resolve_args(self, args) -> dict:
+        args = dict(args)
+        for key in self.UID_ARGS:
+            if key in args:
+                args[key] = self.resolve(args[key])
+        return args
+
+
+# ============================================================
+#  EVENT TABLE
+# ============================================================
+
+def compact_time(value) -> str:
+    """
+    Shorten gateway (2025-01-01T09:00:00.000Z) and iCalendar (20250101T090000Z,
+    20250101) times to 2025-01-01T09:00Z / 2025-01-01.
+    """
+    if not value:
+        return ""
+    value = str(value)
+    if len(value) >= 15 and value[8] == "T" and value[:8].isdigit():
+        value = f"{value[0:4]}-{value[4:6]}-{value[6:8]}T{value[9:11]}:{value[11:13]}:{value[13:15]}" + value[15:]
+    elif len(value) == 8 and value.isdigit():
+        return f"{value[0:4]}-{value[4:6]}-{value[6:8]}"
+    zulu = value.endswith("Z") or value.endswith("+00:00")
+    if len(value) >= 16 and value[10] == "T":
+        return value[:16] + ("Z" if zulu else "")
+    return value
+
+
+def _cell(value, limit: int = None) -> str:
+    text = " ".join(str(value or "").split()).replace("|", "/")
+    if limit is not None and len(text) > limit:
+        text = text[:max(limit - 1, 0)].rstrip() + "…"
+    return text
+
+
+def _alarms(alarms) -> str:
+    if not alarms:
+        return ""
+    return ",".join(f"{a.get('action', '')} {a.get('trigger', '')}".strip()
+                    for a in alarms if isinstance(a, dict))
+
+
+def _row(event: dict, aliases: UidAliases, with_alarms: bool) -> str:
+    cells = [
+        aliases.alias(event.get("uid") or ""),
+        compact_time(event.get("start") or event.get("start_time")),
+        compact_time(event.get("end") or event.get("end_time")),
+        _cell(event.get("summary")),
+        _cell(event.get("description"), DESCRIPTION_CHARS),
+    ]
+    if with_alarms:
+        cells.append(_cell(_alarms(event.get("alarms"))))
+    return "|".join(cells)
+
+
+def event_tokens(event: dict, with_alarms: bool = False) -> int:
+    """Estimated tokens of one event's row in the table (its alias counted as e99)."""
+    row = _row(event, _FixedAlias(), with_alarms)
+    return estimate_tokens(row) + 1
+
+
+def row_key(event: dict) -> str:
+    """What an event's row tells the model, alias aside: equal keys look the same to it."""
+    return _row(event, _FixedAlias(), True)
+
+
+class _FixedAlias(UidAliases):
+    def alias(self, uid: str) -> str:
+        return "e99"
+
+
+def _distance(event: dict, now: dt.datetime) -> float:
+    start = compact_time(event.get("start") or event.get("start_time")).rstrip("Z")
+    try:
+        when = dt.datetime.fromisoformat(start)
+    except ValueError:
+        return float("inf")
+    return abs((when - now).total_seconds())
+
+
+def encode_events(events: list, aliases: UidAliases, max_tokens: int = None) -> str:
+    """
+    One line per event under a header row:
+
+        id|start|end|title|notes[|alarms]
+
+    `id` is a per-turn alias from `aliases`. If the table would exceed
+    `max_tokens`, the events furthest from now are left out and a final line
+    says how many were dropped.
+    """
+    with_alarms = any(event.get("alarms") for event in events)
+    header = "id|start|end|title|notes" + ("|alarms" if with_alarms else "")
+    if not events:
+        return header + "\n(no events)"
+
+    rows = [(event, _row(event, aliases, with_alarms)) for event in events]
+    total = estimate_tokens(header) + sum(estimate_tokens(row) + 1 for _, row in rows)
+    if max_tokens is None or total <= max_tokens:
+        return "\n".join([header] + [row for _, row in rows])
+
+    # Over budget: keep the events closest to now, listed in their original order.
+    now = dt.datetime.now()
+    order = sorted(range(len(rows)), key=lambda i: _distance(rows[i][0], now))
+    budget = max_tokens - estimate_tokens(header) - 16  # room for the "omitted" line
+    keep = set()
+    for i in order:
+        cost = estimate_tokens(rows[i][1]) + 1
+        if cost > budget:
+            break
+        budget -= cost
+        keep.add(i)
+    lines = [header] + [row for i, (_, row) in enumerate(rows) if i in keep]
+    lines.append(f"(… {len(rows) - len(keep)} more events not shown)")
+    return "\n".join(lines)
+
+
+def fit_events(template: str, events: list, aliases: UidAliases, budget: int = None) -> str:
+    """
+    Fill the `{events}` slot of a prompt template with encode_events(), giving
+    the table whatever is left of the budget after the rest of the prompt.
+    """
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    rest = estimate_tokens(template.replace("{events}", ""))
+    return template.replace("{events}", encode_events(events, aliases, max(budget - rest, 0)), 1)
@@ -0,0 +1,371 @@
+"""
+Write-behind journal for calendar mutations.
+
+With PROSWEET_WRITE_BEHIND=1 the agents' create/update/delete calls append
+the write to a local SQLite journal and return {"status": "queued", ...}
+at once; a background worker on the agent's event loop applies it, with
+retries, backoff and conflict handling. Writes still pending when the
+process stops are picked up again after a restart. Each write carries a
+fingerprint of the credentials it was queued with (http_client.credential_key())
+and is only ever sent with those credentials.
+
+    python write_behind.py                 # depth, lag and failed writes
+    python write_behind.py --retry all     # put failed writes back in the queue
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+try:
+    from . import calendar_backend, calendar_window, metrics
+    from .http_client import credential_key, run_sync
+except ImportError:
+    import calendar_backend
+    import calendar_window
+    import metrics
+    from http_client import credential_key, run_sync
+
+# ============================================================
+#  CONFIGURATION
+# ============================================================
+
+ENABLED = os.environ.get("PROSWEET_WRITE_BEHIND", "0") == "1"
+JOURNAL_PATH = os.environ.get("PROSWEET_WRITE_JOURNAL",
+                              os.path.join(os.path.expanduser("~"), ".prosweet", "write_journal.sqlite3"))
+
+# Attempts before a write is parked as failed, and the backoff between them
+# (doubling from BACKOFF_BASE up to BACKOFF_MAX seconds, with jitter).
+MAX_ATTEMPTS = int(os.environ.get("PROSWEET_WRITE_ATTEMPTS", "8"))
+BACKOFF_BASE = float(os.environ.get("PROSWEET_WRITE_BACKOFF", "1"))
+BACKOFF_MAX = 300.0
+
+# Writes applied at once (never two for the same event).
+WORKERS = 4
+
+# Statuses worth another try later; anything else 4xx is final.
+_TRANSIENT = {408, 425, 429, 500, 502, 503, 504}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS writes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,        -- who applies it (the registered sender)
+    op TEXT NOT NULL,          -- create | update | delete
+    username TEXT NOT NULL,
+    credentials TEXT NOT NULL, -- credential_key() of the password it was queued with, never the password
+    uid TEXT NOT NULL,
+    payload TEXT NOT NULL,     -- JSON
+    state TEXT NOT NULL DEFAULT 'pending',   -- pending | failed | conflict
+    attempts INTEGER NOT NULL DEFAULT 0,
+    queued_at REAL NOT NULL,
+    next_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS writes_pending ON writes (state, kind, username, uid, id);
+"""
+
+
+# ============================================================
+#  JOURNAL
+# ============================================================
+
+class Journal:
+    """
+    The queue itself: one row per write not yet applied. Rows are deleted
+    once applied, so the table only ever holds pending and failed writes.
+    WAL mode with synchronous=NORMAL: a committed append survives a crash
+    of the process (not necessarily of the machine).
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or JOURNAL_PATH
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        if "credentials" not in {row[1] for row in self._db.execute("PRAGMA table_info(writes)")}:
+            # A journal from before fingerprints: its writes cannot be tied to credentials, so they are parked.
+            self._db.execute("ALTER TABLE writes ADD COLUMN credentials TEXT NOT NULL DEFAULT ''")
+            self._db.execute("UPDATE writes SET state = 'failed', last_error = 'queued without credentials'")
+        self._lock = threading.Lock()
+
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def append(self, kind: str, op: str, username: str, credentials: str, uid: str, payload: dict) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO writes (kind, op, username, credentials, uid, payload, queued_at, next_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, op, username, credentials, uid, json.dumps(payload), now, now))
+            return cursor.lastrowid
+
+    @staticmethod
+    def _runnable(credentials, kinds) -> tuple:
+        keys, senders = ",".join("?" * len(credentials)), ",".join("?" * len(kinds))
+        return f"credentials IN ({keys}) AND kind IN ({senders})", (*credentials, *kinds)
+
+    def due(self, now: float, credentials, kinds, limit: int) -> list:
+        """
+        The oldest pending write of each event, if it is due and can run here
+        (the credentials it was queued with are known and its kind has a sender).
+        """
+        if not credentials or not kinds:
+            return []
+        where, params = self._runnable(credentials, kinds)
+        rows = self._execute(
+            "SELECT id, kind, op, username, credentials, uid, payload, attempts, queued_at FROM writes "
+            "WHERE id IN (SELECT MIN(id) FROM writes WHERE state = 'pending' GROUP BY kind, username, uid) "
+            f"AND next_at <= ? AND {where} ORDER BY id LIMIT ?",
+            (now, *params, limit))
+        return [{"id": r[0], "kind": r[1], "op": r[2], "username": r[3], "credentials": r[4], "uid": r[5],
+                 "payload": json.loads(r[6]), "attempts": r[7], "queued_at": r[8]} for r in rows]
+
+    def next_due(self, credentials, kinds):
+        if not credentials or not kinds:
+            return None
+        where, params = self._runnable(credentials, kinds)
+        return self._execute(f"SELECT MIN(next_at) FROM writes WHERE state = 'pending' AND {where}", params)[0][0]
+
+    def done(self, write_id: int):
+        self._execute("DELETE FROM writes WHERE id = ?", (write_id,))
+
+    def retry_later(self, write_id: int, attempts: int, error: str):
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1)) * (0.5 + random.random())
+        self._execute("UPDATE writes SET attempts = ?, next_at = ?, last_error = ? WHERE id = ?",
+                      (attempts, time.time() + delay, error, write_id))
+
+    def park(self, write_id: int, attempts: int, state: str, error: str):
+        """Stop retrying a write: `failed`, or `conflict` when the event changed on the server."""
+        self._execute("UPDATE writes SET state = ?, attempts = ?, last_error = ? WHERE id = ?",
+                      (state, attempts, error, write_id))
+
+    def requeue(self, write_id: int = None) -> int:
+        """Put parked writes (one, or all) back in the queue."""
+        where, params = ("AND id = ?", (write_id,)) if write_id is not None else ("", ())
+        with self._lock:
+            return self._db.execute(f"UPDATE writes SET state = 'pending', attempts = 0, next_at = ? "
+                                    f"WHERE state != 'pending' {where}", (time.time(), *params)).rowcount
+
+    def parked(self) -> list:
+        rows = self._execute("SELECT id, kind, op, username, uid, state, attempts, last_error FROM writes "
+                             "WHERE state != 'pending' ORDER BY id")
+        return [dict(zip(("id", "kind", "op", "username", "uid", "state", "attempts", "last_error"), r))
+                for r in rows]
+
+    def stats(self) -> dict:
+        """`depth` writes waiting, `lag_seconds` since the oldest of them was queued, `failed` parked."""
+        (depth, oldest), = self._execute("SELECT COUNT(*), MIN(queued_at) FROM writes WHERE state = 'pending'")
+        (failed,), = self._execute("SELECT COUNT(*) FROM writes WHERE state != 'pending'")
+        return {"depth": depth, "lag_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+                "failed": failed}
+
+
+# ============================================================
+#  SENDERS
+# ============================================================
+
+# kind -> (send, applied). `send(username, password, op, uid, payload)` is a
+# coroutine performing the write and returning the httpx.Response;
+# `applied(username, op, uid, payload, response)` updates local caches.
+_senders = {}
+
+
+def register(kind: str, send, applied=None):
+    _senders[kind] = (send, applied)
+
+
+def register_backend(kind: str, backend, applied=None):
+    """
+    Register the sender for writes through a calendar_backend backend
+    (`backend()` is called when sending, so the agent can swap it). Creates
+    carry the UID chosen when queueing, so a retried create cannot make a
+    second event.
+    """
+    async def send(username, password, op, uid, payload):
+        target = backend()
+        if op == "create":
+            return await target.create_event(username, password, payload, uid)
+        if op == "delete":
+            return await target.delete_event(username, password, uid)
+        response = await target.update_event(username, password, uid, payload,
+                                             calendar_window.cached_etag(username, uid))
+        if response.status_code == 412:
+            calendar_window.forget_etag(username, uid)
+        return response
+
+    def remember(username, op, uid, payload, response):
+        if op == "delete":
+            calendar_window.forget_etag(username, uid)
+        else:
+            body = response.json() if response.content else {}
+            calendar_window.remember_etags(username, [{**(body.get("created") or body.get("updated") or {}),
+                                                       "uid": uid}])
+        if applied:
+            applied(username, op, uid, payload, response)
+
+    register(kind, send, remember)
+
+
+def register_gateway(kind: str, base_url, applied=None):
+    """register_backend() for the Hono gateway's REST API at `base_url()`."""
+    register_backend(kind, lambda: calendar_backend.GatewayBackend(base_url), applied)
+
+
+def _outcome(op: str, attempts: int, response) -> str:
+    status = response.status_code
+    if 200 <= status < 300 or (op == "delete" and status in (404, 410)):
+        return "done"
+    if status in (409, 412):
+        # A create carries the UID we picked, so after a lost response the retry finds it already there
+        return "done" if op == "create" and attempts > 1 else "conflict"
+    if status in _TRANSIENT:
+        return "retry"
+    return "failed"
+
+
+# ============================================================
+#  WORKER
+# ============================================================
+
+_journal = None
+_credentials = {}  # credential_key -> (username, password), in memory only
+_worker = None
+_wakeup = None
+_state_lock = threading.Lock()
+
+
+def journal() -> Journal:
+    global _journal
+    with _state_lock:
+        if _journal is None:
+            _journal = Journal()
+        return _journal
+
+
+async def _apply(write: dict):
+    import httpx  # imported on first use, see http_client._new_async_client()
+
+    send, applied = _senders[write["kind"]]
+    attempts = write["attempts"] + 1
+    username, op, uid = write["username"], write["op"], write["uid"]
+    try:
+        response = await send(username, _credentials[write["credentials"]][1], op, uid, write["payload"])
+        outcome, error = _outcome(op, attempts, response), f"HTTP {response.status_code}"
+    except httpx.HTTPError as e:
+        response, outcome, error = None, "retry", f"{type(e).__name__}: {e}"
+
+    if outcome == "done":
+        journal().done(write["id"])
+        if applied:
+            applied(username, op, uid, write["payload"], response)
+        metrics.observe("write_behind_lag_seconds", time.time() - write["queued_at"])
+    elif outcome == "retry" and attempts < MAX_ATTEMPTS:
+        journal().retry_later(write["id"], attempts, error)
+    else:
+        state = "conflict" if outcome == "conflict" else "failed"
+        journal().park(write["id"], attempts, state, error)
+        print(f"⚠️ Queued {op} of {uid} gave up ({state}: {error}); see `python write_behind.py`.")
+    metrics.inc("write_behind_total", kind=write["kind"], op=op, outcome=outcome)
+
+
+async def _work():
+    while True:
+        keys, kinds = tuple(_credentials), tuple(_senders)
+        batch = journal().due(time.time(), keys, kinds, WORKERS)
+        if batch:
+            await asyncio.gather(*(_apply(write) for write in batch))
+            continue
+        _wakeup.clear()
+        next_at = journal().next_due(keys, kinds)
+        timeout = 60.0 if next_at is None else max(next_at - time.time(), 0.01)
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _ensure_worker():
+    """Start the worker on the running loop unless it is already running."""
+    global _worker, _wakeup
+    if _worker is None or _worker.done():
+        _wakeup = asyncio.Event()
+        _worker = asyncio.get_running_loop().create_task(_work())
+    _wakeup.set()
+
+
+async def _start():
+    _ensure_worker()
+
+
+def login(username: str, password: str):
+    """
+    Make the writes queued with these credentials runnable. Call it only
+    once the calendar server accepted them (the agents do after a listing).
+    Passwords are never written to the journal, so after a restart a user's
+    writes wait until they are seen again.
+    """
+    _credentials[credential_key(username, password)] = (username, password)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        run_sync(_start())  # from synchronous code: run on the shared background loop
+        return
+    _ensure_worker()
+
+
+def enqueue(kind: str, op: str, username: str, password: str, uid: str, payload: dict = None) -> dict:
+    """Journal one write and return at once; the worker applies it in the background."""
+    write_id = journal().append(kind, op, username, credential_key(username, password), uid, payload or {})
+    metrics.inc("write_behind_queued_total", kind=kind, op=op)
+    print(f"📥 Queued {op} of {uid} (#{write_id}).")
+    login(username, password)
+    return {"status": "queued", "id": write_id, "uid": uid}
+
+
+def stats() -> dict:
+    return journal().stats()
+
+
+async def drain(timeout: float = 30.0) -> dict:
+    """Wait (on the worker's loop) until nothing runnable is left or `timeout` passes; returns stats()."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if not journal().due(float("inf"), tuple(_credentials), tuple(_senders), 1):
+            break
+        await asyncio.sleep(0.01)
+    return stats()
+
+
+# ============================================================
+#  INSPECTION
+# ============================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the write-behind journal.")
+    parser.add_argument("--journal", default=JOURNAL_PATH)
+    parser.add_argument("--retry", metavar="ID|all", help="put failed writes back in the queue")
+    args = parser.parse_args(argv)
+
+    queue = Journal(args.journal)
+    if args.retry:
+        count = queue.requeue(None if args.retry == "all" else int(args.retry))
+        print(f"🔁 {count} write(s) queued again; they run the next time their user is seen.")
+    info = queue.stats()
+    print(f"📒 {args.journal}: {info['depth']} pending, oldest {info['lag_seconds']:.1f} s ago, "
+          f"{info['failed']} failed")
+    for write in queue.parked():
+        print(f"  #{write['id']} {write['kind']} {write['op']} {write['uid']} ({write['username']}): "
+              f"{write['state']} after {write['attempts']} attempt(s), {write['last_error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+import sys
+import time
+
+import pytest
+
+# The agents import each other as top-level modules, as they do when run from test/;
+# the benchmarks' fake gateway and Radicale (bench/common.py) double as test servers.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(ROOT, "test"), os.path.join(ROOT, "bench")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Tests start from empty replicas, never the user's on-disk store.
+os.environ.setdefault("PROSWEET_EVENT_STORE", "0")
+
+
+@pytest.fixture
+def local_tz(monkeypatch):
+    """Run the test with the process's local time zone set to `local_tz(name)`."""
+    def use(name: str):
+        monkeypatch.setenv("TZ", name)
+        time.tzset()
+
+    yield use
+    monkeypatch.undo()
+    time.tzset()
@@ -0,0 +1,49 @@
+import pytest
+
+from common import FakeServer, StubModel, load_agent, quiet, stub_response
+
+import agent_service
+import http_client
+
+
+@pytest.fixture
+def service():
+    agent = load_agent("event_agent")
+    with FakeServer("gateway") as server:
+        server.seed(3)
+        server.passwords = {"alice": "right"}
+        agent.API_BASE_URL = server.url
+        yield agent_service.AgentService(agent, lambda username: StubModel([stub_response(text="ok")] * 4))
+    http_client.close_all_sessions()
+
+
+def turn(service, password):
+    with quiet():
+        return http_client.run_sync(service.turn("alice", password, "what is on my calendar?"))
+
+
+def test_wrong_password_gets_401_and_leaves_the_users_state_alone(service):
+    assert turn(service, "right") == "ok"
+    state = service.users[http_client.credential_key("alice", "right")]
+
+    with pytest.raises(agent_service.HttpError) as refused:
+        turn(service, "wrong")
+
+    assert refused.value.status == 401
+    assert list(service.users.values()) == [state]
+    assert state.password == "right" and state.model.calls == 1
+
+
+def test_accepted_credentials_are_checked_once(service, monkeypatch):
+    checked = []
+    check = service.backend.check_credentials
+
+    async def counting(username, password):
+        checked.append(username)
+        return await check(username, password)
+
+    monkeypatch.setattr(service.backend, "check_credentials", counting)
+    turn(service, "right")
+    turn(service, "right")
+
+    assert checked == ["alice"]
@@ -0,0 +1,51 @@
+import pytest
+
+from common import FakeServer, StubModel, load_agent, quiet, stub_response
+
+import alarm_engine
+import http_client
+import model_turn
+
+QUESTION = "what reminders do I have today?"
+
+
+@pytest.fixture
+def agent():
+    agent = load_agent("alarm_agent")
+    alarm_engine._indexes.clear()
+    with FakeServer("gateway") as server:
+        server.passwords = {"alice": "right"}
+        agent.API_BASE_URL = server.url
+        agent.server = server
+        yield agent
+    http_client.close_all_sessions()
+    alarm_engine._indexes.clear()
+
+
+def ask(agent, password, prompt=QUESTION):
+    model = StubModel([stub_response(text="ok")])
+    with quiet():
+        return http_client.run_sync(agent.ask_gemini_async("alice", password, model, prompt)), model
+
+
+def test_reminder_question_is_answered_from_the_index_only_for_the_same_credentials(agent):
+    listed, _ = ask(agent, "right")
+    agent.server.reset_counters()
+
+    again, _ = ask(agent, "right")
+    assert again == listed
+    assert agent.server.requests == 0  # from the index
+
+    wrong, model = ask(agent, "wrong")
+    assert wrong == model_turn.FETCH_FAILED
+    assert agent.server.requests == 1 and model.calls == 0
+
+
+def test_failed_listing_is_an_error_not_a_stale_answer(agent):
+    ask(agent, "right")
+    agent.server.passwords["alice"] = "changed"
+
+    answer, _ = ask(agent, "right", "what reminders do I have on 2031-03-03?")
+
+    assert answer == model_turn.FETCH_FAILED
+    assert http_client.credential_key("alice", "right") not in alarm_engine._indexes
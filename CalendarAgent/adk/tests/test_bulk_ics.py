@@ -0,0 +1,57 @@
+import bulk_ics
+
+CALENDAR = """BEGIN:VCALENDAR
+VERSION:2.0
+PRODID:-//Test//EN
+BEGIN:VEVENT
+UID:weekly
+DTSTART;TZID=Europe/Paris:20300107T090000
+RRULE:FREQ=WEEKLY
+SUMMARY:Standup
+END:VEVENT
+BEGIN:VEVENT
+UID:once
+DTSTART:20300108T090000Z
+SUMMARY:Dentist
+END:VEVENT
+BEGIN:VEVENT
+UID:weekly
+RECURRENCE-ID;TZID=Europe/Paris:20300114T090000
+DTSTART;TZID=Europe/Paris:20300114T100000
+SUMMARY:Standup (late)
+END:VEVENT
+BEGIN:VTIMEZONE
+TZID:Europe/Paris
+BEGIN:STANDARD
+DTSTART:19701025T030000
+TZOFFSETFROM:+0200
+TZOFFSETTO:+0100
+END:STANDARD
+END:VTIMEZONE
+END:VCALENDAR
+""".splitlines(keepends=True)
+
+
+def resources():
+    return dict(bulk_ics.split_resources(lambda: iter(CALENDAR)))
+
+
+def test_overrides_further_down_join_their_master():
+    weekly = resources()["weekly"]
+    assert weekly.count("BEGIN:VEVENT") == 2
+    assert "SUMMARY:Standup (late)" in weekly
+
+
+def test_timezones_defined_after_their_events_are_included():
+    found = resources()
+    assert "TZID:Europe/Paris" in found["weekly"]
+    assert "BEGIN:VTIMEZONE" not in found["once"]
+    assert found["once"].startswith("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Test//EN\r\n")
+
+
+def test_events_without_a_uid_get_the_same_one_on_every_run():
+    lines = ["BEGIN:VCALENDAR\n", "BEGIN:VEVENT\n", "SUMMARY:No uid\n", "END:VEVENT\n", "END:VCALENDAR\n"]
+    first = list(bulk_ics.split_resources(lambda: iter(lines)))
+    assert len(first) == 1
+    assert first == list(bulk_ics.split_resources(lambda: iter(lines)))
+    assert f"UID:{first[0][0]}" in first[0][1]
@@ -0,0 +1,186 @@
+import datetime as dt
+
+import pytest
+
+from common import FakeServer, event_ics, quiet
+
+import caldav_sync
+import event_store
+import http_client
+
+
+@pytest.fixture
+def server():
+    with FakeServer("caldav") as server:
+        server.seed(5)
+        yield server
+    http_client.close_all_sessions()
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """The hrefs of every calendar-multiget, one list per sync."""
+    calls = []
+    multiget = caldav_sync._multiget
+
+    async def recording(client, replica, hrefs):
+        calls.append(sorted(hrefs))
+        return await multiget(client, replica, hrefs)
+
+    monkeypatch.setattr(caldav_sync, "_multiget", recording)
+    return calls
+
+
+def run(coro):
+    with quiet():
+        return http_client.run_sync(coro)
+
+
+def client(server):
+    return http_client.get_async_client(server.url, "alice", "pw")
+
+
+def sync(server, replica):
+    async def go():
+        return await caldav_sync.sync_replica(client(server), replica, 0)
+    return run(go())
+
+
+def touch(server, uid, summary="Touched"):
+    server.store[uid] = (f'"{summary}-{uid}"', {}, event_ics(uid, summary, "20250101T090000Z", "20250101T100000Z"))
+    server.version += 1
+    server.changes.append((server.version, uid))
+
+
+def remove(server, uid):
+    del server.store[uid]
+    server.version += 1
+    server.changes.append((server.version, uid))
+
+
+def summaries(events):
+    return sorted(event["summary"] for event in events)
+
+
+def replica_of(server):
+    return caldav_sync.CalendarReplica(f"{server.url}/alice/calendar/")
+
+
+def test_sync_downloads_only_what_changed(server, fetched):
+    replica = replica_of(server)
+    assert len(sync(server, replica)) == 5
+
+    touch(server, "seed-0000001")
+    remove(server, "seed-0000002")
+    events = sync(server, replica)
+
+    assert fetched[-1] == ["/alice/calendar/seed-0000001.ics"]
+    assert len(events) == 4 and "Touched" in summaries(events)
+    assert len(sync(server, replica)) == 4 and fetched[-1] == []
+
+
+def test_expired_sync_token_starts_over(server, fetched):
+    replica = replica_of(server)
+    sync(server, replica)
+    replica.sync_token = "http://fake/sync/999"  # newer than the server: refused with 403
+
+    assert len(sync(server, replica)) == 5
+    assert fetched[-1] == []  # the fresh listing's ETags all match what is held
+    assert replica.sync_token == f"http://fake/sync/{server.version}"
+
+
+def test_initial_listing_drops_what_the_server_no_longer_has(server):
+    replica = replica_of(server)
+    sync(server, replica)
+    remove(server, "seed-0000003")
+    replica.sync_token = None
+
+    assert len(sync(server, replica)) == 4
+    assert "/alice/calendar/seed-0000003.ics" not in replica.etags()
+
+
+def test_etag_comparison_when_sync_collection_is_refused(server, fetched, monkeypatch):
+    async def refused(client, replica):
+        return False
+
+    monkeypatch.setattr(caldav_sync, "_sync_collection", refused)
+    replica = replica_of(server)
+    assert len(sync(server, replica)) == 5
+
+    touch(server, "seed-0000004")
+    assert "Touched" in summaries(sync(server, replica))
+    assert fetched[-1] == ["/alice/calendar/seed-0000004.ics"]
+
+    assert len(sync(server, replica)) == 5 and len(fetched) == 2  # same CTag: nothing listed
+
+
+def test_own_writes_are_not_fetched_again(server, fetched):
+    replica = replica_of(server)
+    sync(server, replica)
+
+    touch(server, "seed-0000000", "Ours")
+    replica.apply_put("seed-0000000", server.store["seed-0000000"][0], {"uid": "seed-0000000", "summary": "Ours"})
+    sync(server, replica)
+
+    assert fetched[-1] == []
+
+
+def test_stored_replica_resumes_from_its_sync_token(server, fetched, tmp_path):
+    path = str(tmp_path / "calendar.sqlite3")
+    url = f"{server.url}/alice/calendar/"
+    sync(server, caldav_sync.StoredReplica(url, event_store.EventStore(path)))
+
+    touch(server, "seed-0000002")
+    reopened = caldav_sync.StoredReplica(url, event_store.EventStore(path))
+    assert reopened.warm
+    events = sync(server, reopened)
+
+    assert len(events) == 5 and "Touched" in summaries(events)
+    assert fetched[-1] == ["/alice/calendar/seed-0000002.ics"]
+
+
+def query(server, start, end):
+    async def go():
+        return await caldav_sync.query_range(client(server), f"{server.url}/alice/calendar/", start, end)
+    return run(go())
+
+
+def test_range_query_returns_only_overlapping_events_trimmed(server):
+    events = query(server, dt.datetime(2025, 1, 1, 8, 30), dt.datetime(2025, 1, 1, 10))
+
+    assert [event["uid"] for event in events] == ["seed-0000000", "seed-0000001"]
+    assert events[0]["summary"] == "Event 0" and events[0]["description"] is None  # not among RANGE_PROPS
+
+
+def test_range_query_reads_aware_bounds_as_utc(server):
+    paris = dt.timezone(dt.timedelta(hours=1))
+    events = query(server, dt.datetime(2025, 1, 1, 10, tzinfo=paris), dt.datetime(2025, 1, 1, 10, 30, tzinfo=paris))
+    assert [event["uid"] for event in events] == ["seed-0000001"]
+
+
+def test_refused_range_query_filters_the_replica(server, monkeypatch):
+    async def refused(client, collection_url, start, end, props=caldav_sync.RANGE_PROPS):
+        return None
+
+    monkeypatch.setattr(caldav_sync, "query_range", refused)
+    replica = replica_of(server)
+
+    async def go():
+        return await caldav_sync.events_between(client(server), replica, dt.datetime(2025, 1, 1, 8, 30),
+                                                dt.datetime(2025, 1, 1, 10))
+    events = run(go())
+
+    assert sorted(event["uid"] for event in events) == ["seed-0000000", "seed-0000001"]
+    assert replica.warm and len(replica.events()) == 5
+
+
+def test_overlap_rules():
+    def overlaps(start, end=None):
+        return caldav_sync._overlaps({"start_time": start, "end_time": end}, "20300101T090000Z", "20300101T100000Z")
+
+    assert overlaps("20300101T083000Z", "20300101T093000Z")
+    assert not overlaps("20300101T080000Z", "20300101T090000Z")  # ends as the window starts
+    assert not overlaps("20300101T100000Z", "20300101T110000Z")  # starts as it ends
+    assert overlaps("20300101T090000Z")                          # instantaneous, at the start
+    assert overlaps("20300101", "20300102")                      # all day
+    assert not overlaps(None)
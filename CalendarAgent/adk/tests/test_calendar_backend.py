@@ -0,0 +1,63 @@
+import pytest
+
+import calendar_backend
+import calendar_window
+from common import FakeServer
+from http_client import run_sync
+
+EVENT = {"summary": "Standup", "description": "", "start": "2026-10-19T10:00:00", "end": "2026-10-19T10:30:00"}
+
+
+@pytest.fixture
+def caldav():
+    with FakeServer("caldav") as server:
+        yield server, calendar_backend.CalDAVBackend(server.url)
+
+
+def test_update_without_etag_never_creates(caldav):
+    server, backend = caldav
+
+    response = run_sync(backend.update_event("u", "p", "missing", EVENT))
+
+    assert response.status_code == 404
+    assert response.json() == {"ok": False, "status": 404}
+    assert "missing" not in server.store
+
+
+def test_update_without_etag_changes_an_existing_event(caldav):
+    server, backend = caldav
+    created = run_sync(backend.create_event("u", "p", EVENT, "e1")).json()["created"]
+
+    response = run_sync(backend.update_event("u", "p", "e1", {**EVENT, "summary": "Moved"}))
+
+    assert response.json()["updated"]["uid"] == "e1"
+    assert response.json()["updated"]["etag"] != created["etag"]
+    assert "SUMMARY:Moved" in server.store["e1"][2]
+
+
+def test_update_with_a_stale_etag_is_412(caldav):
+    _, backend = caldav
+    run_sync(backend.create_event("u", "p", EVENT, "e1"))
+
+    response = run_sync(backend.update_event("u", "p", "e1", EVENT, etag='"stale"'))
+
+    assert response.json() == {"ok": False, "status": 412}
+
+
+def test_tool_times_naive_is_local_z_is_utc(local_tz):
+    local_tz("America/New_York")
+
+    assert calendar_backend.ical_time("2026-10-19T10:00:00") == "20261019T140000Z"
+    assert calendar_backend.ical_time("2026-10-19T10:00:00Z") == "20261019T100000Z"
+    assert calendar_backend.ical_time("2026-10-19T10:00:00+02:00") == "20261019T080000Z"
+    assert calendar_window.tool_time("2026-12-01T10:00:00").utcoffset().total_seconds() == -5 * 3600
+
+
+def test_agent_test_writes_tool_times_like_the_backend(local_tz):
+    from common import load_agent
+
+    agent = load_agent("agent_test")
+    local_tz("Europe/Berlin")
+
+    for value in ("2026-10-19T10:00:00", "2026-10-19T10:00:00Z"):
+        assert agent.to_ical_time(calendar_window.tool_time(value)) == calendar_backend.ical_time(value)
@@ -0,0 +1,63 @@
+import datetime as dt
+from types import SimpleNamespace
+
+import pytest
+
+import calendar_window
+
+TODAY = dt.date(2026, 10, 17)
+
+
+def days(text):
+    return calendar_window.mentioned_ranges(text, TODAY)
+
+
+@pytest.mark.parametrize("text, day", [
+    ("lunch on march 5", dt.date(2027, 3, 5)),
+    ("lunch on Mar. 5th", dt.date(2027, 3, 5)),
+    ("dinner dec 3, 2026", dt.date(2026, 12, 3)),
+    ("the 3rd of sept", dt.date(2026, 9, 3)),
+    ("call on 2026-11-02", dt.date(2026, 11, 2)),
+    ("call on 11/2", dt.date(2026, 11, 2)),
+])
+def test_explicit_dates(text, day):
+    assert days(text) == [(day, day)]
+
+
+@pytest.mark.parametrize("text", [
+    "schedule the marathon 5 and decide 3 things",
+    "junior 4 review",
+    "mayor 12 meeting",
+    "the octopus 8 exhibit",
+])
+def test_words_starting_like_a_month_are_not_dates(text):
+    assert days(text) == []
+
+
+def test_month_and_relative_ranges():
+    assert days("anything in november") == [(dt.date(2026, 11, 1), dt.date(2026, 11, 30))]
+    assert days("next week") == [(dt.date(2026, 10, 10), dt.date(2026, 10, 31))]
+
+
+def test_mentioned_day_cuts_the_mention():
+    assert calendar_window.mentioned_day("standup on tuesday", TODAY) == (dt.date(2026, 10, 20), "standup on")
+    assert calendar_window.mentioned_day("standup", TODAY) == (None, "standup")
+    assert calendar_window.mentioned_day("monday or tuesday", TODAY)[0] is None
+
+
+def test_range_args_orders_and_trims():
+    assert calendar_window.range_args({"start_date": "2026-12-31T00:00:00Z", "end_date": "2026-12-01"}) == \
+        (dt.date(2026, 12, 1), dt.date(2026, 12, 31))
+    with pytest.raises(ValueError):
+        calendar_window.range_args({"start_date": "next week", "end_date": "2026-12-01"})
+
+
+def test_requested_ranges_skips_unreadable_calls():
+    calls = [SimpleNamespace(name="get_events_in_range", args={"start_date": "soon", "end_date": "later"}),
+             SimpleNamespace(name="create_event", args={"start_date": "2026-01-01"}),
+             SimpleNamespace(name="get_events_in_range", args={"start_date": "2026-12-01"}),
+             SimpleNamespace(name="get_events_in_range", args={"start_date": "2027-01-01", "end_date": "2027-01-05"})]
+
+    ranges = calendar_window.requested_ranges(calls, lambda name, args: args)
+
+    assert ranges == [(dt.date(2027, 1, 1), dt.date(2027, 1, 5))]
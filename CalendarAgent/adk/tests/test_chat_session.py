@@ -0,0 +1,74 @@
+import datetime as dt
+import json
+
+import pytest
+
+from common import FakeServer, StubModel, load_agent, quiet, stub_response
+
+import chat_session
+import http_client
+import model_turn
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(chat_session, "ENABLED", True)
+    chat_session._sessions.clear()
+    agent = load_agent("event_agent")
+    with FakeServer("gateway") as server:
+        server.seed(3)
+        server.passwords = {"alice": "right"}
+        agent.API_BASE_URL = server.url
+        agent.server = server
+        yield agent
+    http_client.close_all_sessions()
+    chat_session._sessions.clear()
+
+
+def ask(agent, password, model, prompt="what is on my calendar?"):
+    with quiet():
+        return http_client.run_sync(agent.ask_gemini_async("alice", password, model, prompt))
+
+
+def test_wrong_password_neither_resumes_nor_ends_the_users_chat(agent):
+    model = StubModel([stub_response(text="Three events.")])
+    ask(agent, "right", model)
+
+    assert ask(agent, "wrong", model) == model_turn.FETCH_FAILED
+
+    assert model.chats == 1 and model.calls == 1
+    assert list(chat_session._sessions) == [("event_agent", http_client.credential_key("alice", "right"))]
+
+
+def test_refused_credentials_end_their_chat(agent):
+    ask(agent, "right", StubModel([stub_response(text="ok")]))
+    agent.server.passwords["alice"] = "changed"
+
+    assert ask(agent, "right", StubModel([stub_response(text="ok")])) == model_turn.FETCH_FAILED
+    assert not chat_session._sessions
+
+
+def test_failed_range_listing_is_not_sent_as_deletions(agent, monkeypatch):
+    today = dt.date.today()
+    agent.server.store.clear()
+    agent.server.seed(3, start=today)
+    model = StubModel([
+        stub_response(text="Three events."),
+        stub_response([("get_events_in_range", {"start_date": today.isoformat(), "end_date": today.isoformat()})]),
+        stub_response(text="I could not look there."),
+    ])
+    ask(agent, "right", model)
+
+    listing = agent.get_all_calendar_items_async
+
+    async def range_fails(username, password, window=None):
+        if window is not None and window[1] - window[0] <= dt.timedelta(days=1):
+            return None
+        return await listing(username, password, window)
+
+    monkeypatch.setattr(agent, "get_all_calendar_items_async", range_fails)
+    ask(agent, "right", model, "look again at Event 1")
+
+    answer = json.dumps(model.prompts[-1], default=str)
+    assert "those dates could not be listed" in answer
+    assert "deleted" not in answer
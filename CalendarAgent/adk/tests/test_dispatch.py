@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import dispatch
+import function_args
+
+ARGS = function_args.ArgDecoder([{"name": "update_alarm", "parameters": {"type": "object", "properties": {
+    "event_uid": {"type": "string"},
+    "alarms": {"type": "array", "items": {"type": "object"}},
+}}}])
+
+
+def call(name, **args):
+    return SimpleNamespace(name=name, args=args)
+
+
+def run(calls, handlers, decode=None, limit=None):
+    return asyncio.run(dispatch.run_calls(calls, handlers, decode, limit))
+
+
+async def ok(**args):
+    return {"ok": args}
+
+
+async def boom(**args):
+    raise RuntimeError("server said no")
+
+
+def test_results_in_issue_order():
+    calls = [call("a", event_uid="1"), call("b", event_uid="2"), call("a", event_uid="3")]
+
+    results = run(calls, {"a": ok, "b": ok})
+
+    assert [(name, args["event_uid"]) for name, args, _ in results] == [("a", "1"), ("b", "2"), ("a", "3")]
+    assert all(result for _, _, result in results)
+
+
+def test_failures_do_not_cancel_the_others():
+    calls = [call("a", n=1), call("b", n=2), call("missing", n=3), call("a", n=4)]
+
+    results = run(calls, {"a": ok, "b": boom})
+
+    assert [result is not None for _, _, result in results] == [True, False, False, True]
+
+
+def test_unreadable_arguments_fail_alone():
+    def decode(name, args):
+        if args.get("bad"):
+            raise ValueError("cannot decode")
+        return ARGS.decode(name, args)
+
+    calls = [call("update_alarm", event_uid="1", alarms=5), call("update_alarm", bad=True),
+             call("update_alarm", event_uid="2", alarms=[{"action": "AUDIO"}])]
+
+    results = run(calls, {"update_alarm": ok}, decode)
+
+    assert [r for _, _, r in results] == [{"ok": {"event_uid": "1", "alarms": []}}, None,
+                                          {"ok": {"event_uid": "2", "alarms": [{"action": "AUDIO"}]}}]
+    assert results[1][:2] == ("update_alarm", {})
+
+
+def test_same_uid_runs_in_order_other_uids_overlap():
+    log = []
+
+    async def step(event_uid, n):
+        log.append(("start", event_uid, n))
+        await asyncio.sleep(0.01)
+        log.append(("end", event_uid, n))
+        return True
+
+    run([call("s", event_uid="x", n=1), call("s", event_uid="x", n=2), call("s", event_uid="y", n=3)],
+        {"s": step})
+
+    assert log.index(("end", "x", 1)) < log.index(("start", "x", 2))
+    assert log.index(("start", "y", 3)) < log.index(("end", "x", 1))
+
+
+def test_runner_skips_a_repeated_write_on_the_same_uid():
+    async def rounds():
+        runner = dispatch.CallRunner({"update": ok, "create": ok})
+        runner.start(call("update", event_uid="1", start="09:00"))
+        runner.start(call("create", summary="x"))
+        first = await runner.drain()
+        runner.start(call("update", event_uid="1", start="09:00:00"))  # reworded, same target
+        runner.start(call("create", summary="x"))
+        runner.start(call("update", event_uid="2", start="09:00"))
+        return first, await runner.drain()
+
+    first, second = asyncio.run(rounds())
+
+    assert len(first) == 2
+    assert [(name, args.get("event_uid")) for name, args, _ in second] == [("update", "2")]
@@ -0,0 +1,47 @@
+import pytest
+
+from common import FakeServer, load_agent, quiet
+
+import event_index
+import http_client
+
+
+@pytest.fixture
+def server():
+    event_index._indexes.clear()
+    with FakeServer("gateway") as server:
+        server.seed(3)
+        server.passwords = {"alice": "right"}
+        yield server
+    http_client.close_all_sessions()
+    event_index._indexes.clear()
+
+
+def fetch(agent, password):
+    with quiet():
+        return http_client.run_sync(agent.get_all_calendar_items_async("alice", password))
+
+
+def test_index_is_kept_per_credentials(server):
+    agent = load_agent("event_agent")
+    agent.API_BASE_URL = server.url
+
+    fetch(agent, "right")
+    fetch(agent, "wrong")
+
+    right = http_client.credential_key("alice", "right")
+    wrong = http_client.credential_key("alice", "wrong")
+    assert len(event_index.index_for(right)) == 3
+    assert wrong not in event_index._indexes
+    assert event_index.index_for(wrong).search("Event 1", 3) == []
+
+
+def test_refused_credentials_drop_their_index(server):
+    agent = load_agent("event_agent")
+    agent.API_BASE_URL = server.url
+    fetch(agent, "right")
+
+    server.passwords["alice"] = "changed"
+    fetch(agent, "right")
+
+    assert http_client.credential_key("alice", "right") not in event_index._indexes
@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+
+import event_store
+
+
+def event(uid, start, end=None, summary="Event"):
+    return {"uid": uid, "summary": summary, "description": None, "start_time": start, "end_time": end,
+            "rrule": None}
+
+
+@pytest.fixture
+def store():
+    return event_store.EventStore(":memory:")
+
+
+def uids(events):
+    return [e["uid"] for e in events]
+
+
+def test_epoch_reads_compact_times():
+    assert event_store.epoch("19700102") == 86400
+    assert event_store.epoch("19700101T010000Z") == 3600
+    assert event_store.epoch("19700101T010000") == 3600  # floating times as UTC
+    assert event_store.epoch(None) is None and event_store.epoch("soon") is None
+
+
+def test_put_many_replaces_what_a_resource_held(store):
+    store.put_many([("/c/a.ics", '"1"', [event("a", "20300101T090000Z", "20300101T100000Z")])])
+    store.put_many([("/c/a.ics", '"2"', [event("a", "20300102T090000Z", "20300102T100000Z", "Moved")])])
+
+    assert len(store) == 1 and store.etag("/c/a.ics") == '"2"'
+    assert [(e["summary"], e["start_time"]) for e in store.events()] == [("Moved", "20300102T090000Z")]
+
+
+def test_overrides_share_their_resource(store):
+    store.put_many([("/c/weekly.ics", '"1"', [event("weekly", "20300107T090000Z", "20300107T100000Z"),
+                                               event("weekly", "20300114T100000Z", "20300114T110000Z")])])
+    assert len(store.by_uid("weekly")) == 2
+
+    store.delete_many(["/c/weekly.ics"])
+    assert store.by_uid("weekly") == [] and len(store) == 0 and store.etags() == {}
+
+
+def test_between_finds_events_overlapping_the_window(store):
+    store.put_many([
+        ("/c/before.ics", None, [event("before", "20300101T080000Z", "20300101T090000Z")]),
+        ("/c/overlaps.ics", None, [event("overlaps", "20300101T083000Z", "20300101T093000Z")]),
+        ("/c/inside.ics", None, [event("inside", "20300101T100000Z", "20300101T110000Z")]),
+        ("/c/instant.ics", None, [event("instant", "20300101T090000Z")]),
+        ("/c/after.ics", None, [event("after", "20300101T120000Z", "20300101T130000Z")]),
+    ])
+    assert uids(store.between("20300101T090000Z", "20300101T120000Z")) == ["overlaps", "instant", "inside"]
+
+
+def test_between_reaches_back_for_the_longest_event(store):
+    store.put_many([
+        ("/c/trip.ics", None, [event("trip", "20300101", "20300111")]),
+        ("/c/short.ics", None, [event("short", "20300105T090000Z", "20300105T100000Z")]),
+    ])
+    assert uids(store.between("20300108T000000Z", "20300109T000000Z")) == ["trip"]
+    assert uids(store.between("20300105T000000Z", "20300106T000000Z")) == ["trip", "short"]
+
+
+def test_sync_state_and_longest_survive_a_reopen(tmp_path):
+    path = str(tmp_path / "events.sqlite3")
+    first = event_store.EventStore(path)
+    first.put_many([("/c/trip.ics", '"1"', [event("trip", "20300101", "20300111")])])
+    first.set_meta(sync_token="token-1", ctag="ctag-1")
+
+    reopened = event_store.EventStore(path)
+    assert reopened.get_meta("sync_token") == "token-1" and reopened.get_meta("ctag") == "ctag-1"
+    assert reopened.etags() == {"/c/trip.ics": '"1"'}
+    assert uids(reopened.between("20300110T000000Z", "20300110T010000Z")) == ["trip"]
+
+
+def test_store_from_before_rrule_is_resynced(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    db = sqlite3.connect(path)
+    db.executescript(event_store._SCHEMA.replace("    rrule TEXT,\n", ""))
+    db.execute("INSERT INTO resources VALUES ('/c/a.ics', '\"1\"')")
+    db.execute("INSERT INTO meta VALUES ('sync_token', 'old')")
+    db.commit()
+    db.close()
+
+    store = event_store.EventStore(path)
+    assert len(store) == 0 and store.get_meta("sync_token") is None
+    store.put_many([("/c/a.ics", '"2"', [{**event("a", "20300101T090000Z"), "rrule": "FREQ=DAILY"}])])
+    assert store.by_uid("a")[0]["rrule"] == "FREQ=DAILY"
@@ -0,0 +1,74 @@
+import datetime as dt
+
+import pytest
+
+import free_busy
+
+MONDAY = dt.date(2030, 1, 7)  # far enough ahead that no slot is in the past
+HOURS = (dt.time(9), dt.time(17))
+
+
+def at(hour, minute=0, day=MONDAY):
+    return dt.datetime.combine(day, dt.time(hour, minute)).timestamp()
+
+
+def event(uid, start, end, **extra):
+    return {"uid": uid, "summary": uid, "start": start, "end": end, **extra}
+
+
+@pytest.fixture
+def index(local_tz):
+    local_tz("America/New_York")
+    return free_busy.BusyIndex([
+        event("standup", "2030-01-07T09:00:00", "2030-01-07T09:30:00"),
+        event("long", "2030-01-07T10:00:00", "2030-01-07T13:00:00"),
+        event("inside", "2030-01-07T11:00:00", "2030-01-07T11:30:00"),
+        event("utc", "2030-01-07T20:00:00.000Z", "2030-01-07T21:00:00.000Z"),  # 15:00-16:00 local
+        event("holiday", "2030-01-07", "2030-01-08", allDay=True),
+    ])
+
+
+def test_conflicts_find_every_overlap(index):
+    assert [e["uid"] for e in index.conflicts(at(9, 15), at(11, 15))] == ["standup", "long", "inside"]
+    assert [e["uid"] for e in index.conflicts(at(12), at(12, 30))] == ["long"]  # long outlasts a later start
+    assert [e["uid"] for e in index.conflicts(at(15, 30), at(15, 45))] == ["utc"]
+
+
+def test_touching_intervals_do_not_conflict(index):
+    assert index.conflicts(at(9, 30), at(10)) == []
+    assert index.is_free(at(9, 30), at(10))
+    assert not index.is_free(at(9, 29), at(10))
+
+
+def test_all_day_events_do_not_block_time(index):
+    assert len(index) == 4
+    assert index.is_free(at(13), at(15))
+
+
+def test_free_slots_within_working_hours(index):
+    slots = index.free_slots(dt.timedelta(minutes=45), MONDAY, MONDAY + dt.timedelta(days=1), count=5, hours=HOURS)
+
+    # one slot per free gap: 09:30-10:00 is too short, then 13:00-15:00, 16:00-17:00 and all of Tuesday
+    assert slots == [
+        (dt.datetime(2030, 1, 7, 13), dt.datetime(2030, 1, 7, 13, 45)),
+        (dt.datetime(2030, 1, 7, 16), dt.datetime(2030, 1, 7, 16, 45)),
+        (dt.datetime(2030, 1, 8, 9), dt.datetime(2030, 1, 8, 9, 45)),
+    ]
+    assert index.free_slots(dt.timedelta(hours=3), MONDAY, MONDAY, hours=HOURS) == []
+
+
+def test_recurring_events_block_every_occurrence(local_tz):
+    local_tz("UTC")
+    index = free_busy.BusyIndex([event("daily", "2030-01-07T12:00:00", "2030-01-07T13:00:00", rrule="FREQ=DAILY;COUNT=3")],
+                                free_busy.span_for(MONDAY, MONDAY + dt.timedelta(days=6)))
+
+    assert len(index) == 3
+    assert not index.is_free(at(12, 30, MONDAY + dt.timedelta(days=2)), at(12, 45, MONDAY + dt.timedelta(days=2)))
+    assert index.is_free(at(12, 30, MONDAY + dt.timedelta(days=3)), at(12, 45, MONDAY + dt.timedelta(days=3)))
+
+
+def test_describe_slots():
+    slots = [(dt.datetime(2030, 1, 7, 13), dt.datetime(2030, 1, 7, 13, 45))]
+
+    assert free_busy.describe_slots(slots) == "2030-01-07T13:00:00 to 2030-01-07T13:45:00 (Mon)"
+    assert free_busy.describe_slots([]) == "No free slot of that length in those days."
@@ -0,0 +1,49 @@
+import pytest
+
+import function_args
+
+SCHEMAS = [{
+    "name": "update_alarm",
+    "parameters": {"type": "object", "properties": {
+        "event_uid": {"type": "string"},
+        "minutes": {"type": "integer"},
+        "alarms": {"type": "array", "items": {"type": "object", "properties": {
+            "action": {"type": "string"}, "trigger": {"type": "string"}}}},
+    }},
+}]
+
+ARGS = function_args.ArgDecoder(SCHEMAS)
+
+
+def test_types_follow_the_schema():
+    args = ARGS.decode("update_alarm", {"event_uid": 42.0, "minutes": "15", "extra": "dropped",
+                                        "alarms": [{"action": "DISPLAY", "trigger": "-PT15M", "x": 1}]})
+
+    assert args == {"event_uid": "42", "minutes": 15, "alarms": [{"action": "DISPLAY", "trigger": "-PT15M"}]}
+
+
+@pytest.mark.parametrize("alarms, expected", [
+    (5, []),
+    (None, []),
+    (True, []),
+    ("not a list", []),
+    ("[{\"action\": \"AUDIO\"}]", [{"action": "AUDIO"}]),
+    ({"action": "AUDIO"}, [{"action": "AUDIO"}]),
+])
+def test_array_tolerates_what_the_model_sends(alarms, expected):
+    assert ARGS.decode("update_alarm", {"alarms": alarms})["alarms"] == expected
+
+
+def test_protobuf_struct_args():
+    struct_pb2 = pytest.importorskip("google.protobuf.struct_pb2")
+    struct = struct_pb2.Struct()
+    struct.update({"event_uid": "u1", "minutes": 30, "alarms": [{"action": "DISPLAY"}]})
+
+    args = ARGS.decode("update_alarm", struct.fields)
+
+    assert args == {"event_uid": "u1", "minutes": 30, "alarms": [{"action": "DISPLAY"}]}
+
+
+def test_unknown_function_gets_plain_args():
+    assert ARGS.decode("nope", {"a": [1, {"b": 2}]}) == {"a": [1, {"b": 2}]}
+    assert ARGS.decode("nope", None) == {}
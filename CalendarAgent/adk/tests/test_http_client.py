@@ -0,0 +1,66 @@
+import http_client
+
+
+def test_unpooled_session_is_closed_after_the_block(monkeypatch):
+    monkeypatch.setattr(http_client, "POOL_ENABLED", False)
+    closed = []
+
+    with http_client.session("http://localhost:1", "u", "p") as session:
+        monkeypatch.setattr(session, "close", lambda: closed.append(session))
+        assert session.headers["Authorization"] == http_client.basic_auth_header("u", "p")
+
+    assert closed == [session]
+    assert not http_client._sessions
+
+
+def test_pooled_session_is_shared_and_kept_open(monkeypatch):
+    monkeypatch.setattr(http_client, "POOL_ENABLED", True)
+    try:
+        with http_client.session("http://localhost:1/", "u", "p") as first:
+            pass
+        with http_client.session("http://localhost:1", "u", "p") as second:
+            pass
+
+        assert first is second
+        assert http_client.pool_stats() == {"u@http://localhost:1": 0}
+    finally:
+        http_client.close_all_sessions()
+
+
+def test_another_password_gets_its_own_session_and_client(monkeypatch):
+    monkeypatch.setattr(http_client, "POOL_ENABLED", True)
+
+    async def clients():
+        return (http_client.get_async_client("http://localhost:1", "u", "p"),
+                http_client.get_async_client("http://localhost:1", "u", "wrong"))
+
+    try:
+        right = http_client.get_session("http://localhost:1", "u", "p")
+        wrong = http_client.get_session("http://localhost:1", "u", "wrong")
+        right_client, wrong_client = http_client.run_sync(clients())
+
+        assert right is not wrong and right_client is not wrong_client
+        assert right.headers["Authorization"] == http_client.basic_auth_header("u", "p")
+        assert right_client.headers["Authorization"] == http_client.basic_auth_header("u", "p")
+        assert wrong_client.headers["Authorization"] == http_client.basic_auth_header("u", "wrong")
+    finally:
+        http_client.close_all_sessions()
+
+
+def test_credential_key_tells_passwords_apart_without_holding_them():
+    key = http_client.credential_key("alice", "s3cret")
+
+    assert key.startswith("alice:") and "s3cret" not in key
+    assert key == http_client.credential_key("alice", "s3cret")
+    assert key != http_client.credential_key("alice", "other")
+    assert key.split(":")[1] != http_client.credential_key("bob", "s3cret").split(":")[1]
+
+
+def test_auth_header_is_encoded_once():
+    http_client.basic_auth_header.cache_clear()
+
+    header = http_client.basic_auth_header("alice", "s3cret")
+    http_client.basic_auth_header("alice", "s3cret")
+
+    assert header == "Basic YWxpY2U6czNjcmV0"
+    assert http_client.basic_auth_header.cache_info().hits == 1
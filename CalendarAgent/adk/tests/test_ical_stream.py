@@ -0,0 +1,77 @@
+import ical_stream
+
+
+def parse(*lines, alarms=False):
+    return ical_stream.parse_ics("\r\n".join(["BEGIN:VCALENDAR", *lines, "END:VCALENDAR"]), alarms)
+
+
+def test_folded_lines_are_joined():
+    event, = parse("BEGIN:VEVENT", "UID:folded", "SUMMARY:Quarterly plan", " ning review", "\tof goals",
+                   "DTSTART:20300101T090000Z", "END:VEVENT")
+    assert event["summary"] == "Quarterly planning reviewof goals"
+
+
+def test_folding_works_across_chunk_boundaries():
+    chunks = [b"BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:ch", b"unked\r\nSUMMARY:Long\r\n  title\r\nEND:VEV",
+              b"ENT\r\nEND:VCALENDAR\r\n"]
+    event, = ical_stream.iter_vevents(ical_stream.iter_lines_from_chunks(chunks))
+    assert (event["uid"], event["summary"]) == ("chunked", "Long title")
+
+
+def test_quoted_parameters_may_hold_colons_and_semicolons():
+    assert ical_stream.split_property('DTSTART;TZID="America/New_York";X-NOTE="a:b;c":20300101T090000') == \
+        ("DTSTART", {"TZID": "America/New_York", "X-NOTE": "a:b;c"}, "20300101T090000")
+    event, = parse("BEGIN:VEVENT", "UID:quoted", 'DESCRIPTION;ALTREP="cid:part1.0001@example.org":Agenda',
+                   "END:VEVENT")
+    assert event["description"] == "Agenda"
+
+
+def test_tzid_times_are_converted_to_utc():
+    event, = parse("BEGIN:VEVENT", "UID:tz", "DTSTART;TZID=America/New_York:20300715T090000",
+                   'DTEND;TZID="America/New_York":20300115T090000', "END:VEVENT")
+    assert event["start_time"] == "20300715T130000Z"  # EDT
+    assert event["end_time"] == "20300115T140000Z"    # EST
+
+
+def test_unknown_tzid_and_floating_times_are_kept_as_written():
+    event, = parse("BEGIN:VEVENT", "UID:tz", "DTSTART;TZID=Mars/Olympus:20300101T090000",
+                   "DTEND:20300101T100000", "END:VEVENT")
+    assert (event["start_time"], event["end_time"]) == ("20300101T090000", "20300101T100000")
+
+
+def test_all_day_values_stay_dates():
+    event, = parse("BEGIN:VEVENT", "UID:day", "DTSTART;VALUE=DATE:20300101", "DTEND;VALUE=DATE:20300102",
+                   "END:VEVENT")
+    assert (event["start_time"], event["end_time"]) == ("20300101", "20300102")
+
+
+def test_text_is_unescaped():
+    event, = parse("BEGIN:VEVENT", "UID:text", r"SUMMARY:Lunch\, then review\; bring notes",
+                   r"DESCRIPTION:Line one\nLine two\\done", "END:VEVENT")
+    assert event["summary"] == "Lunch, then review; bring notes"
+    assert event["description"] == "Line one\nLine two\\done"
+
+
+def test_nested_valarm_does_not_leak_into_the_event():
+    lines = ("BEGIN:VEVENT", "UID:alarm", "SUMMARY:Dentist", "BEGIN:VALARM", "ACTION:display",
+             "TRIGGER:-PT15M", "DESCRIPTION:Leave now", "END:VALARM", "END:VEVENT")
+    event, = parse(*lines)
+    assert event["summary"] == "Dentist" and event["description"] is None
+    assert "alarms" not in event
+
+    event, = parse(*lines, alarms=True)
+    assert event["alarms"] == [{"action": "DISPLAY", "trigger": "-PT15M", "description": "Leave now"}]
+
+
+def test_absolute_alarm_triggers_are_normalised():
+    event, = parse("BEGIN:VEVENT", "UID:alarm", "BEGIN:VALARM", "ACTION:AUDIO",
+                   "TRIGGER;VALUE=DATE-TIME:20300101T080000Z", "END:VALARM", "END:VEVENT", alarms=True)
+    assert event["alarms"] == [{"action": "AUDIO", "trigger": "20300101T080000Z"}]
+
+
+def test_other_components_are_skipped():
+    events = parse("BEGIN:VTIMEZONE", "TZID:Europe/Paris", "BEGIN:STANDARD", "DTSTART:19701025T030000",
+                   "END:STANDARD", "END:VTIMEZONE", "BEGIN:VTODO", "UID:todo", "SUMMARY:Task", "END:VTODO",
+                   "BEGIN:VEVENT", "UID:event", "END:VEVENT")
+    assert [event["uid"] for event in events] == ["event"]
+    assert events[0]["start_time"] is None
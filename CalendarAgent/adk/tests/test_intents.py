@@ -0,0 +1,79 @@
+import datetime as dt
+
+import intents
+
+# A Saturday; the events below are on the Monday and Tuesday after.
+TODAY = dt.date(2026, 10, 17)
+
+
+def event(uid, summary, start, end, **extra):
+    return {"uid": uid, "summary": summary, "description": "", "start": start, "end": end, **extra}
+
+
+def test_update_keeps_local_wall_time_and_sends_utc(local_tz):
+    local_tz("America/New_York")
+    events = [event("u1", "Standup", "2026-10-19T14:00:00.000Z", "2026-10-19T14:30:00.000Z")]
+
+    intent = intents.match("move standup to tuesday", events, TODAY)
+
+    assert intent.action == "update"
+    assert intent.args["event_uid"] == "u1"
+    assert intent.args["start_time"] == "2026-10-20T14:00:00Z"
+    assert intent.args["end_time"] == "2026-10-20T14:30:00Z"
+
+
+def test_update_to_a_time_reads_it_as_local(local_tz):
+    local_tz("America/New_York")
+    events = [event("u1", "Standup", "2026-10-19T14:00:00.000Z", "2026-10-19T14:30:00.000Z")]
+
+    intent = intents.match("move standup to 11am", events, TODAY)
+
+    assert intent.args["start_time"] == "2026-10-19T15:00:00Z"
+
+
+def test_update_of_ical_event_across_dst(local_tz):
+    local_tz("America/New_York")
+    # 10:00 EDT on Friday; the Monday after is in EST (clocks go back on Nov 1).
+    events = [event("u1", "Review", None, None, start_time="20261030T140000Z", end_time="20261030T150000Z")]
+
+    intent = intents.match("move review to 2 november", events, TODAY)
+
+    assert intent.args["start_time"] == "2026-11-02T15:00:00Z"
+    assert intent.args["end_time"] == "2026-11-02T16:00:00Z"
+
+
+def test_create_sends_utc(local_tz):
+    local_tz("Europe/Berlin")
+
+    intent = intents.match("add dentist on tuesday at 9am", [], TODAY)
+
+    assert intent.action == "create"
+    assert intent.args["name"] == "Dentist"
+    assert intent.args["start_time"] == "2026-10-20T07:00:00Z"
+    assert intent.args["end_time"] == "2026-10-20T08:00:00Z"
+
+
+def test_recurring_events_go_to_the_model(local_tz):
+    local_tz("UTC")
+    events = [event("u1", "Standup", "2026-10-19T14:00:00.000Z", "2026-10-19T14:30:00.000Z",
+                     rrule="FREQ=DAILY")]
+
+    assert intents.match("move standup to tuesday", events, TODAY) is None
+    assert intents.match("delete standup", events, TODAY) is None
+
+
+def test_ambiguous_title_goes_to_the_model():
+    events = [event("u1", "Standup", "2026-10-19T14:00:00.000Z", "2026-10-19T14:30:00.000Z"),
+              event("u2", "Standup", "2026-10-20T14:00:00.000Z", "2026-10-20T14:30:00.000Z")]
+
+    assert intents.match("delete standup", events, TODAY) is None
+    assert intents.match("delete standup on monday", events, TODAY).args["event_uid"] == "u1"
+
+
+def test_delete_needs_the_day_and_the_whole_title(local_tz):
+    local_tz("UTC")
+    events = [event("u1", "Dentist appointment", "2026-10-19T14:00:00.000Z", "2026-10-19T15:00:00.000Z")]
+
+    assert intents.match("delete dentist appointment", events, TODAY) is None  # may recur outside the window
+    assert intents.match("delete dentist on monday", events, TODAY) is None
+    assert intents.match("delete my dentist appointment on monday", events, TODAY).args["event_uid"] == "u1"
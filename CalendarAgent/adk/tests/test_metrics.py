@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_JSONL", None)
+    monkeypatch.setattr(metrics, "METRICS_PROM", None)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def _series(name: str, **labels) -> dict:
+    wanted = {k: str(v) for k, v in labels.items()}
+    return next(r for r in metrics.snapshot() if r["name"] == name and r["labels"] == wanted)
+
+
+def test_counters_add_up_per_label_set():
+    metrics.inc("fetch_errors_total", agent="event_agent")
+    metrics.inc("fetch_errors_total", 2, agent="event_agent")
+    metrics.inc("fetch_errors_total", agent="alarm_agent")
+
+    assert _series("fetch_errors_total", agent="event_agent")["value"] == 3
+    assert _series("fetch_errors_total", agent="alarm_agent")["value"] == 1
+
+
+def test_histogram_puts_each_sample_in_its_first_bucket():
+    for value in (0.003, 0.01, 0.2, 99):
+        metrics.observe("turn_seconds", value)
+
+    histogram = _series("turn_seconds")
+    assert histogram["count"] == 4
+    assert histogram["sum"] == pytest.approx(99.213)
+    assert histogram["buckets"][0.005] == 1
+    assert histogram["buckets"][0.01] == 1
+    assert histogram["buckets"][0.25] == 1
+    assert sum(histogram["buckets"].values()) == 3  # 99 s is only in +Inf
+
+
+def test_span_counts_errors_and_still_times_the_block():
+    with pytest.raises(KeyError):
+        with metrics.span("turn_phase", phase="fetch"):
+            raise KeyError("x")
+
+    assert _series("turn_phase_errors_total", phase="fetch", error="KeyError")["value"] == 1
+    assert _series("turn_phase_seconds", phase="fetch")["count"] == 1
+
+
+def test_timed_wraps_plain_and_async_functions():
+    @metrics.timed("turn", agent="a")
+    def plain(x):
+        return x + 1
+
+    @metrics.timed("turn", agent="a")
+    async def coro(x):
+        return x * 2
+
+    assert plain(1) == 2
+    assert asyncio.run(coro(3)) == 6
+    assert _series("turn_seconds", agent="a")["count"] == 2
+
+
+def test_prometheus_text_has_cumulative_buckets_and_escaped_labels():
+    metrics.inc("writes_total", kind='say "hi"\n')
+    metrics.observe("http_request_seconds", 0.007, buckets=(0.005, 0.01), method="GET")
+    metrics.observe("http_request_seconds", 0.003, buckets=(0.005, 0.01), method="GET")
+
+    lines = metrics.prometheus_text().splitlines()
+
+    assert "# TYPE prosweet_writes_total counter" in lines
+    assert 'prosweet_writes_total{kind="say \\"hi\\"\\n"} 1' in lines
+    assert 'prosweet_http_request_seconds_bucket{method="GET",le="0.005"} 1' in lines
+    assert 'prosweet_http_request_seconds_bucket{method="GET",le="0.01"} 2' in lines
+    assert 'prosweet_http_request_seconds_bucket{method="GET",le="+Inf"} 2' in lines
+    assert 'prosweet_http_request_seconds_count{method="GET"} 2' in lines
+
+
+def test_flush_writes_jsonl_snapshot_and_replaces_prom_file(tmp_path, monkeypatch):
+    jsonl, prom = tmp_path / "metrics.jsonl", tmp_path / "metrics.prom"
+    monkeypatch.setattr(metrics, "METRICS_JSONL", str(jsonl))
+    monkeypatch.setattr(metrics, "METRICS_PROM", str(prom))
+
+    with metrics.span("turn"):
+        pass
+    metrics.inc("turns_total")
+    metrics.flush()
+
+    records = [json.loads(line) for line in jsonl.read_text().splitlines()]
+    assert records[0]["span"] == "turn" and records[0]["error"] is None
+    assert {r.get("name") for r in records[1:]} == {"turn_seconds", "turns_total"}
+    assert "prosweet_turns_total 1" in prom.read_text().splitlines()
+    assert not (tmp_path / "metrics.prom.tmp").exists()
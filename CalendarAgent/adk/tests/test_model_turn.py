@@ -0,0 +1,55 @@
+import pytest
+
+from common import FakeServer, StubModel, load_agent, quiet, stub_response
+
+import calendar_window
+import gemini_models
+import http_client
+import model_turn
+
+
+@pytest.fixture
+def agent():
+    agent = load_agent("event_agent")
+    with FakeServer("gateway") as server:
+        server.seed(3)
+        agent.API_BASE_URL = server.url
+        agent.server = server
+        yield agent
+    http_client.close_all_sessions()
+
+
+def ask(agent, model, prompt="move Event 1 to friday"):
+    with quiet():
+        return http_client.run_sync(agent.ask_gemini_async("u", "p", model, prompt))
+
+
+def test_gives_up_with_a_reply_when_widen_rounds_run_out(agent):
+    model = StubModel([stub_response([("get_events_in_range", {"start_date": "2031-01-01",
+                                                               "end_date": "2031-01-02"})])])
+
+    assert ask(agent, model) == model_turn.GAVE_UP
+    assert model.calls == calendar_window.MAX_WIDEN_ROUNDS + 1
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_text_reply_is_returned(agent, monkeypatch, stream):
+    monkeypatch.setattr(gemini_models, "STREAM_RESPONSES", stream)
+
+    assert ask(agent, StubModel([stub_response(text="Which event do you mean?")])) == "Which event do you mean?"
+
+
+def test_write_repeated_after_a_widen_round_runs_once(agent, monkeypatch):
+    monkeypatch.setattr(gemini_models, "STREAM_RESPONSES", True)
+    update = {"event_uid": "seed-0000001", "name": "Event 1", "summary": "", "username": "u", "password": "p",
+              "start_time": "2025-01-03T09:00:00Z", "end_time": "2025-01-03T10:00:00Z"}
+    model = StubModel([
+        stub_response([("update_event", update),
+                       ("get_events_in_range", {"start_date": "2025-01-03", "end_date": "2025-01-04"})]),
+        stub_response([("update_event", {**update, "start_time": "2025-01-03T09:00:00"})]),
+    ])
+
+    results = ask(agent, model)
+
+    assert len(results) == 1 and results[0]
+    assert agent.server.store["seed-0000001"][1]["start"] == "2025-01-03T09:00:00Z"
@@ -0,0 +1,96 @@
+import httpx
+import pytest
+
+from common import quiet
+
+import http_client
+import write_behind
+
+
+class StubSender:
+    """Answers each write with the next of `statuses` (the last one repeats), recording what it was sent."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses) or [200]
+        self.sent = []
+
+    async def __call__(self, username, password, op, uid, payload):
+        self.sent.append((username, password, op, uid))
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return httpx.Response(status)
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    journal = write_behind.Journal(":memory:")
+    monkeypatch.setattr(write_behind, "_journal", journal)
+    monkeypatch.setattr(write_behind, "_credentials", {})
+    monkeypatch.setattr(write_behind, "_senders", {})
+    monkeypatch.setattr(write_behind, "BACKOFF_BASE", 0.01)
+    return journal
+
+
+def enqueue(op, uid, password="right"):
+    with quiet():
+        return write_behind.enqueue("stub", op, "alice", password, uid, {"summary": uid})
+
+
+def drain():
+    with quiet():
+        return http_client.run_sync(write_behind.drain(5))
+
+
+def test_journal_gives_the_oldest_write_of_each_event(queue):
+    key = http_client.credential_key("alice", "right")
+    first = queue.append("stub", "update", "alice", key, "e1", {"n": 1})
+    queue.append("stub", "update", "alice", key, "e1", {"n": 2})
+    other = queue.append("stub", "create", "alice", key, "e2", {})
+
+    assert [w["id"] for w in queue.due(float("inf"), [key], ["stub"], 10)] == [first, other]
+    assert queue.due(float("inf"), [http_client.credential_key("alice", "wrong")], ["stub"], 10) == []
+    assert queue.due(float("inf"), [key], ["other"], 10) == []
+    assert "right" not in repr(queue._execute("SELECT * FROM writes"))
+
+
+def test_writes_run_in_order_and_drain_empties_the_queue(queue):
+    sender = StubSender()
+    write_behind.register("stub", sender)
+    for uid in ("e1", "e1", "e2"):
+        enqueue("update", uid)
+
+    assert drain() == {"depth": 0, "lag_seconds": 0.0, "failed": 0}
+    assert [uid for _, _, _, uid in sender.sent].count("e1") == 2
+    assert {password for _, password, _, _ in sender.sent} == {"right"}
+
+
+def test_replayed_writes_run_only_with_the_credentials_they_were_queued_with(queue):
+    # Queued before a restart: the journal has the write, the process no password.
+    queue.append("stub", "update", "alice", http_client.credential_key("alice", "right"), "e1", {})
+    sender = StubSender()
+    write_behind.register("stub", sender)
+
+    with quiet():
+        write_behind.login("alice", "wrong")
+    assert drain()["depth"] == 1 and sender.sent == []
+
+    with quiet():
+        write_behind.login("alice", "right")
+    assert drain()["depth"] == 0
+    assert sender.sent == [("alice", "right", "update", "e1")]
+
+
+def test_conflicts_are_parked_and_transient_errors_retried(queue):
+    write_behind.register("stub", StubSender(503, 200))
+    enqueue("update", "e1")
+    assert drain() == {"depth": 0, "lag_seconds": 0.0, "failed": 0}
+
+    write_behind.register("stub", StubSender(412))
+    enqueue("update", "e2")
+    assert drain()["failed"] == 1
+    assert [(w["uid"], w["state"], w["last_error"]) for w in queue.parked()] == [("e2", "conflict", "HTTP 412")]
+
+    write_behind.register("stub", StubSender())
+    assert queue.requeue() == 1
+    with quiet():
+        write_behind.login("alice", "right")  # requeued writes run the next time their user is seen
+    assert drain() == {"depth": 0, "lag_seconds": 0.0, "failed": 0}
@@ -1,3 +1,4 @@
+import { HTTPException } from "hono/http-exception";
 import { CalDAVClient } from "ts-caldav";
 
 const CALDAV_BASE_URL: any = process.env.CALDAV_URL;
@@ -96,7 +97,32 @@ export async function listEvents(
           ? { end: endDate }
           : { start: startDate, end: endDate };
 
-  return client.getEvents(calendarUrl, range as any);
+  const events = await client.getEvents(calendarUrl, range as any);
+  rememberHrefs(authHeader, events);
+  return events;
+}
+
+// ---- Where each event lives (for the conditional PUT/DELETE) ----
+
+// `${authHeader}\n${uid}` -> href of the calendar object holding that UID, as last listed.
+// Objects are not always named <uid>.ics (other clients pick their own names).
+const hrefs = new Map<string, string>();
+
+// A listed calendar object's href: `url` on calendar objects, `href` on ts-caldav's events
+const objectHref = (obj: any): string | undefined => obj?.url ?? obj?.href;
+
+function rememberHrefs(authHeader: string, events: any[]) {
+  for (const obj of events ?? []) {
+    const href = objectHref(obj);
+    if (obj?.uid && href) hrefs.set(`${authHeader}\n${obj.uid}`, new URL(href, CALDAV_BASE_URL).toString());
+  }
+}
+
+// The absolute href of the object holding `uid`: from the last listing, else from a fresh one
+async function resolveHref(client: any, authHeader: string, calendarUrl: string, uid: string) {
+  const key = `${authHeader}\n${uid}`;
+  if (!hrefs.has(key)) rememberHrefs(authHeader, await client.getEvents(calendarUrl, { all: true } as any));
+  return hrefs.get(key);
 }
 
 export type CreateEventInput = {
@@ -169,64 +195,165 @@ export async function createEvent(auth: string, input: CreateEventInput) {
     allDay,
   } as any);
 
+  rememberHrefs(auth, [created]);
   return created; // typically includes href/etag/uid
 }
 
-export async function deleteEvent(authHeader: string, uidOrHref: string, etag?: string) {
+// ---- iCalendar (for the conditional PUT in updateEvent) ----
+
+type Alarm = NonNullable<CreateEventInput["alarms"]>[number];
+
+// RFC 5545 TEXT escaping
+const escapeText = (value: string) =>
+  value.replace(/\\/g, "\\\\").replace(/;/g, "\\;").replace(/,/g, "\\,").replace(/\r?\n/g, "\\n");
+
+// Fold a content line into pieces of at most 75 octets, continued after CRLF and a space
+function fold(line: string): string {
+  const pieces: string[] = [];
+  let piece = "";
+  let size = 0;
+  for (const ch of line) {
+    const width = Buffer.byteLength(ch);
+    if (size + width > 75) {
+      pieces.push(piece);
+      piece = "";
+      size = 1; // the continuation's leading space counts
+    }
+    piece += ch;
+    size += width;
+  }
+  pieces.push(piece);
+  return pieces.join("\r\n ");
+}
+
+// A moment as a UTC DATE-TIME (20250101T090000Z); naive ISO strings are local, as new Date() reads them
+const icsTime = (value: string | Date) => {
+  const date = new Date(value);
+  if (isNaN(date.getTime())) throw new HTTPException(400, { message: `Invalid ISO datetime: ${value}` });
+  return date.toISOString().replace(/[-:]/g, "").replace(/\.\d{3}/, "");
+};
+
+const icsDate = (value: string) => value.slice(0, 10).replace(/-/g, "");
+
+function alarmLines(alarm: Alarm, summary: string): string[] {
+  const trigger = alarm.trigger.trim();
+  const lines = ["BEGIN:VALARM", `ACTION:${alarm.action}`];
+  lines.push(/^[+-]?P/i.test(trigger) ? `TRIGGER:${trigger.toUpperCase()}` : `TRIGGER;VALUE=DATE-TIME:${icsTime(trigger)}`);
+  if (alarm.action === "DISPLAY" || alarm.action === "EMAIL") {
+    lines.push(`DESCRIPTION:${escapeText(alarm.description || summary)}`);
+  }
+  if (alarm.action === "EMAIL") {
+    lines.push(`SUMMARY:${escapeText(alarm.summary || summary)}`);
+    for (const attendee of alarm.attendees ?? []) {
+      lines.push(`ATTENDEE:${attendee.includes(":") ? attendee : `mailto:${attendee}`}`);
+    }
+  }
+  lines.push("END:VALARM");
+  return lines;
+}
+
+// One VEVENT as a .ics body. Times are written in UTC: startTzid/endTzid would
+// also need a VTIMEZONE, so they are not sent (the moment itself is the same).
+function eventIcs(uid: string, input: CreateEventInput): string {
+  const { summary, start, end, description, location, alarms, rrule, allDay } = input;
+  const lines = [
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "CALSCALE:GREGORIAN",
+    "PRODID:-//ProSweet Planner//EN",
+    "BEGIN:VEVENT",
+    `UID:${uid}`,
+    `DTSTAMP:${icsTime(new Date())}`,
+    `SUMMARY:${escapeText(summary)}`,
+    allDay ? `DTSTART;VALUE=DATE:${icsDate(start)}` : `DTSTART:${icsTime(start)}`,
+    allDay ? `DTEND;VALUE=DATE:${icsDate(end)}` : `DTEND:${icsTime(end)}`,
+  ];
+  if (description) lines.push(`DESCRIPTION:${escapeText(description)}`);
+  if (location) lines.push(`LOCATION:${escapeText(location)}`);
+  if (rrule) lines.push(`RRULE:${rrule.replace(/^RRULE:/i, "")}`);
+  for (const alarm of alarms ?? []) lines.push(...alarmLines(alarm, summary));
+  lines.push("END:VEVENT", "END:VCALENDAR", "");
+  return lines.map(fold).join("\r\n");
+}
+
+/**
+ * Rewrites an existing event in place with a single conditional PUT to the
+ * href its calendar object was listed under. `etag` (from a previous listing)
+ * is sent as If-Match, so a concurrent change on the server makes this fail
+ * with 412 instead of being overwritten; without one, If-Match: * still keeps
+ * a missing UID from being created.
+ */
+export async function updateEvent(
+  authHeader: string,
+  uid: string,
+  input: CreateEventInput,
+  etag?: string
+) {
   const client = await getClient(authHeader);
   const calendars = await client.getCalendars();
   if (!calendars?.length) throw new Error("No calendars found for this user");
 
   const calendarUrl = calendars[0].url; // keep exact (with trailing /)
+  const href = await resolveHref(client, authHeader, calendarUrl, uid);
+  if (!href) return { ok: false as const, status: 404, error: "Event not found" };
+
+  const res = await fetch(href, {
+    method: "PUT",
+    headers: {
+      "Content-Type": "text/calendar; charset=utf-8",
+      "If-Match": etag ?? "*",
+      Authorization: authHeader,
+    },
+    body: eventIcs(uid, input),
+  });
+
+  if (res.ok) {
+    return { ok: true as const, status: 200, updated: { uid, href, etag: res.headers.get("ETag") ?? undefined } };
+  }
+  // Someone else changed (or removed) the event since it was listed
+  if (res.status === 412 && etag) {
+    return { ok: false as const, status: 412, error: "Event was modified on the server (ETag mismatch)" };
+  }
+  if (res.status === 404 || res.status === 412) {
+    hrefs.delete(`${authHeader}\n${uid}`);
+    return { ok: false as const, status: 404, error: "Event not found" };
+  }
+  const text = await res.text().catch(() => "");
+  throw new Error(`Failed to update event (status ${res.status}): ${text}`);
+}
 
-  // Build href/uid
-  const href = uidOrHref.startsWith("/") || uidOrHref.endsWith(".ics")
-    ? uidOrHref
-    : `${calendarUrl}${uidOrHref}.ics`;
-  const uid = href.split("/").pop()!.replace(/\.ics$/i, "");
-
-  // Helper: extract HTTP status defensively
-  const getStatus = (e: any): number | undefined => {
-    if (e?.response?.status) return e.response.status;
-    if (typeof e?.status === "number") return e.status;
-    const m = typeof e?.message === "string" && e.message.match(/\bstatus(?:\s+code)?\s+(\d{3})\b/i);
-    if (m) return parseInt(m[1], 10);
-    return undefined;
-  };
-
-  try {
-    // Preferred path: use library delete (by uid)
-    const res = await client.deleteEvent(calendarUrl, uid, etag);
-    // If it returns, consider it success
-    return { ok: true, status: 204, result: res };
-  } catch (e: any) {
-    const status = getStatus(e);
-
-    // Normalize common server responses
-    if (status === 200 || status === 204) {
-      return { ok: true, status, note: "Normalized DELETE success (server returned 200/204)" };
-    }
-
-    // If 404, it's already gone
-    if (status === 404) {
-      return { ok: false, status: 404, error: "Event not found" };
-    }
+/**
+ * Deletes an event with one DELETE to the href its calendar object was listed
+ * under (or to `uidOrHref` itself when it is an href). With `etag` it is sent
+ * as If-Match, so an event changed since it was listed is kept (412).
+ */
+export async function deleteEvent(authHeader: string, uidOrHref: string, etag?: string) {
+  const client = await getClient(authHeader);
+  const calendars = await client.getCalendars();
+  if (!calendars?.length) throw new Error("No calendars found for this user");
 
-    // Fallback: verify by checking if the UID still exists
-    try {
-      const events = await client.getEvents(calendarUrl, { all: true } as any);
-      const stillThere = Array.isArray(events) && events.some((ev: any) => ev?.uid === uid);
-      if (!stillThere) {
-        return { ok: true, status: 204, note: "Verified deletion by absence after error" };
-      }
-    } catch {
-      // ignore verification failure, proceed to throw below
-    }
+  const calendarUrl = calendars[0].url; // keep exact (with trailing /)
 
-    // Last resort: bubble up with more detail
-    const msg = typeof e?.message === "string" ? e.message : String(e);
-    throw new Error(`Failed to delete event (status ${status ?? "unknown"}): ${msg}`);
+  const isHref = uidOrHref.startsWith("/") || uidOrHref.endsWith(".ics");
+  const uid = isHref ? uidOrHref.split("/").pop()!.replace(/\.ics$/i, "") : uidOrHref;
+  const href = isHref
+    ? new URL(uidOrHref, CALDAV_BASE_URL).toString()
+    : await resolveHref(client, authHeader, calendarUrl, uid);
+  if (!href) return { ok: false, status: 404, error: "Event not found" };
+
+  const res = await fetch(href, {
+    method: "DELETE",
+    headers: { ...(etag ? { "If-Match": etag } : {}), Authorization: authHeader },
+  });
+  hrefs.delete(`${authHeader}\n${uid}`);
+
+  if (res.ok) return { ok: true, status: 204 };
+  if (res.status === 404) return { ok: false, status: 404, error: "Event not found" };
+  if (res.status === 412) {
+    return { ok: false, status: 412, error: "Event was modified on the server (ETag mismatch)" };
   }
+  const text = await res.text().catch(() => "");
+  throw new Error(`Failed to delete event (status ${res.status}): ${text}`);
 }
 
 export async function getAlarms(authHeader: string, uid: string) {
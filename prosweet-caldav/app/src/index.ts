@@ -6,6 +6,7 @@ import {
   listCalendars,
   listEvents,
   createEvent,
+  updateEvent,
   deleteEvent,
   getClient,
   type ListEventsOptions,
@@ -26,7 +27,7 @@ app.use(
   "/*",
   cors({
     origin: "*",
-    allowMethods: ["GET", "POST", "DELETE"],
+    allowMethods: ["GET", "POST", "PUT", "DELETE"],
     allowHeaders: ["Content-Type", "If-Match", "Authorization"],
     maxAge: 86400,
   })
@@ -112,6 +113,38 @@ app.post("/events", async (c) => {
   }
 });
 
+/**
+ * PUT /events/:uid
+ * Header: If-Match: <etag from GET /events> (optional, but recommended)
+ * Body: same as POST /events (uid comes from the path).
+ * Rewrites the event in one request; answers 412 if the ETag no longer matches.
+ */
+app.put("/events/:uid", async (c) => {
+  try {
+    const auth = c.req.header("Authorization");
+    const uid = c.req.param("uid");
+    const etag = c.req.header("If-Match") ?? undefined;
+
+    if (!auth) return c.json({ error: "Missing Authorization header" }, 401);
+    if (!uid) return c.json({ error: "Missing :uid" }, 400);
+
+    const body = await c.req.json();
+    if (!body?.summary || !body?.start || !body?.end) {
+      throw new HTTPException(400, {
+        message:
+          "Required: summary, start(ISO), end(ISO). Optional: startTzid, endTzid, description, location, alarms, rrule, allDay",
+      });
+    }
+
+    const result = await updateEvent(auth, uid, body, etag);
+    if (!result.ok) return c.json(result, result.status as 404 | 412);
+    return c.json({ updated: result.updated });
+  } catch (err) {
+    const status = err instanceof HTTPException ? err.status : 401;
+    return c.json({ error: (err as Error).message }, status);
+  }
+});
+
 /**
  * DELETE /events/:uid?calendarUrl=<...>&etag=<optional>
  * Deletes an event by UID. If you store ETags, pass ?etag= to ensure safe delete.